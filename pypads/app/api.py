@@ -1,7 +1,9 @@
 import os
 from abc import ABCMeta
+from concurrent.futures.thread import ThreadPoolExecutor
 from contextlib import contextmanager
 from functools import wraps
+from threading import RLock
 from types import ModuleType
 from typing import List, Iterable, Union, Dict
 
@@ -9,8 +11,9 @@ import mlflow
 
 from pypads import logger
 from pypads.app.env import LoggerEnv
-from pypads.app.injections.base_logger import dummy_logger
-from pypads.app.injections.run_loggers import RunSetup, RunTeardown, SimpleRunFunction
+from pypads.app.injections.base_logger import dummy_logger, Logger
+from pypads.app.injections.run_loggers import RunSetup, RunTeardown, SimpleRunFunction, setup_chains, \
+    setup_libraries
 from pypads.app.injections.tracked_object import LoggerOutput, Parameter, Tag, Artifact, Metric
 from pypads.app.misc.caches import Cache
 from pypads.app.misc.extensions import ExtendableMixin, Plugin
@@ -18,12 +21,18 @@ from pypads.app.misc.mixins import FunctionHolderMixin
 from pypads.bindings.anchors import get_anchor, Anchor
 from pypads.importext.mappings import Mapping, MatchedMapping, make_run_time_mapping_collection
 from pypads.importext.package_path import PackagePathMatcher, PackagePath
+from pypads.model.mixins import store_library
 from pypads.utils.logging_util import get_temp_folder, FileFormats, read_artifact, find_file_format
 from pypads.utils.util import get_experiment_id, get_run_id
+from pypads.variables import setup_workers
 
 api_plugins = set()
 cmds = set()
 
+# The active run of mlflow is global for the process. Switching to another run and back has to be done by one thread
+# at a time.
+run_context_lock = RLock()
+
 
 class Cmd(FunctionHolderMixin, metaclass=ABCMeta):
 
@@ -379,20 +388,21 @@ class PyPadsApi(IApi):
         :param kwargs: Other kwargs to pass to start_run()
         :return:
         """
-        enclosing_run = mlflow.active_run()
-        try:
-            run = self.pypads.api.start_run(**kwargs, setups=setups, nested=nested)
-            self.pypads.cache.run_add("enclosing_run", enclosing_run)
-            yield run
-        finally:
-            if not mlflow.active_run() is enclosing_run:
-                run_id = mlflow.active_run().info.run_id
-                self.pypads.api.end_run()
-                if clear_cache:
-                    self.pypads.cache.run_clear(run_id=run_id)
-                    self.pypads.cache.run_delete(run_id=run_id)
-            else:
-                mlflow.start_run(run_id=enclosing_run.info.run_id)
+        with run_context_lock:
+            enclosing_run = mlflow.active_run()
+            try:
+                run = self.pypads.api.start_run(**kwargs, setups=setups, nested=nested)
+                self.pypads.cache.run_add("enclosing_run", enclosing_run)
+                yield run
+            finally:
+                if not mlflow.active_run() is enclosing_run:
+                    run_id = mlflow.active_run().info.run_id
+                    self.pypads.api.end_run()
+                    if clear_cache:
+                        self.pypads.cache.run_clear(run_id=run_id)
+                        self.pypads.cache.run_delete(run_id=run_id)
+                else:
+                    mlflow.start_run(run_id=enclosing_run.info.run_id)
 
     def _get_setup_cache(self):
         """
@@ -476,9 +486,47 @@ class PyPadsApi(IApi):
         for k, v in cache.items():
             fns.append(v)
         fns.sort(key=lambda f: f.order)
-        for fn in fns:
-            if callable(fn):
-                fn(self, _pypads_env=_pypads_env)
+
+        workers = self.pypads.config.get(setup_workers, 0)
+        if workers > 0 and self.active_run():
+            sequential, chains = setup_chains(fns)
+        else:
+            sequential, chains = fns, []
+
+        def run_chain(chain):
+            for fn in chain:
+                if callable(fn):
+                    fn(self, _pypads_env=_pypads_env)
+
+        futures = []
+        executor = None
+        if len(chains) > 0:
+            # Init the run cache before it is accessed by multiple threads
+            self.pypads.cache.run_init()
+
+            # Storing a logger or a library the first time switches to the runs of the repositories. Do this before
+            # starting the threads as the other threads would log into the repository runs meanwhile.
+            for fn in fns:
+                if isinstance(fn, Logger):
+                    try:
+                        fn.store()
+                    except Exception as e:
+                        logger.warning("Couldn't store setup " + str(fn) + " before running it: " + str(e))
+            for lib_model in setup_libraries([fn for chain in chains for fn in chain]):
+                try:
+                    store_library(lib_model)
+                except Exception as e:
+                    logger.warning("Couldn't store library " + str(lib_model.name) + " before running the setups: " +
+                                   str(e))
+            executor = ThreadPoolExecutor(max_workers=min(workers, len(chains)), thread_name_prefix="pypads_setup")
+            futures = [executor.submit(run_chain, chain) for chain in chains]
+        try:
+            run_chain(sequential)
+        finally:
+            if executor is not None:
+                executor.shutdown(wait=True)
+        for future in futures:
+            future.result()
 
     def _get_teardown_cache(self):
         """
@@ -563,11 +611,7 @@ class PyPadsApi(IApi):
 
     @cmd
     def active_experiment(self):
-        run = mlflow.active_run()
-        r_id = run.info.run_id
-        if not self.pypads.cache.run_exists(f"experiment_for_run_{r_id}"):
-            self.pypads.cache.run_add(f"experiment_for_run_{r_id}", mlflow.get_experiment(run.info.experiment_id))
-        return self.pypads.cache.run_get(f"experiment_for_run_{r_id}")
+        return self.pypads.backend.get_experiment(mlflow.active_run().info.experiment_id)
 
     @cmd
     def is_intermediate_run(self):
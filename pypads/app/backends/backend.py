@@ -1,6 +1,6 @@
 import os
 from abc import abstractmethod
-from typing import List, Union, Iterable, Any, Type
+from typing import List, Union, Iterable, Any, Type, Set
 
 from mlflow.entities import ViewType
 from mlflow.tracking.fluent import SEARCH_MAX_RESULTS_PANDAS
@@ -46,6 +46,13 @@ class BackendInterface:
         """
         raise NotImplementedError("")
 
+    def flush(self):
+        """
+        Write everything the backend might have buffered.
+        :return:
+        """
+        pass
+
     @abstractmethod
     def set_experiment_tag(self, experiment_id, key, value):
         raise NotImplementedError("")
@@ -149,6 +156,25 @@ class BackendInterface:
             search_dict=None):
         raise NotImplementedError("The used backend doesn't support this form of querying.")
 
+    def search_run_ids(self, plan) -> Set[str]:
+        """
+        Get the ids of the runs matching a compiled search. Every leaf of the search is listed once and the plan is
+        evaluated on the found run ids. Backends able to evaluate the plan in a single query should override this.
+        :param plan: RunSearchPlan
+        :return: Set of run ids
+        """
+        projection = {"run.uid": 1, "_id": 0}
+        matched = {}
+        for index, (storage_type, search_filter) in enumerate(plan.leaves):
+            matched[index] = {entry["run"]["uid"] for entry in
+                              self.list(storage_type, search_dict={**search_filter, "chosen_columns": projection})}
+        all_runs = None
+        if plan.needs_all_runs:
+            all_runs = {entry["run"]["uid"] for entry in
+                        self.list(ResultType.tag.value,
+                                  search_dict={**plan.all_runs_filter, "chosen_columns": projection})}
+        return plan.evaluate(matched, all_runs)
+
     def get_json(self, reference):
         raise NotImplementedError("The used backend doesn't support this form of querying.")
 
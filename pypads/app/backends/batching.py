@@ -0,0 +1,293 @@
+import os
+import queue
+import shutil
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+from mlflow.entities import Metric, Param, RunTag
+from mlflow.tracking import MlflowClient
+from mlflow.utils.validation import MAX_METRICS_PER_BATCH, MAX_PARAMS_TAGS_PER_BATCH, MAX_ENTITIES_PER_BATCH
+from pymongo import InsertOne, ReplaceOne
+from pymongo.errors import BulkWriteError
+
+from pypads import logger
+
+DEFAULT_QUEUE_SIZE = 10000
+
+
+class _Entry:
+    """
+    Single entry in the queue of the batch writer.
+    """
+    __slots__ = ["kind", "run_id", "payload"]
+
+    def __init__(self, kind, run_id, payload):
+        self.kind = kind
+        self.run_id = run_id
+        self.payload = payload
+
+
+class MlflowBatchWriter:
+    """
+    Write-behind queue pushing metrics, params, tags and json metadata files to mlflow in a background thread.
+    Metrics, params and tags are coalesced per run into log_batch calls. Metadata files are spooled to disk and
+    uploaded per run and artifact folder in a single log_artifacts call.
+    """
+
+    def __init__(self, client: MlflowClient, spool_folder, max_size=DEFAULT_QUEUE_SIZE):
+        """
+        :param client: Client used to push the data to mlflow.
+        :param spool_folder: Folder in which files are kept until they are uploaded.
+        :param max_size: Maximal number of entries in the queue. Logging blocks if the queue is full.
+        """
+        self._client = client
+        self._spool_folder = spool_folder
+        self._queue = queue.Queue(maxsize=max_size)
+        self._thread = None
+        self._lock = threading.Lock()
+
+    @property
+    def spool_folder(self):
+        return self._spool_folder
+
+    def spool_path(self, run_id, path):
+        """
+        Get the local path in the spool folder for a file to be uploaded later on.
+        :param run_id: Run the file belongs to
+        :param path: Relative path of the file in the artifact store of the run
+        :return:
+        """
+        return os.path.join(self._spool_folder, run_id, path)
+
+    def log_metric(self, run_id, key, value, step=0, timestamp=None):
+        # Convert directly to fail in the calling thread on invalid values
+        self._put(_Entry("metric", run_id,
+                         Metric(key, float(value), timestamp or int(time.time() * 1000), step or 0)))
+
+    def log_param(self, run_id, key, value):
+        self._put(_Entry("param", run_id, Param(key, str(value))))
+
+    def set_tag(self, run_id, key, value):
+        self._put(_Entry("tag", run_id, RunTag(key, str(value))))
+
+    def log_artifact(self, run_id, local_path, artifact_path=""):
+        """
+        Queue an upload of a spooled file. The file is removed after it was uploaded.
+        :param run_id: Run to upload to
+        :param local_path: Path of the file in the spool folder
+        :param artifact_path: Folder in the artifact store of the run
+        :return:
+        """
+        self._put(_Entry("artifact", run_id, (local_path, artifact_path or "")))
+
+    def flush(self):
+        """
+        Block until every queued entry was pushed to mlflow.
+        """
+        self._queue.join()
+
+    def clear(self, run_id):
+        """
+        Remove the spool folder of a finished run.
+        :param run_id: Run for which nothing is to be queued anymore
+        :return:
+        """
+        shutil.rmtree(os.path.join(self._spool_folder, run_id), ignore_errors=True)
+
+    def _put(self, entry):
+        self._ensure_thread()
+        self._queue.put(entry)
+
+    def _ensure_thread(self):
+        if self._thread is None or not self._thread.is_alive():
+            with self._lock:
+                if self._thread is None or not self._thread.is_alive():
+                    self._thread = threading.Thread(target=self._work, name="PyPadsBatchWriter", daemon=True)
+                    self._thread.start()
+
+    def _work(self):
+        while True:
+            entries = [self._queue.get()]
+            # Drain what is already waiting to be able to coalesce it
+            while len(entries) < MAX_METRICS_PER_BATCH:
+                try:
+                    entries.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                self._write(entries)
+            except Exception as e:
+                logger.error("Pushing queued entries to mlflow failed: " + str(e))
+            finally:
+                for _ in entries:
+                    self._queue.task_done()
+
+    def _write(self, entries):
+        runs = OrderedDict()
+        for entry in entries:
+            runs.setdefault(entry.run_id, []).append(entry)
+
+        for run_id, run_entries in runs.items():
+            metrics = []
+            params = OrderedDict()
+            tags = OrderedDict()
+            uploads = OrderedDict()
+            for entry in run_entries:
+                if entry.kind == "metric":
+                    metrics.append(entry.payload)
+                elif entry.kind == "param":
+                    # Mlflow doesn't allow duplicated param keys in a single batch
+                    params[entry.payload.key] = entry.payload
+                elif entry.kind == "tag":
+                    tags[entry.payload.key] = entry.payload
+                elif entry.kind == "artifact":
+                    local_path, artifact_path = entry.payload
+                    uploads.setdefault(artifact_path, []).append(local_path)
+            try:
+                self._log_batch(run_id, metrics, list(params.values()), list(tags.values()))
+            except Exception as e:
+                logger.warning(f"Pushing a batch to run {run_id} failed. Retrying entries one by one: {str(e)}")
+                self._log_single(run_id, metrics + list(params.values()) + list(tags.values()))
+            for artifact_path, local_paths in uploads.items():
+                try:
+                    self._upload(run_id, artifact_path, local_paths)
+                except Exception as e:
+                    logger.error(f"Uploading queued files of run {run_id} to mlflow failed: {str(e)}")
+
+    def _log_batch(self, run_id, metrics, params, tags):
+        while metrics or params or tags:
+            params_chunk, params = params[:MAX_PARAMS_TAGS_PER_BATCH], params[MAX_PARAMS_TAGS_PER_BATCH:]
+            tags_chunk, tags = tags[:MAX_PARAMS_TAGS_PER_BATCH], tags[MAX_PARAMS_TAGS_PER_BATCH:]
+            # A single batch may only hold a limited amount of entities in total
+            size = min(MAX_METRICS_PER_BATCH, MAX_ENTITIES_PER_BATCH - len(params_chunk) - len(tags_chunk))
+            metrics_chunk, metrics = metrics[:size], metrics[size:]
+            self._client.log_batch(run_id, metrics=metrics_chunk, params=params_chunk, tags=tags_chunk)
+
+    def _log_single(self, run_id, entities):
+        for entity in entities:
+            try:
+                self._client.log_batch(run_id, metrics=[entity] if isinstance(entity, Metric) else [],
+                                       params=[entity] if isinstance(entity, Param) else [],
+                                       tags=[entity] if isinstance(entity, RunTag) else [])
+            except Exception as e:
+                logger.error(f"Pushing {entity.key} to run {run_id} failed: {str(e)}")
+
+    def _upload(self, run_id, artifact_path, local_paths):
+        if len(local_paths) == 1:
+            self._client.log_artifact(run_id, local_paths[0], artifact_path or None)
+        else:
+            # Link all files of the folder into a staging folder to upload them with a single call
+            os.makedirs(self._spool_folder, exist_ok=True)
+            staging = tempfile.mkdtemp(dir=self._spool_folder)
+            try:
+                for local_path in local_paths:
+                    target = os.path.join(staging, os.path.basename(local_path))
+                    try:
+                        os.link(local_path, target)
+                    except OSError:
+                        shutil.copyfile(local_path, target)
+                self._client.log_artifacts(run_id, staging, artifact_path or None)
+            finally:
+                shutil.rmtree(staging, ignore_errors=True)
+        for local_path in local_paths:
+            try:
+                os.remove(local_path)
+            except OSError:
+                pass
+
+
+class MongoBulkBuffer:
+    """
+    Buffer collecting documents per collection to write them with unordered bulk writes. The buffer is flushed if
+    it holds max_size documents or if its oldest document was added more than max_delay seconds ago.
+    """
+
+    def __init__(self, db, max_size=1000, max_delay=1.0):
+        """
+        :param db: Database to write to
+        :param max_size: Number of buffered documents triggering a flush
+        :param max_delay: Time in seconds after which buffered documents are flushed on the next write
+        """
+        self._db = db
+        self._max_size = max_size
+        self._max_delay = max_delay
+        self._collections = OrderedDict()
+        self._size = 0
+        self._oldest = None
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return self._size
+
+    def add(self, collection, _id, document):
+        """
+        Add a document to the buffer. A document with the same _id in the same collection replaces the buffered one.
+        :param collection: Name of the collection
+        :param _id: Id of the document
+        :param document: Json encodable document
+        :return:
+        """
+        with self._lock:
+            documents = self._collections.setdefault(collection, OrderedDict())
+            if _id not in documents:
+                self._size += 1
+            documents[_id] = document
+            if self._oldest is None:
+                self._oldest = time.time()
+            if self._size >= self._max_size or time.time() - self._oldest >= self._max_delay:
+                self.flush()
+
+    def flush(self):
+        """
+        Write all buffered documents. Documents which couldn't be written are put back into the buffer before the
+        error is raised.
+        :return:
+        """
+        with self._lock:
+            collections, self._collections = self._collections, OrderedDict()
+            self._size = 0
+            self._oldest = None
+            chunks = []
+            for collection, documents in collections.items():
+                documents = list(documents.items())
+                chunks.extend((collection, documents[i:i + self._max_size])
+                              for i in range(0, len(documents), self._max_size))
+            for index, (collection, documents) in enumerate(chunks):
+                try:
+                    self._write(self._db[collection], documents)
+                except Exception as e:
+                    if isinstance(e, BulkWriteError):
+                        # All other documents of an unordered bulk write were written
+                        documents = [documents[error["index"]] for error in e.details.get("writeErrors", [])
+                                     if error["code"] != 11000]
+                    unwritten = [(collection, documents)] + chunks[index + 1:]
+                    for c, d in unwritten:
+                        self._requeue(c, d)
+                    logger.error("Writing to mongo_db failed. Requeued {} unwritten documents: {}".format(
+                        sum(len(d) for _, d in unwritten), str(e)))
+                    raise e
+
+    def _requeue(self, collection, documents):
+        documents_ = self._collections.setdefault(collection, OrderedDict())
+        for _id, document in documents:
+            if _id not in documents_:
+                self._size += 1
+            documents_[_id] = document
+        if self._oldest is None and self._size > 0:
+            self._oldest = time.time()
+
+    @staticmethod
+    def _write(collection, documents):
+        # Insert first and only replace the documents which already exist
+        try:
+            collection.bulk_write([InsertOne(document) for _, document in documents], ordered=False)
+        except BulkWriteError as e:
+            errors = e.details.get("writeErrors", [])
+            duplicates = [error for error in errors if error["code"] == 11000]
+            if len(duplicates) > 0:
+                collection.bulk_write([ReplaceOne({"_id": documents[error["index"]][0]}, documents[error["index"]][1],
+                                                  upsert=True) for error in duplicates], ordered=False)
+            if len(duplicates) < len(errors):
+                raise e
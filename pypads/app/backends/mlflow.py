@@ -1,27 +1,35 @@
 import os
 import sys
 from abc import ABCMeta
-from typing import List, Union
+from typing import List, Union, Set
 from uuid import uuid4
 
 import mlflow
 from mlflow.entities import ViewType
+from mlflow.exceptions import MlflowException
+from mlflow.protos.databricks_pb2 import ErrorCode, RESOURCE_DOES_NOT_EXIST
 from mlflow.tracking import MlflowClient, artifact_utils
 from mlflow.tracking.fluent import SEARCH_MAX_RESULTS_PANDAS
 from pymongo import MongoClient
-from pymongo.errors import DuplicateKeyError
+from pymongo.errors import DuplicateKeyError, OperationFailure
 
 from pypads import logger
 from pypads.app.backends.backend import BackendInterface
+from pypads.app.backends.batching import MlflowBatchWriter, MongoBulkBuffer
+from pypads.app.backends.search import LEAF, NOT
 from pypads.app.injections.tracked_object import Artifact
 from pypads.app.misc.inheritance import SuperStop
 from pypads.model.logger_output import FileInfo, MetricMetaModel, ParameterMetaModel, ArtifactMetaModel, TagMetaModel
 from pypads.model.metadata import ModelObject
 from pypads.model.models import ResultType, BaseStorageModel, to_reference, IdReference, PathReference, \
     ExperimentModel, get_reference, RunModel
-from pypads.utils.logging_util import FileFormats, jsonable_encoder, store_tmp_artifact
-from pypads.utils.util import string_to_int, get_run_id
-from pypads.variables import MONGO_URL, MONGO_USER, MONGO_PW, MONGO_DB, mongo_db
+from pypads.utils.logging_util import FileFormats, jsonable_encoder, store_tmp_artifact, write_artifact
+from pypads.utils.util import string_to_int, get_run_id, file_digest
+from pypads.variables import MONGO_URL, MONGO_USER, MONGO_PW, MONGO_DB, mongo_db, async_logging, \
+    mongo_bulk_size, mongo_bulk_delay
+
+# Folder of a run holding the manifests of the files stored by pypads
+MANIFEST_FOLDER = "pypads_manifest"
 
 
 class MLFlowBackend(BackendInterface, metaclass=ABCMeta):
@@ -39,33 +47,106 @@ class MLFlowBackend(BackendInterface, metaclass=ABCMeta):
         # Set the tracking uri
         mlflow.set_tracking_uri(self._uri)
 
+        # Reuse a single client and count the lookups answered by the run cache
+        self._mlf = None
+        self._lookups = {"remote": 0, "saved": 0}
+
+        # Push metrics, params, tags and metadata in the background if configured
+        self._writer = None
+        if pypads.config.get(async_logging, False):
+            self._writer = MlflowBatchWriter(self.mlf, os.path.join(pypads.folder, "spool"))
+            pypads.add_exit_fn(self.flush)
+
     @property
     def mlf(self) -> MlflowClient:
-        return MlflowClient(self.uri)
+        if self._mlf is None:
+            self._mlf = MlflowClient(self.uri)
+        return self._mlf
+
+    @property
+    def lookups(self):
+        """
+        Number of experiment lookups sent to mlflow and number of lookups saved by the run cache.
+        :return:
+        """
+        return dict(self._lookups)
+
+    def _cached_lookup(self, key, fn, *args):
+        """
+        Look up metadata which doesn't change while a run is active. The result is kept in the cache of the active run
+        and therefore dropped when the run ends.
+        :param key: Key in the run cache
+        :param fn: Function doing the remote lookup
+        :param args: Arguments for the function
+        :return:
+        """
+        if mlflow.active_run() is None:
+            self._lookups["remote"] += 1
+            return fn(*args)
+        if self.pypads.cache.run_exists(key):
+            self._lookups["saved"] += 1
+            return self.pypads.cache.run_get(key)
+        self._lookups["remote"] += 1
+        value = fn(*args)
+        if value is not None:
+            self.pypads.cache.run_add(key, value)
+        return value
+
+    @property
+    def writer(self):
+        return self._writer
+
+    def flush(self):
+        """
+        Wait until all entries queued for background writing are pushed to mlflow.
+        :return:
+        """
+        if self._writer is not None:
+            self._writer.flush()
+
+    def _background_run_id(self):
+        """
+        Get the run to which entries can be written in the background. None if we have to write synchronously.
+        :return:
+        """
+        if self._writer is None:
+            return None
+        run_id = get_run_id()
+        if run_id is not None:
+            # Make sure the queue is empty when the run ends
+            self.pypads.api.register_teardown_utility("backend_flush", _flush_backend, order=sys.maxsize - 2)
+        return run_id
 
     def list_run_infos(self, experiment_id, run_view_type=ViewType.ALL):
         return self.mlf.list_run_infos(experiment_id=experiment_id, run_view_type=run_view_type)
 
     def get_metric_history(self, run_id, key):
+        self.flush()
         return self.mlf.get_metric_history(run_id, key)
 
     def list_experiments(self, view_type=ViewType.ALL):
         return self.mlf.list_experiments(view_type=view_type)
 
     def get_run(self, run_id):
+        self.flush()
         return mlflow.get_run(run_id)
 
     def get_experiment(self, experiment_id):
-        return mlflow.get_experiment(experiment_id)
+        return self._cached_lookup(f"experiment_{experiment_id}", mlflow.get_experiment, experiment_id)
 
     def get_experiment_by_name(self, name):
-        return mlflow.get_experiment_by_name(name)
+        return self._cached_lookup(f"experiment_name_{name}", mlflow.get_experiment_by_name, name)
 
     def delete_experiment(self, experiment_id):
+        if mlflow.active_run() is not None:
+            experiment = self.pypads.cache.run_pop(f"experiment_{experiment_id}")
+            if experiment is not None:
+                self.pypads.cache.run_pop(f"experiment_name_{experiment.name}")
         return mlflow.delete_experiment(experiment_id)
 
     def search_runs(self, experiment_ids, filter_string="", run_view_type=ViewType.ACTIVE_ONLY,
                     max_results=SEARCH_MAX_RESULTS_PANDAS, order_by=None):
+        self.flush()
         return mlflow.search_runs(experiment_ids, filter_string=filter_string, run_view_type=run_view_type,
                                   max_results=max_results, order_by=order_by)
 
@@ -79,9 +160,11 @@ class MLFlowBackend(BackendInterface, metaclass=ABCMeta):
         return mlflow.delete_run(run_id)
 
     def download_artifacts(self, run_id, relative_path, dst_path=None):
+        self.flush()
         return self.mlf.download_artifacts(run_id, relative_path, dst_path=dst_path)
 
     def list_files(self, run_id, path=None) -> List[FileInfo]:
+        self.flush()
         return [FileInfo(is_dir=a.is_dir, path=a.path, file_size=a.file_size) for a in
                 self.mlf.list_artifacts(run_id, path=path)]
 
@@ -89,31 +172,99 @@ class MLFlowBackend(BackendInterface, metaclass=ABCMeta):
         return mlflow.get_artifact_uri(artifact_path=artifact_path)
 
     def log_artifact(self, meta, local_path):
-        file_size = os.path.getsize(os.fspath(local_path))
-        meta.file_size = file_size
         path = self._log_artifact(local_path=local_path, artifact_path=meta.data)
+        file_info = self.manifest.get(path)
+        meta.file_size = file_info.file_size if file_info else os.path.getsize(os.fspath(local_path))
+        meta.digest = file_info.digest if file_info else None
         meta.data = path
-        # for file_info in self.list_files(run_id=get_run_id(), path=os.path.dirname(path)):
-        #     if file_info.path == os.path.basename(path):
-        #         meta.file_size = file_info.file_size
-        #         break
         self.log_json(meta, uuid4())
         return path
 
-    def _log_artifact(self, local_path, artifact_path=""):
-        mlflow.log_artifact(local_path, artifact_path)
+    def _log_artifact(self, local_path, artifact_path="", describe=True):
         path = os.path.join(artifact_path if artifact_path else "", local_path.rsplit(os.sep, 1)[1])
+        if describe:
+            self._describe(path, local_path)
+        mlflow.log_artifact(local_path, artifact_path)
         return path
 
-    def _log_mem_artifact(self, path: str, artifact, write_format, preserveFolder=True):
-        tmp_path = store_tmp_artifact(path, artifact, write_format=write_format)
+    @property
+    def manifest(self) -> dict:
+        """
+        Manifest of the files stored for the active run in this session. It maps the relative paths of the files to
+        their FileInfo. The manifest is stored once at the end of the run.
+        :return:
+        """
+        if get_run_id() is None:
+            return {}
+        if not self.pypads.cache.run_exists("artifact_manifest"):
+            self.pypads.cache.run_add("artifact_manifest", {})
+            self.pypads.api.register_teardown_utility("artifact_manifest", _store_manifest, order=sys.maxsize - 3)
+        return self.pypads.cache.run_get("artifact_manifest")
+
+    def _describe(self, path, local_path):
+        """
+        Add a file to the manifest by taking its size and digest from the local copy before uploading it.
+        :param path: Relative path of the file in the artifact store of the run
+        :param local_path: Path of the local copy
+        :return:
+        """
+        if get_run_id() is not None:
+            self.manifest[path] = FileInfo(is_dir=False, path=path, file_size=os.path.getsize(local_path),
+                                           digest=file_digest(local_path))
+
+    def get_manifest(self, run_id) -> List[FileInfo]:
+        """
+        Get the stored files of a run with their sizes and digests without scanning the artifact folders.
+        :param run_id: Id of the run
+        :return:
+        """
+        manifest = {}
+        for file_info in self.list_files(run_id, path=MANIFEST_FOLDER):
+            for entry in self.load_artifact_data(run_id, file_info.path) or []:
+                manifest[entry["path"]] = FileInfo(**entry)
+        if run_id == get_run_id():
+            manifest.update(self.manifest)
+        return list(manifest.values())
+
+    def _log_mem_artifact(self, path: str, artifact, write_format, preserveFolder=True, background=False):
+        artifact_path = ""
         if preserveFolder:
-            artifact_path = ""
             splits = path.rsplit(os.sep, 1)
             if len(splits) > 1:
                 artifact_path = splits[0]
-            return self._log_artifact(tmp_path, artifact_path=artifact_path)
-        return self._log_artifact(tmp_path)
+
+        run_id = self._background_run_id() if background else None
+        if run_id is not None:
+            # Spool the artifact to disk and let the writer upload it later on
+            local_path = write_artifact(self._writer.spool_path(run_id, path), artifact, write_format=write_format)
+            path = os.path.join(artifact_path, local_path.rsplit(os.sep, 1)[1])
+            self._describe(path, local_path)
+            self._writer.log_artifact(run_id, local_path, artifact_path=artifact_path)
+            return path
+
+        tmp_path = store_tmp_artifact(path, artifact, write_format=write_format)
+        return self._log_artifact(tmp_path, artifact_path=artifact_path)
+
+    def _log_metric(self, key, value, step=0):
+        run_id = self._background_run_id()
+        if run_id is not None:
+            self._writer.log_metric(run_id, key, value, step=step)
+        else:
+            mlflow.log_metric(key, value, step=step)
+
+    def _log_param(self, key, value):
+        run_id = self._background_run_id()
+        if run_id is not None:
+            self._writer.log_param(run_id, key, value)
+        else:
+            mlflow.log_param(key, value)
+
+    def _set_tag(self, key, value):
+        run_id = self._background_run_id()
+        if run_id is not None:
+            self._writer.set_tag(run_id, key, value)
+        else:
+            mlflow.set_tag(key, value)
 
     def set_experiment_tag(self, experiment_id, key, value):
         return self.mlf.set_experiment_tag(experiment_id, key, value)
@@ -127,23 +278,23 @@ class MLFlowBackend(BackendInterface, metaclass=ABCMeta):
         if rt == ResultType.metric:
             obj: MetricMetaModel
             stored_meta = self.log_json(obj, obj.uid)
-            mlflow.log_metric(obj.name, obj.data)
+            self._log_metric(obj.name, obj.data)
             return stored_meta
 
         elif rt == ResultType.parameter:
             obj: ParameterMetaModel
             stored_meta = self.log_json(obj, obj.uid)
-            mlflow.log_param(obj.name, obj.data)
+            self._log_param(obj.name, obj.data)
             return stored_meta
 
         elif rt == ResultType.artifact:
             obj: Union[Artifact, ArtifactMetaModel]
             path = self._log_mem_artifact(path=obj.data, artifact=obj.content(), write_format=obj.file_format)
-            # Todo maybe don't store filesize because of performance (querying for file after storing takes time)
-            for file_info in self.list_files(run_id=get_run_id(), path=os.path.dirname(path)):
-                if file_info.path == os.path.basename(path):
-                    obj.file_size = file_info.file_size
-                    break
+            # Size and digest were taken from the local file before uploading it
+            file_info = self.manifest.get(path)
+            if file_info:
+                obj.file_size = file_info.file_size
+                obj.digest = file_info.digest
             obj.data = path
             stored_meta = self.log_json(obj, obj.uid)
             return stored_meta
@@ -151,7 +302,7 @@ class MLFlowBackend(BackendInterface, metaclass=ABCMeta):
         elif rt == ResultType.tag:
             obj: TagMetaModel
             stored_meta = self.log_json(obj, obj.uid)
-            mlflow.set_tag(obj.name, obj.data)
+            self._set_tag(obj.name, obj.data)
             return stored_meta
 
         else:
@@ -170,12 +321,13 @@ class MLFlowBackend(BackendInterface, metaclass=ABCMeta):
             return obj.dict(force=False, by_alias=True)
         if uid is None:
             uid = obj.uid
+        if isinstance(obj, ModelObject):
+            data, json_data = obj.dict_and_json(force=False, by_alias=True)
+        else:
+            data, json_data = obj.dict(by_alias=True), obj.json(by_alias=True)
         return to_reference(
-            {**obj.dict(by_alias=True),
-             **{"path": self._log_mem_artifact(str(uid),
-                                               obj.json(force=False, by_alias=True)
-                                               if isinstance(obj, ModelObject) else obj.json(by_alias=True),
-                                               write_format=FileFormats.json)}})
+            {**data, **{"path": self._log_mem_artifact(str(uid), json_data, write_format=FileFormats.json,
+                                                       background=True)}})
 
     def get(self, uid, storage_type: Union[str, ResultType], experiment_name=None, experiment_id=None, run_id=None,
             search_dict=None):
@@ -206,13 +358,55 @@ class MLFlowBackend(BackendInterface, metaclass=ABCMeta):
         :return:
         """
         # TODO search by uid instead
-        return self.load_artifact_data(run_id=reference.run.uid,
-                                       path=reference.path if isinstance(reference, PathReference) else reference.id)
+        if isinstance(reference, PathReference):
+            return self.load_artifact_data(run_id=reference.run.uid, path=reference.path)
+        ids = reference.ids
+        for _id in ids[:-1]:
+            # Entries of old stores are stored by their legacy id
+            try:
+                data = self.load_artifact_data(run_id=reference.run.uid, path=_id)
+            except Exception as e:
+                if not _is_missing_artifact(e):
+                    raise e
+            else:
+                # Local stores don't download the artifact and read nothing if it is missing
+                if data is not None:
+                    return data
+        return self.load_artifact_data(run_id=reference.run.uid, path=ids[-1])
 
     def get_by_path(self, run_id, path):
         return self.load_artifact_data(run_id=run_id, path=path)
 
 
+def _is_missing_artifact(e):
+    """
+    Check if an error was raised by mlflow for an artifact which doesn't exist. Newer versions of mlflow raise an
+    MlflowException listing the errors of the failed downloads instead of the error of the artifact repository.
+    :param e: Raised error
+    :return: True if the artifact wasn't found
+    """
+    if isinstance(e, FileNotFoundError):
+        return True
+    if isinstance(e, MlflowException):
+        return e.error_code == ErrorCode.Name(RESOURCE_DOES_NOT_EXIST) or FileNotFoundError.__name__ in e.message
+    return False
+
+
+def _store_manifest(pads, *args, **kwargs):
+    manifest = pads.cache.run_get("artifact_manifest")
+    if manifest:
+        tmp_path = store_tmp_artifact(os.path.join(MANIFEST_FOLDER, str(uuid4())),
+                                      [jsonable_encoder(f.__dict__) for f in manifest.values()],
+                                      write_format=FileFormats.json)
+        pads.backend._log_artifact(tmp_path, artifact_path=MANIFEST_FOLDER, describe=False)
+
+
+def _flush_backend(pads, *args, _pypads_env=None, **kwargs):
+    pads.backend.flush()
+    if _pypads_env is not None and pads.backend.writer is not None:
+        pads.backend.writer.clear(_pypads_env.run_id)
+
+
 class LocalMlFlowBackend(MLFlowBackend):
 
     def list(self, storage_type: Union[str, ResultType], experiment_name=None, experiment_id=None, run_id=None,
@@ -245,9 +439,11 @@ class LocalMlFlowBackend(MLFlowBackend):
         return self._managed_result_git
 
     def download_tmp_artifacts(self, run_id, relative_path):
+        self.flush()
         return artifact_utils.get_artifact_uri(run_id=run_id, artifact_path=relative_path)
 
     def download_artifacts(self, run_id, relative_path, dst_path=None):
+        self.flush()
         local_location = os.path.join(dst_path, relative_path)
         if os.path.exists(local_location):  # TODO check file digest or something similar??
             logger.debug(
@@ -335,22 +531,51 @@ class RemoteMlFlowBackend(MLFlowBackend):
         super().__init__(uri, pypads)
 
 
+def _to_aggregation_expression(expression):
+    """
+    Convert the expression of a run search plan to an aggregation expression on the indices of the leaves a run
+    matched.
+    :param expression: Expression of a RunSearchPlan
+    :return: Aggregation expression
+    """
+    operator, operand = expression
+    if operator == LEAF:
+        return {"$in": [operand, "$leaves"]}
+    if operator == NOT:
+        return {"$not": [_to_aggregation_expression(operand)]}
+    return {operator: [_to_aggregation_expression(e) for e in operand]}
+
+
 class MongoSupportMixin(BackendInterface, SuperStop, metaclass=ABCMeta):
     def __init__(self, *args, **kwargs):
         self._mongo_client = MongoClient(os.environ[MONGO_URL], username=os.environ[MONGO_USER],
                                          password=os.environ[MONGO_PW], authSource=os.environ[MONGO_DB])
         self._db = self._mongo_client[os.environ[MONGO_DB]]
         super().__init__(*args, **kwargs)
+        self._buffer = None
+        # $unionWith needs mongo_db 4.4 or newer
+        self._union_supported = True
+        if self.pypads.config.get(mongo_bulk_size, 0) > 0:
+            self._buffer = MongoBulkBuffer(self._db, max_size=self.pypads.config[mongo_bulk_size],
+                                           max_delay=self.pypads.config.get(mongo_bulk_delay, 1.0))
+            self.pypads.add_exit_fn(self.flush)
+
+    def flush(self):
+        """
+        Write all buffered entries to mongo_db.
+        :return:
+        """
+        if self._buffer is not None:
+            self._buffer.flush()
+        super().flush()
 
     @staticmethod
     def _path_to_id(path, run_id=None):
         from pypads.app.pypads import get_current_pads
+        pads = get_current_pads()
         if run_id is None:
-            run = get_current_pads().api.active_run()
-            run_id = run.info.run_id
-            experiment_name = mlflow.get_experiment(mlflow.active_run().info.experiment_id).name
-        else:
-            experiment_name = mlflow.get_experiment(mlflow.active_run().info.experiment_id).name
+            run_id = pads.api.active_run().info.run_id
+        experiment_name = pads.api.active_experiment().name
         return os.path.sep.join([experiment_name, run_id, path])
 
     def log_json(self, entry, uid=None):
@@ -375,6 +600,12 @@ class MongoSupportMixin(BackendInterface, SuperStop, metaclass=ABCMeta):
         entry["_id"] = _id
         storage_type = entry["storage_type"].value if isinstance(entry["storage_type"], ResultType) else entry[
             "storage_type"]
+        if self._buffer is not None:
+            if get_run_id() is not None:
+                # Make sure the buffer is written when the run ends
+                self.pypads.api.register_teardown_utility("backend_flush", _flush_backend, order=sys.maxsize - 2)
+            self._buffer.add(storage_type, _id, jsonable_encoder(entry))
+            return reference
         try:
             try:
                 self._db[storage_type].insert_one(jsonable_encoder(entry))
@@ -390,9 +621,10 @@ class MongoSupportMixin(BackendInterface, SuperStop, metaclass=ABCMeta):
         Get json stored for a certain run.
         :return:
         """
+        self.flush()
         return self._db[reference.storage_type if isinstance(reference.storage_type,
                                                              str) else reference.storage_type.value].find_one(
-            {"_id": reference.id})
+            {"_id": {"$in": reference.ids}})
 
     def list(self, storage_type: Union[str, ResultType], experiment_name=None, experiment_id=None, run_id=None,
              search_dict=None):
@@ -405,10 +637,51 @@ class MongoSupportMixin(BackendInterface, SuperStop, metaclass=ABCMeta):
         if run_id:
             search_dict["run.uid"] = run_id
         chosen_columns = search_dict.pop('chosen_columns', None)
+        self.flush()
         return self._get_entry_generator(
             self._db[storage_type if isinstance(storage_type, str) else storage_type.value].find(search_dict,
                                                                                                  chosen_columns))
 
+    def search_run_ids(self, plan) -> Set[str]:
+        """
+        Evaluate a compiled run search in a single aggregation. The entries matching the leaves are collected from
+        their collections, grouped by run and the runs are filtered by the leaves they matched. Databases not
+        supporting the aggregation are searched leaf by leaf.
+        :param plan: RunSearchPlan
+        :return: Set of run ids
+        """
+        if not self._union_supported:
+            return super().search_run_ids(plan)
+        branches = [(storage_type, search_filter, index) for index, (storage_type, search_filter) in
+                    enumerate(plan.leaves)]
+        if plan.needs_all_runs:
+            # Runs matching no leaf at all are needed for negations
+            branches.append((ResultType.tag.value, plan.all_runs_filter, -1))
+        if len(branches) == 0:
+            return set()
+
+        def _branch(search_filter, index):
+            return [{"$match": search_filter},
+                    {"$project": {"_id": 0, "run": "$run.uid", "leaf": {"$literal": index}}}]
+
+        (collection, search_filter, index), others = branches[0], branches[1:]
+        pipeline = _branch(search_filter, index)
+        for storage_type, search_filter, index in others:
+            pipeline.append({"$unionWith": {"coll": storage_type, "pipeline": _branch(search_filter, index)}})
+        pipeline.extend([{"$group": {"_id": "$run", "leaves": {"$addToSet": "$leaf"}}},
+                         {"$match": {"_id": {"$ne": None}, "$expr": _to_aggregation_expression(plan.expression)}},
+                         {"$project": {"_id": 1}}])
+        self.flush()
+        try:
+            return {entry["_id"] for entry in self._db[collection].aggregate(pipeline)}
+        except (OperationFailure, NotImplementedError) as e:
+            logger.warning("Couldn't search runs in a single aggregation. Searching every part of the search on "
+                           "its own instead: {}".format(str(e)))
+            # 40324 is an unknown pipeline stage
+            if isinstance(e, NotImplementedError) or e.code == 40324:
+                self._union_supported = False
+            return super().search_run_ids(plan)
+
     def get(self, uid, storage_type: Union[str, ResultType], experiment_name=None, experiment_id=None, run_id=None,
             search_dict=None):
         if search_dict is None:
@@ -422,9 +695,10 @@ class MongoSupportMixin(BackendInterface, SuperStop, metaclass=ABCMeta):
         if run_id:
             search_dict["run.uid"] = run_id
         if all([a is not None for a in [experiment_id, run_id]]) is not None:
-            search_dict["_id"] = IdReference(uid=uid, storage_type=storage_type, experiment_name=experiment_name,
-                                             experiment_id=experiment_id, run_id=run_id,
-                                             backend_uri=self.uri).id
+            reference = IdReference(uid=uid, storage_type=storage_type, experiment_name=experiment_name,
+                                    experiment_id=experiment_id, run_id=run_id, backend_uri=self.uri)
+            search_dict["_id"] = {"$in": reference.ids}
+        self.flush()
         return self._db[storage_type if isinstance(storage_type, str) else storage_type.value].find_one(search_dict)
 
 
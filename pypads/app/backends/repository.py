@@ -57,9 +57,21 @@ class Repository:
         if isinstance(self.pads.backend, MongoSupportMixin):
             return self.pads.backend.get_json(self.repo_reference(uid)) is not None
         else:
-            return len(self.pads.backend.search_runs(experiment_ids=self.id,
-                                                     filter_string="tags.`pypads_unique_uid` = \"" +
-                                                                   self.repo_reference(uid).id + "\"")) > 0
+            return len(self.search_object_runs(self.repo_reference(uid))) > 0
+
+    def search_object_runs(self, reference: IdReference):
+        """
+        Search the runs storing the object with given reference.
+        :param reference: Reference of the object
+        :return: Runs tagged with the id of the object. Runs of old repositories are tagged with the legacy id.
+        """
+        runs = None
+        for _id in reference.ids:
+            runs = self.pads.backend.search_runs(experiment_ids=self.id,
+                                                 filter_string="tags.`pypads_unique_uid` = \"" + _id + "\"")
+            if len(runs) > 0:
+                break
+        return runs
 
     def repo_reference(self, uid, run_id=-1):
         """
@@ -152,9 +164,7 @@ class RepositoryObject:
         # if self._run is None:
         # UID is given. Check for existence.
         if self._run is None:
-            runs = self.pads.backend.search_runs(experiment_ids=self.repository.id,
-                                                 filter_string="tags.`pypads_unique_uid` = \"" + self.repo_reference.id
-                                                               + "\"")
+            runs = self.repository.search_object_runs(self.repo_reference)
 
             # If exists set the run_id to the existing one instead
             if len(runs) > 0:
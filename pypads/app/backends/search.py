@@ -0,0 +1,163 @@
+import json
+from enum import Enum
+from typing import List, Tuple, Dict, Set
+
+from pypads.model.models import ResultType
+
+# Names of the boolean operators of a run search. They are compared case insensitive.
+OR = "$or"
+AND = "$and"
+NOT = "$not"
+LEAF = "leaf"
+
+
+class RunSearchPlan:
+    """
+    Compiled boolean search for run ids. Every leaf of the search is a filter on the collection of one storage type.
+    The expression combines the leaves by their index. Backends evaluate the whole plan at once instead of querying
+    and combining the run ids of every part of the search one after another.
+    """
+
+    def __init__(self, leaves: List[Tuple[str, dict]], expression, experiment_name=None):
+        """
+        :param leaves: List of storage type and filter of the entries to look for
+        :param expression: Nested tuples of (LEAF, index), (OR, [...]), (AND, [...]) and (NOT, expression)
+        :param experiment_name: Name of the experiment the runs have to be part of
+        """
+        self._leaves = leaves
+        self._expression = expression
+        self._experiment_name = experiment_name
+
+    @property
+    def leaves(self):
+        return self._leaves
+
+    @property
+    def expression(self):
+        return self._expression
+
+    @property
+    def experiment_name(self):
+        return self._experiment_name
+
+    @property
+    def needs_all_runs(self):
+        """
+        A negation needs all runs of the experiment to select the ones not matching.
+        """
+        return _contains_not(self._expression)
+
+    @property
+    def all_runs_filter(self):
+        """
+        Filter on the tags selecting the runs a negation is evaluated on.
+        """
+        return {} if self._experiment_name is None else {"experiment.name": self._experiment_name}
+
+    @property
+    def key(self):
+        """
+        Normalized representation of the plan to cache its results by. It doesn't depend on the order of the leaves
+        or of the operands of $or and $and.
+        """
+        return json.dumps([self._experiment_name, _canonical(self._expression, self._leaves)])
+
+    def evaluate(self, matched: Dict[int, Set[str]], all_runs: Set[str] = None) -> Set[str]:
+        """
+        Evaluate the expression on the run ids matched by the leaves.
+        :param matched: Run ids by the index of the leaf they matched
+        :param all_runs: All runs to evaluate negations on. The runs matched by any leaf are always included.
+        :return: Set of run ids
+        """
+        universe = set().union(*matched.values()) if matched else set()
+        if all_runs is not None:
+            universe |= all_runs
+        return _evaluate(self._expression, matched, universe)
+
+
+def _canonical(expression, leaves):
+    operator, operand = expression
+    if operator == LEAF:
+        return json.dumps(leaves[operand], sort_keys=True, default=str)
+    if operator in (OR, AND):
+        return [operator, sorted([_canonical(e, leaves) for e in operand], key=json.dumps)]
+    return [operator, _canonical(operand, leaves)]
+
+
+def _contains_not(expression):
+    operator, operand = expression
+    if operator == NOT:
+        return True
+    if operator in (OR, AND):
+        return any(_contains_not(e) for e in operand)
+    return False
+
+
+def _evaluate(expression, matched, universe):
+    operator, operand = expression
+    if operator == LEAF:
+        return matched.get(operand, set())
+    if operator == OR:
+        return set().union(*[_evaluate(e, matched, universe) for e in operand])
+    if operator == AND:
+        results = [_evaluate(e, matched, universe) for e in operand]
+        return set.intersection(*results) if results else set(universe)
+    return universe - _evaluate(operand, matched, universe)
+
+
+def _operator(key):
+    if isinstance(key, Enum):
+        key = key.value
+    if isinstance(key, str) and key.lower() in (OR, AND, NOT):
+        return key.lower()
+    return None
+
+
+def compile_run_search(search_dict, experiment_name=None, to_filter=None) -> RunSearchPlan:
+    """
+    Compile a search dict into a plan. A search dict is either a leaf containing a storage_type and the filter for the
+    entries of that type or a dict of operators ($or, $and or $not as string or OperatorType) mapping to the nested
+    search dicts. Multiple operators in one dict have to hold all. Equal leaves are only looked up once.
+    :param search_dict: Search dict to compile
+    :param experiment_name: Name of the experiment the runs have to be part of
+    :param to_filter: Function converting the remaining entries of a leaf to the filter of the backend
+    :return: RunSearchPlan
+    """
+    leaves = []
+    indices = {}
+
+    def _leaf(search):
+        search = dict(search)
+        storage_type = search.pop("storage_type")
+        storage_type = storage_type.value if isinstance(storage_type, ResultType) else storage_type
+        search.pop("chosen_columns", None)
+        search_filter = to_filter(search) if to_filter is not None else search
+        if experiment_name is not None:
+            search_filter["experiment.name"] = experiment_name
+        leaf = (storage_type, search_filter)
+        key = json.dumps(leaf, sort_keys=True, default=str)
+        if key not in indices:
+            indices[key] = len(leaves)
+            leaves.append(leaf)
+        return LEAF, indices[key]
+
+    def _combine(operator, operands):
+        return operands[0] if len(operands) == 1 else (operator, operands)
+
+    def _compile(search):
+        if "storage_type" in search:
+            return _leaf(search)
+        operands = []
+        for key, queries in search.items():
+            operator = _operator(key)
+            if operator in (OR, AND) and isinstance(queries, list):
+                operands.append(_combine(operator, [_compile(q) for q in queries]))
+            elif operator == NOT and isinstance(queries, dict):
+                operands.append((NOT, _compile(queries)))
+            else:
+                raise ValueError("Invalid run search {}: {} can't be applied on {}.".format(search, key, queries))
+        if len(operands) == 0:
+            raise ValueError("Invalid run search {}: A storage_type or an operator is needed.".format(search))
+        return _combine(AND, operands)
+
+    return RunSearchPlan(leaves, _compile(search_dict), experiment_name=experiment_name)
@@ -1,7 +1,7 @@
 import ast
 import atexit
 import importlib
-import pkgutil
+import os
 import signal
 from typing import List, Union, Callable
 
@@ -13,7 +13,8 @@ from pypads.app.actuators import ActuatorPluginManager, PyPadsActuators
 from pypads.app.api import ApiPluginManager, PyPadsApi
 from pypads.app.backends.repository import SchemaRepository, LoggerRepository, LibraryRepository, MappingRepository
 from pypads.app.decorators import DecoratorPluginManager, PyPadsDecorators
-from pypads.app.misc.caches import PypadsCache
+from pypads.app.misc.caches import PypadsCache, HostCache
+from pypads.app.plugins import discover_plugins
 from pypads.app.results import ResultPluginManager, results, PyPadsResults
 from pypads.app.validators import ValidatorPluginManager, validators, PyPadsValidators
 from pypads.arguments import PYPADS_FOLDER, PYPADS_URI, PARSED_CONFIG
@@ -21,15 +22,18 @@ from pypads.bindings.events import FunctionRegistry
 from pypads.bindings.hooks import HookRegistry
 from pypads.importext.mappings import MappingRegistry, MappingCollection
 from pypads.importext.pypads_import import extend_import_module, duck_punch_loader
+from pypads.importext.wrapping.base_wrapper import Context
 from pypads.importext.wrapping.wrapping import WrapManager
 from pypads.injections.analysis.call_tracker import CallTracker
 # from pypads.injections.loggers.mlflow.mlflow_autolog import MlFlowAutoRSF
 from pypads.injections.setup.git import IGitRSF
 from pypads.injections.setup.hardware import ISystemRSF, IRamRSF, ICpuRSF, IDiskRSF, IPidRSF, ISocketInfoRSF, \
-    IMacAddressRSF
+    IMacAddressRSF, IResourceRSF
 from pypads.injections.setup.misc_setup import DependencyRSF, LoguruRSF, StdOutRSF
 from pypads.variables import CONFIG_NAME, DEFAULT_EXPERIMENT_NAME, track_sub_processes, recursion_identity, \
-    recursion_depth, log_on_failure, include_default_mappings, mongo_db
+    recursion_depth, log_on_failure, include_default_mappings, mongo_db, async_logging, \
+    mongo_bulk_size, mongo_bulk_delay, keep_finished_calls, hook_sampling, plugin_manifest, setup_workers, \
+    resource_sampling_period, warm_sub_processes, run_search_cache_ttl, release_call_env
 
 tracking_active = None
 
@@ -70,12 +74,26 @@ DEFAULT_CONFIG = {**{
     log_on_failure: True,  # Log the stdout / stderr output when the execution of the experiment failed
     include_default_mappings: True,  # Include the default mappings additionally to the passed mapping if a mapping
     # is passed
-    mongo_db: True  # Use a mongo_db endpoint
+    mongo_db: True,  # Use a mongo_db endpoint
+    mongo_bulk_size: 0,  # Buffer entries for mongo_db and write them in bulk. 0 writes every entry directly
+    mongo_bulk_delay: 1.0,  # Maximal time in seconds an entry is buffered before it is written on the next log
+    async_logging: False,  # Push metrics, params, tags and metadata to the backend in a background thread
+    keep_finished_calls: True,  # Keep the objects of finished calls. If disabled only the call counters are kept
+    hook_sampling: {},  # Sampling policies by event name e.g. {"pipeline": {"every": 10, "first": 100, "probability":
+    # 0.5, "rate": 5}}. Calls which are not sampled aren't logged by the loggers of the event
+    plugin_manifest: True,  # Cache the discovered plugins in the pypads folder until installed packages change. This
+    # has to be set in the config file as plugins are discovered on import
+    setup_workers: 0,  # Number of threads running concurrent run setups. 0 runs all setups one after another
+    resource_sampling_period: 1.0,  # Time in seconds between two samples of the resources used by the process tree
+    warm_sub_processes: True,  # Set up pypads once per joblib worker on its start instead of on its first task
+    run_search_cache_ttl: 0,  # Time in seconds the run ids found by a search are cached. 0 disables the cache
+    release_call_env: True  # Only keep weak references and fingerprints of the arguments and results of finished
+    # calls in the environments delayed loggers keep until the end of the run
 }, **PARSED_CONFIG}
 
 DEFAULT_SETUP_FNS = {DependencyRSF(), LoguruRSF(), StdOutRSF(), IGitRSF(_pypads_timeout=3),
                      ISystemRSF(), IRamRSF(), ICpuRSF(),
-                     IDiskRSF(), IPidRSF(), ISocketInfoRSF(), IMacAddressRSF()}
+                     IDiskRSF(), IPidRSF(), ISocketInfoRSF(), IMacAddressRSF(), IResourceRSF()}
 
 # List of exit functions already called. This is used to stop multiple execution on SIGNAL and atexit etc.
 executed_exit_fns = set()
@@ -135,6 +153,9 @@ class PyPads:
         # Init CallTracker
         self._call_tracker = CallTracker(self)
 
+        # Cache of host static information. This is initialized on first use.
+        self._host_cache = None
+
         # Init cache
         self._cache = pre_initialized_cache if pre_initialized_cache else PypadsCache()
 
@@ -172,7 +193,8 @@ class PyPads:
             # Temporarily disabling pypads_onto
             disable_plugins = ['pypads_onto']
         for name, plugin in discovered_plugins.items():
-            if name not in disable_plugins:
+            # Plugins can be disabled by their plugin, module or distribution name
+            if not plugin.names.intersection(disable_plugins):
                 plugin.activate(self, *args, **kwargs)
 
         # Init mapping registry and repository
@@ -360,6 +382,16 @@ class PyPads:
         """
         return self._cache.get("folder")
 
+    @property
+    def host_cache(self) -> HostCache:
+        """
+        Return the cache holding host static information like installed packages and hardware across runs.
+        :return:
+        """
+        if self._host_cache is None:
+            self._host_cache = HostCache(os.path.join(self.folder, "cache", "host"))
+        return self._host_cache
+
     @property
     def config(self):
         """
@@ -398,6 +430,9 @@ class PyPads:
             self.api.register_setup_utility("config_persist", set_config)
         self._cache.add("config", value)
 
+        # Compiled hook chains depend on the config (e.g. the sampling policies)
+        Context.hook_version += 1
+
     @property
     def mapping_registry(self):
         """
@@ -717,9 +752,6 @@ class PyPads:
 
 
 # --- Pypads Plugins ---
-discovered_plugins = {
-    name: importlib.import_module(name)
-    for finder, name, ispkg
-    in pkgutil.iter_modules()
-    if name.startswith('pypads_')
-}
+# Plugins are discovered through their entry points and only imported on activation
+discovered_plugins = discover_plugins(
+    manifest=os.path.join(PYPADS_FOLDER, "cache", "plugins.json") if DEFAULT_CONFIG[plugin_manifest] else None)
@@ -22,6 +22,7 @@ class FunctionReference(ModelObject):
                          **kwargs)
         self._real_context = None
         self._function_type = None
+        self._hook_chain = None
 
         if self.is_special_wrapped():
             try:
@@ -1,7 +1,10 @@
 import inspect
+import sys
 import time
 import traceback
+import weakref
 from abc import abstractmethod, ABCMeta
+from enum import Enum
 from typing import Type, List, Callable, Optional
 
 import mlflow
@@ -19,6 +22,7 @@ from pypads.model.logger_model import LoggerModel
 from pypads.model.logger_output import OutputModel
 from pypads.model.mixins import ProvenanceMixin, get_library_descriptor
 from pypads.utils.util import persistent_hash
+from pypads.variables import release_call_env
 
 
 class OriginalExecutor(FunctionHolderMixin, TimedCallableMixin):
@@ -39,6 +43,103 @@ def env_cache(obj):
     return "env_" + str(id(obj))
 
 
+# Entries of a cached environment holding the values a logged function was called with or returned
+RELEASED_ENV_KEYS = ("ctx", "_args", "_kwargs", "_pypads_result", "_return")
+
+# Types of values which are kept as they are in a released environment
+_kept_types = (type(None), bool, int, float, complex, str, bytes, Enum)
+
+
+class ReleasedValue:
+    """
+    Placeholder for a value of the environment of a finished logger call. The value itself is only referenced weakly
+    if possible. A fingerprint of it stays available after it was collected.
+    """
+    __slots__ = ("_ref", "type", "id", "shape", "dtype", "nbytes", "hash")
+
+    def __init__(self, value):
+        try:
+            self._ref = weakref.ref(value)
+        except TypeError:
+            self._ref = None
+        self.type = type(value).__name__
+        self.id = id(value)
+        self.shape = getattr(value, "shape", None)
+        dtype = getattr(value, "dtype", None)
+        self.dtype = None if dtype is None else str(dtype)
+        nbytes = getattr(value, "nbytes", None)
+        self.nbytes = nbytes if isinstance(nbytes, int) else sys.getsizeof(value)
+        try:
+            self.hash = hash(value)
+        except TypeError:
+            self.hash = None
+
+    def get(self):
+        """
+        Get the value if it is still alive.
+        :return: Value or None
+        """
+        return None if self._ref is None else self._ref()
+
+    def __repr__(self):
+        return "ReleasedValue(type={}, id={}, shape={}, dtype={}, nbytes={})".format(self.type, self.id, self.shape,
+                                                                                    self.dtype, self.nbytes)
+
+
+def _release(value, depth=1):
+    if isinstance(value, _kept_types):
+        return value
+    if depth > 0 and type(value) in (tuple, list):
+        return type(value)(_release(v, depth - 1) for v in value)
+    if depth > 0 and type(value) is dict:
+        return {k: _release(v, depth - 1) for k, v in value.items()}
+    return ReleasedValue(value)
+
+
+def release_env_cache(pads, obj):
+    """
+    Replace the arguments, results and context of a finished call in its cached environment by ReleasedValues. Loggers
+    keeping their environment until the end of the run don't keep these values alive this way.
+    :param pads: PyPads app
+    :param obj: Object the environment is cached for
+    :return:
+    """
+    key = env_cache(obj)
+    if pads.config.get(release_call_env, True) and pads.cache.run_exists(key):
+        environment = pads.cache.run_get(key)
+        pads.cache.run_add(key, {k: _release(v) if k in RELEASED_ENV_KEYS else v for k, v in environment.items()})
+
+
+# Generated output holder classes by output schema class
+_output_holder_classes = {}
+
+# Default output schema classes by tracked object class
+_default_output_classes = {}
+
+
+def output_holder_class(schema_class: Type[OutputModel]) -> Type[LoggerOutput]:
+    """
+    Get the class holding the outputs of a logger with the given output schema. The class and the library descriptor
+    of the schema are only created once per schema.
+    :param schema_class: Output schema class of the logger
+    :return: LoggerOutput class
+    """
+    if schema_class not in _output_holder_classes:
+        lib_model = get_library_descriptor(schema_class)
+
+        class OutputModelHolder(LoggerOutput):
+
+            def __init__(self, _pypads_env, *args, _logger_call=None, **kwargs):
+                super().__init__(_pypads_env, _logger_call=_logger_call, lib_model=lib_model, **kwargs)
+
+            @classmethod
+            def get_model_cls(cls) -> Type[BaseModel]:
+                return schema_class
+
+        _output_holder_classes[schema_class] = OutputModelHolder
+    return _output_holder_classes[schema_class]
+
+
 class LoggerExecutor(DefensiveCallableMixin, FunctionHolderMixin, TimedCallableMixin, ConfigurableCallableMixin):
     __metaclass__ = ABCMeta
     """
@@ -113,17 +214,7 @@ class Logger(BaseDefensiveCallableMixin, IntermediateCallableMixin, CacheDepende
         schema_class = self.output_schema_class()
 
         if schema_class:
-            class OutputModelHolder(LoggerOutput):
-
-                def __init__(self, _pypads_env, *args, _logger_call=None, **kwargs):
-                    super().__init__(_pypads_env, _logger_call=_logger_call,
-                                     lib_model=get_library_descriptor(self.get_model_cls()), **kwargs)
-
-                @classmethod
-                def get_model_cls(cls) -> Type[BaseModel]:
-                    return schema_class
-
-            return OutputModelHolder(_pypads_env, producer=_logger_call, **kwargs)
+            return output_holder_class(schema_class)(_pypads_env, producer=_logger_call, **kwargs)
         return None
 
     @classmethod
@@ -140,13 +231,15 @@ class Logger(BaseDefensiveCallableMixin, IntermediateCallableMixin, CacheDepende
 
     @classmethod
     def default_output_class(cls, clazz: Type[TrackedObject]) -> Type[OutputModel]:
-        class DefaultOutput(OutputModel):
-            tracked_object: clazz.get_model_cls() = ...  # Path to tracking objects
+        if clazz not in _default_output_classes:
+            class DefaultOutput(OutputModel):
+                tracked_object: clazz.get_model_cls() = ...  # Path to tracking objects
 
-            class Config:
-                orm_mode = True
+                class Config:
+                    orm_mode = True
 
-        return DefaultOutput
+            _default_output_classes[clazz] = DefaultOutput
+        return _default_output_classes[clazz]
 
     def cleanup_fns(self, call: LoggerCall) -> List[Callable]:
         return self._cleanup_fns[call] if call in self._cleanup_fns.keys() else []
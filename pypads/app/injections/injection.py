@@ -7,7 +7,8 @@ from pydantic import BaseModel
 from pypads import logger
 from pypads.app.call import Call
 from pypads.app.env import InjectionLoggerEnv
-from pypads.app.injections.base_logger import Logger, LoggerExecutor, OriginalExecutor, env_cache
+from pypads.app.injections.base_logger import Logger, LoggerExecutor, OriginalExecutor, env_cache, \
+    release_env_cache
 from pypads.app.injections.tracked_object import LoggerCall, FallibleMixin
 from pypads.app.misc.inheritance import SuperStop
 from pypads.app.misc.mixins import OrderMixin, MissingDependencyError
@@ -214,6 +215,9 @@ class DelayedResultsMixin(Logger, SuperStop, metaclass=ABCMeta):
         pads = get_current_pads()
         pads.cache.run_add(id(self), {'id': id(self), 'logger_call': logger_call, 'output': output})
 
+        # The environment is kept until the end of the run. Don't keep the arguments and results of the call alive.
+        release_env_cache(pads, output)
+
         def finalize(pads, *args, **kwargs):
             data = pads.cache.run_get(id(self))
             logger_call = data.get('logger_call')
@@ -1,6 +1,7 @@
+import sys
 import traceback
 from abc import ABCMeta
-from typing import Type
+from typing import Type, List
 
 from pydantic.main import BaseModel
 
@@ -12,6 +13,7 @@ from pypads.app.injections.tracked_object import LoggerCall
 from pypads.app.misc.mixins import OrderMixin, FunctionHolderMixin, BaseDefensiveCallableMixin
 from pypads.exceptions import NoCallAllowedError
 from pypads.model.logger_model import RunLoggerModel
+from pypads.model.mixins import ProvenanceMixin, get_library_descriptor
 from pypads.utils.util import inheritors, get_experiment_id, get_run_id
 
 
@@ -69,9 +71,23 @@ class RunSetup(RunLogger, metaclass=ABCMeta):
     """
     category: str = "RunSetupLogger"
 
+    # Setups not relying on the execution of other setups (other than by needed cached results) can run on a thread pool
+    _concurrent = False
+
+    # Names of the run cache entries the setup provides to other setups
+    _provided_cached: List[str] = []
+
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
 
+    @property
+    def concurrent(self):
+        return self._concurrent
+
+    @property
+    def provided_cached(self) -> List[str]:
+        return self._provided_cached
+
     def __real_call__(self, *args, **kwargs):
         logger.debug("Called pre run function " + str(self))
         return super().__real_call__(*args, **kwargs)
@@ -100,6 +116,65 @@ class SimpleRunFunction(FunctionHolderMixin, BaseDefensiveCallableMixin, OrderMi
         super().__init__(*args, error_message=error_message, **kwargs)
 
 
+def setup_chains(fns):
+    """
+    Split setup functions into the ones to execute one after another and chains of concurrent setups. A concurrent
+    setup needing the cached results of another concurrent setup is chained behind it.
+    :param fns: Setup functions sorted by their order
+    :return: Tuple of the sequential setups and the chains of concurrent setups
+    """
+    sequential = []
+    chains = []
+    providers = {}
+    for fn in fns:
+        needed_cached = getattr(fn, "needed_cached", [])
+        needed_cached = [needed_cached] if isinstance(needed_cached, str) else needed_cached
+        chain = None
+        if getattr(fn, "concurrent", False):
+            for name in needed_cached:
+                if name in providers:
+                    chain = providers[name]
+                    break
+            else:
+                if any(name in provided for name in needed_cached for provided in
+                       [getattr(f, "provided_cached", []) for f in sequential]):
+                    # Depends on a setup which isn't run concurrently
+                    chain = sequential
+                else:
+                    chain = []
+                    chains.append(chain)
+        else:
+            chain = sequential
+        chain.append(fn)
+        if chain is not sequential:
+            for name in getattr(fn, "provided_cached", []):
+                providers[name] = chain
+    return sequential, chains
+
+
+def setup_libraries(fns):
+    """
+    Get the descriptors of the libraries the setup functions and the tracked objects known by the modules defining them
+    are part of. The descriptors are stored before setups are run concurrently, as storing a descriptor switches the
+    active run.
+    :param fns: Setup functions
+    :return: List of library descriptors
+    """
+    libraries = {}
+    for fn in fns:
+        if isinstance(fn, ProvenanceMixin):
+            libraries.setdefault(fn._defined_in.uid, fn._defined_in)
+        module = sys.modules.get(type(fn).__module__)
+        classes = [v for v in vars(module).values() if isinstance(v, type) and issubclass(v, ProvenanceMixin)] \
+            if module is not None else []
+        # The library of an object is found by the package of its module
+        packages = {cls.__module__.split(".")[0]: cls for cls in classes}
+        for cls in packages.values():
+            lib_model = get_library_descriptor(cls)
+            libraries.setdefault(lib_model.uid, lib_model)
+    return list(libraries.values())
+
+
 def run_setup_functions():
     """
     Find all pre run functions defined in our imported context.
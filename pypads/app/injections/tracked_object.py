@@ -101,6 +101,7 @@ class ResultHolderMixin(ProducedMixin, ModelObject, SuperStop, metaclass=ABCMeta
         if obj.storage_type not in self._results:
             self._results[obj.storage_type] = set()
         self._results[obj.storage_type].add(obj)
+        self.invalidate()
 
     @property
     def artifacts(self):
@@ -192,6 +193,7 @@ class LoggerOutput(FallibleMixin, ProvenanceMixin, ResultHolderMixin):
 
     def add_call_env(self, _pypads_env: LoggerEnv):
         self._envs.append(_pypads_env)
+        self.invalidate()
 
     @property
     def envs(self):
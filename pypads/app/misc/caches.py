@@ -1,4 +1,7 @@
+import json
+import os
 import sys
+import threading
 
 import mlflow
 
@@ -18,8 +21,16 @@ class Cache:
         return self._cache
 
     def merge(self, other):
+        return self.merge_entries(other.cache)
+
+    def merge_entries(self, *entries):
+        """
+        Merge dicts of entries into the cache in one pass.
+        :param entries: Dicts of entries
+        :return:
+        """
         from pypads.utils.util import dict_merge_caches
-        self._cache = dict_merge_caches(self.cache, other.cache)
+        self._cache = dict_merge_caches(self.cache, *entries)
         return self
 
     def add(self, key, value):
@@ -75,6 +86,10 @@ class Cache:
     #         self._cache = {}
 
 
+# Values of these types can't be changed in place after being read from a cache
+_IMMUTABLE_TYPES = (str, bytes, int, float, complex, bool, tuple, frozenset, type(None))
+
+
 class PypadsRunCache(Cache):
     """
     A cache which is only valid for a single run
@@ -85,11 +100,33 @@ class PypadsRunCache(Cache):
         self._run_id = run_id or mlflow.active_run().info.run_id
         if not self._run_id:
             raise ValueError("No active run for run cache found.")
+        self._changes = set()
 
     @property
     def run_id(self):
         return self._run_id
 
+    def add(self, key, value):
+        super().add(key, value)
+        self._changes.add(key)
+
+    def get(self, item, default=None):
+        value = super().get(item, default)
+        # Mutable entries might be changed in place by the caller
+        if item in self._cache and not isinstance(value, _IMMUTABLE_TYPES):
+            self._changes.add(item)
+        return value
+
+    def pop_changes(self):
+        """
+        Get the entries added, replaced or read as mutable values since the last call. This is used to send only the
+        changes of a subprocess back to its parent.
+        :return: Dict of the changed entries
+        """
+        changes = {key: self._cache[key] for key in self._changes if key in self._cache}
+        self._changes = set()
+        return changes
+
     def register_cleanup_fn(self):
         from pypads.app.pypads import get_current_pads
         pads = get_current_pads()
@@ -162,6 +199,16 @@ class PypadsCache(Cache):
         run_id = self.run_init(run_id)
         return all([self._run_caches[run_id].exists(key) for key in keys])
 
+    def run_merge(self, *changes, run_id=None):
+        """
+        Merge the changes of run caches of other processes in one pass.
+        :param changes: Dicts of changed entries
+        :param run_id: Id of the run
+        :return:
+        """
+        run_id = self.run_init(run_id)
+        self._run_caches[run_id].merge_entries(*changes)
+
     def run_clear(self, run_id=None):
         run_id = self.run_init(run_id)
         self._run_caches[run_id].clear()
@@ -169,3 +216,80 @@ class PypadsCache(Cache):
     def run_delete(self, run_id=None):
         run_id = self.run_init(run_id)
         del self._run_caches[run_id]
+
+
+class HostCache:
+    """
+    Cache persisting host static data like the installed packages or hardware information across runs. Entries are
+    stored per host and environment fingerprint and therefore recomputed if packages get installed or removed.
+    """
+
+    def __init__(self, folder):
+        """
+        :param folder: Folder to store the entries in
+        """
+        from pypads.utils.util import persistent_hash
+        self._folder = os.path.join(folder, str(persistent_hash(tuple(self.fingerprint()))))
+        self._entries = {}
+        self._lock = threading.RLock()
+
+    @staticmethod
+    def fingerprint():
+        """
+        Fingerprint of the host and the python environment.
+        :return: List of identifying values
+        """
+        import platform
+        import site
+        import uuid
+        fingerprint = [platform.node(), uuid.getnode(), sys.executable, sys.prefix, sys.version]
+        paths = site.getsitepackages() if hasattr(site, "getsitepackages") else []
+        for path in paths + [site.getusersitepackages()]:
+            try:
+                fingerprint.append(os.stat(path).st_mtime)
+            except OSError:
+                fingerprint.append(None)
+        return fingerprint
+
+    @property
+    def folder(self):
+        return self._folder
+
+    def get(self, key, compute):
+        """
+        Get a cached entry or compute and store it.
+        :param key: Key of the entry
+        :param compute: Function computing a json serializable value for the entry
+        :return: Value of the entry
+        """
+        with self._lock:
+            if key in self._entries:
+                return self._entries[key]
+        path = os.path.join(self._folder, key + ".json")
+        if os.path.exists(path):
+            try:
+                with open(path, encoding="utf-8") as f:
+                    value = json.load(f)
+                with self._lock:
+                    self._entries[key] = value
+                return value
+            except Exception as e:
+                logger.debug("Couldn't load host cache entry {}: {}".format(path, str(e)))
+        value = compute()
+        with self._lock:
+            self._entries[key] = value
+        try:
+            os.makedirs(self._folder, exist_ok=True)
+            tmp_path = "{}.{}.{}.tmp".format(path, os.getpid(), threading.get_ident())
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(value, f)
+            os.replace(tmp_path, path)
+        except Exception as e:
+            logger.debug("Couldn't store host cache entry {}: {}".format(path, str(e)))
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries = {}
+        import shutil
+        shutil.rmtree(self._folder, ignore_errors=True)
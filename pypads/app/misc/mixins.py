@@ -1,3 +1,4 @@
+import sys
 import time
 import traceback
 from abc import abstractmethod, ABCMeta
@@ -65,6 +66,42 @@ class CallableMixin(SuperStop):
         pass
 
 
+# Selectors shared by all dependencies with the same name and constraint
+_lib_selectors = {}
+
+# Verdicts of the dependency checks by class
+_dependency_verdicts = {}
+
+
+def invalidate_dependency_verdicts():
+    """
+    Forget all verdicts of the dependency checks. Verdicts are renewed by themselves if a module of a dependency is
+    imported or replaced in sys.modules. This is needed if packages are installed or removed without that.
+    :return:
+    """
+    _dependency_verdicts.clear()
+
+
+class _DependencyVerdict:
+    """
+    Result of the dependency check of a class. It holds as long as the modules of the dependencies don't change.
+    """
+    __slots__ = ["dependencies", "names", "modules", "missing"]
+
+    def __init__(self, dependencies, names, missing):
+        self.dependencies = dependencies
+        self.names = names
+        self.modules = self.current_modules(names)
+        self.missing = missing
+
+    @staticmethod
+    def current_modules(names):
+        return tuple(id(sys.modules.get(name)) for name in names)
+
+    def holds(self, dependencies):
+        return self.dependencies is dependencies and self.modules == self.current_modules(self.names)
+
+
 class DependencyMixin(CallableMixin):
     """
     Callable being able to be disabled / enabled depending on package availability.
@@ -89,24 +126,41 @@ class DependencyMixin(CallableMixin):
     def _to_lib_selectors(dependencies: Set[Union[LibSelector, str, Tuple[str, str]]]) -> Set[LibSelector]:
         selectors = set()
         for d in dependencies:
-            selectors.add(LibSelector(name=d[0], constraint=d[1]) if isinstance(d, tuple) else LibSelector(
-                name=d) if not isinstance(d, LibSelector) else d)
+            if isinstance(d, LibSelector):
+                selectors.add(d)
+                continue
+            key = d if isinstance(d, tuple) else (d, "*")
+            if key not in _lib_selectors:
+                _lib_selectors[key] = LibSelector(name=key[0], constraint=key[1])
+            selectors.add(_lib_selectors[key])
         return selectors
 
-    def _check_dependencies(self):
+    def _resolve_dependencies(self):
         """
-        Raise error if dependencies are missing.
+        Check which dependencies are missing.
+        :return: Verdict of the check
         """
         missing = []
-        selectors = self.dependencies
-        if selectors is not None:
-            for selector in selectors:
-                try:
-                    if not selector.is_installed():
-                        missing.append(selector)
-                except VersionNotFoundException as e:
-                    # TODO couldn't get version allow execution for now
-                    pass
+        selectors = self.dependencies or set()
+        for selector in selectors:
+            try:
+                if not selector.is_installed():
+                    missing.append(selector)
+            except VersionNotFoundException as e:
+                # TODO couldn't get version allow execution for now
+                pass
+        return _DependencyVerdict(self._dependencies, tuple(s.name for s in selectors), missing)
+
+    def _check_dependencies(self):
+        """
+        Raise error if dependencies are missing. The check is done once per class and only renewed if a module of a
+        dependency changes in sys.modules.
+        """
+        verdict = _dependency_verdicts.get(self.__class__)
+        if verdict is None or not verdict.holds(self._dependencies):
+            verdict = self._resolve_dependencies()
+            _dependency_verdicts[self.__class__] = verdict
+        missing = verdict.missing
         if len(missing) > 0:
             raise MissingDependencyError(
                 "Can't log " + str(self) + ". Missing dependencies: " + ", ".join([str(d) for d in missing]))
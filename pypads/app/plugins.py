@@ -0,0 +1,174 @@
+import importlib
+import json
+import os
+import sys
+
+from pypads import logger
+
+try:
+    from importlib import metadata as importlib_metadata
+except ImportError:
+    # Python < 3.8
+    importlib_metadata = None
+
+# Entry point group plugins can register themselves with. The entry point references the plugin module or an object
+# providing an activate function e.g. pypads_padre = pypads_padre
+PLUGIN_GROUP = "pypads.plugins"
+
+# Distributions named with this prefix are plugins even if they don't register an entry point
+PLUGIN_PREFIX = "pypads_"
+
+# Version of the plugin manifest. Increase this if the manifest content changes.
+PLUGIN_MANIFEST_FORMAT = 2
+
+
+class Plugin:
+    """
+    Reference to a discovered plugin. The plugin is only imported when it gets activated.
+    """
+
+    def __init__(self, name, reference, distribution=None):
+        """
+        :param name: Name of the plugin
+        :param reference: Reference to the plugin in form of module or module:attribute
+        :param distribution: Normalized name of the distribution providing the plugin
+        """
+        self._name = name
+        self._reference = reference
+        self._distribution = distribution
+        self._plugin = None
+
+    @property
+    def name(self):
+        return self._name
+
+    @property
+    def reference(self):
+        return self._reference
+
+    @property
+    def module(self):
+        return self._reference.partition(":")[0]
+
+    @property
+    def distribution(self):
+        return self._distribution
+
+    @property
+    def names(self):
+        """
+        Names the plugin can be referred to by e.g. to disable it. These are the plugin, module and distribution name.
+        :return: Set of names
+        """
+        return {n for n in [self._name, self.module, self._distribution] if n}
+
+    @property
+    def loaded(self):
+        return self._plugin is not None
+
+    def load(self):
+        """
+        Import the plugin.
+        :return: Plugin module or object
+        """
+        if self._plugin is None:
+            module_name, _, attribute = self._reference.partition(":")
+            plugin = importlib.import_module(module_name)
+            for attr in filter(lambda a: len(a) > 0, attribute.split(".")):
+                plugin = getattr(plugin, attr)
+            self._plugin = plugin
+        return self._plugin
+
+    def activate(self, *args, **kwargs):
+        return self.load().activate(*args, **kwargs)
+
+    def __str__(self):
+        return "Plugin[name=" + self._name + ", reference=" + self._reference + "]"
+
+
+def _path_fingerprint(path):
+    """
+    Fingerprint of the search path. Installing or removing packages changes the modification time of the folders.
+    :param path: Search path
+    :return: List of entries with their modification time
+    """
+    fingerprint = []
+    for entry in path:
+        try:
+            fingerprint.append([entry, os.stat(entry or ".").st_mtime])
+        except OSError:
+            fingerprint.append([entry, None])
+    return fingerprint
+
+
+def _find_plugins(path):
+    """
+    Find the references of the installed plugins. This doesn't import any of them. A module registered under multiple
+    names (e.g. a plugin distribution registering an entry point with another name) is only found once.
+    :param path: Search path
+    :return: Dict of plugin names and dicts holding the reference and the distribution name
+    """
+    plugins = {}
+    if importlib_metadata is None:
+        import pkgutil
+        for _, name, _ in pkgutil.iter_modules(path):
+            if name.startswith(PLUGIN_PREFIX):
+                plugins[name] = {"reference": name, "distribution": None}
+        return plugins
+
+    modules = set()
+
+    def add_plugin(plugin_name, reference, distribution_name):
+        module = reference.partition(":")[0]
+        if plugin_name not in plugins and module not in modules:
+            modules.add(module)
+            plugins[plugin_name] = {"reference": reference, "distribution": distribution_name}
+
+    for distribution in importlib_metadata.distributions(path=path):
+        try:
+            name = (distribution.metadata["Name"] or "").lower().replace("-", "_")
+            for entry_point in distribution.entry_points:
+                if entry_point.group == PLUGIN_GROUP:
+                    add_plugin(entry_point.name, entry_point.value, name)
+            if name.startswith(PLUGIN_PREFIX):
+                add_plugin(name, name, name)
+        except Exception as e:
+            logger.debug("Couldn't read the metadata of distribution {}: {}".format(distribution, str(e)))
+    return plugins
+
+
+def discover_plugins(path=None, manifest=None):
+    """
+    Discover the installed plugins through the entry points of the installed distributions.
+    :param path: Search path. Defaults to sys.path
+    :param manifest: Optional path to a manifest caching the discovered plugins. The manifest is used as long as the
+    search path didn't change.
+    :return: Dict of plugin names and plugins
+    """
+    path = list(sys.path if path is None else path)
+    fingerprint = _path_fingerprint(path) if manifest else None
+
+    plugins = None
+    if manifest and os.path.exists(manifest):
+        try:
+            with open(manifest, encoding="utf-8") as f:
+                cached = json.load(f)
+            if cached.get("format") == PLUGIN_MANIFEST_FORMAT and cached.get("path") == fingerprint:
+                plugins = cached["plugins"]
+        except Exception as e:
+            logger.debug("Couldn't load plugin manifest {}: {}".format(manifest, str(e)))
+
+    if plugins is None:
+        plugins = _find_plugins(path)
+        if manifest:
+            try:
+                os.makedirs(os.path.dirname(manifest), exist_ok=True)
+                tmp_path = "{}.{}.tmp".format(manifest, os.getpid())
+                with open(tmp_path, "w", encoding="utf-8") as f:
+                    json.dump({"format": PLUGIN_MANIFEST_FORMAT, "path": fingerprint, "plugins": plugins}, f)
+                os.replace(tmp_path, manifest)
+            except Exception as e:
+                logger.debug("Couldn't store plugin manifest {}: {}".format(manifest, str(e)))
+
+    return {name: Plugin(name, plugin["reference"], distribution=plugin["distribution"])
+            for name, plugin in plugins.items()}
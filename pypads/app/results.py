@@ -1,14 +1,17 @@
+import time
 from abc import ABCMeta
 from functools import wraps
-from typing import Union
+from typing import Union, NamedTuple, Any, Optional
 
 from mlflow.entities import ViewType
-from pandas import DataFrame, Series
+from pandas import DataFrame
 
+from pypads.app.backends.search import compile_run_search
 from pypads.app.misc.extensions import ExtendableMixin, Plugin
 from pypads.app.misc.mixins import FunctionHolderMixin
 from pypads.model.models import ResultType
 from pypads.utils.logging_util import read_artifact, FileFormats
+from pypads.variables import run_search_cache_ttl
 
 result_plugins = set()
 result_set = set()
@@ -22,6 +25,23 @@ class OperatorType(Enum):
     NOT = '$NOT'
 
 
+# Cache key of the run ids found by searches
+RUN_SEARCH_CACHE = "run_search"
+
+# Fields of the stored entries needed to build a data frame
+DATA_FRAME_PROJECTION = {"run.uid": 1, "name": 1, "data": 1, "step": 1, "_id": 0}
+
+
+class ResultEntry(NamedTuple):
+    """
+    Cell of a data frame holding the projected fields of a stored entry.
+    """
+    storage_type: ResultType
+    name: str
+    data: Any
+    step: Optional[int] = None
+
+
 class Result(FunctionHolderMixin, metaclass=ABCMeta):
 
     def __init__(self, *args, fn, **kwargs):
@@ -46,6 +66,42 @@ class IResults(Plugin):
         return [method_name for method_name in dir(self) if callable(getattr(object, method_name))]
 
 
+def _to_search_dict(search_dict, logger_id=None, output_id=None, tracked_object_id=None):
+    """
+    Add the filters for the producing logger and the parent of the entries to a search dict.
+    :param search_dict: Additional filters
+    :param logger_id: Filter by producing logger id
+    :param output_id: Filter by output id
+    :param tracked_object_id: Filter by tracked_object_id
+    :return: New search dict
+    """
+    search_dict = dict(search_dict)
+    if logger_id:
+        search_dict["produced_by"] = logger_id
+    if output_id:
+        search_dict.update({"part_of": output_id, "parent_type": ResultType.output})
+    if tracked_object_id:
+        search_dict.update({"part_of": tracked_object_id, "parent_type": ResultType.tracked_object})
+    return search_dict
+
+
+def _to_leaf_filter(search):
+    """
+    Convert a leaf of a run search to the filter of its entries. The leaf may use the same arguments as the getters
+    of the results.
+    :param search: Leaf of a run search without its storage_type
+    :return: Filter
+    """
+    search = dict(search)
+    fields = {"experiment_name": "experiment.name", "experiment_id": "experiment.uid", "run_id": "run.uid"}
+    for argument, field in fields.items():
+        value = search.pop(argument, None)
+        if value:
+            search[field] = value
+    return _to_search_dict(search, logger_id=search.pop("logger_id", None), output_id=search.pop("output_id", None),
+                           tracked_object_id=search.pop("tracked_object_id", None))
+
+
 def result(f):
     """
     Result used to convert a function to a tracked actuator.#
@@ -154,14 +210,8 @@ class PyPadsResults(IResults):
         :param search_dict: Additional filters
         :return:
         """
-        if search_dict is None:
-            search_dict = {}
-        if logger_id:
-            search_dict = {**search_dict, **{"produced_by": logger_id}}
-        if output_id:
-            search_dict = {**search_dict, **{"part_of": output_id, "parent_type": ResultType.output}}
-        if tracked_object_id:
-            search_dict = {**search_dict, **{"part_of": tracked_object_id, "parent_type": ResultType.tracked_object}}
+        search_dict = _to_search_dict(search_dict or {}, logger_id=logger_id, output_id=output_id,
+                                      tracked_object_id=tracked_object_id)
         return self.pypads.backend.list(storage_type=storage_type, experiment_name=experiment_name,
                                         experiment_id=experiment_id, run_id=run_id, search_dict=search_dict)
 
@@ -265,101 +315,79 @@ class PyPadsResults(IResults):
         return self.get_data_frame([r.run_id for r in all_runs], inclusion_dicts=inclusion_dicts)
 
     @result
-    def get_run_ids_by_search(self, search_dict, experiment_name=None) -> set:
+    def get_run_ids_by_search(self, search_dict, experiment_name=None, refresh=False) -> set:
         """
         Search for run ids by a search dict.
-        The search dict has to contain a storage_type to denote which collection to search through.
-        :param search_dict:
-        :return:
+        A leaf of the search has to contain a storage_type to denote which collection to search through. Leaves can be
+        combined by OperatorType.OR, OperatorType.AND and OperatorType.NOT. The whole search is compiled into a single
+        plan evaluated by the backend. Found run ids are cached by the normalized search for run_search_cache_ttl
+        seconds if configured. Cached run ids don't include runs logged to afterwards.
+        :param search_dict: Search dict
+        :param experiment_name: Only search runs of this experiment
+        :param refresh: Ignore cached run ids
+        :return: Set of run ids
         """
-        # TODO are there more complex searches we don't know about possible?
-
-        uids = set()
-
-        if 'storage_type' in search_dict.keys():
-            uids = self._get_by_dict(search_dict={**{'experiment.name': experiment_name}, **search_dict,
-                                                  'chosen_columns': {"run.uid": 1, "_id": 0}})
-            uids = [x.get('run').get('uid') for x in uids]
-            return uids
-
-        all_runs = set()
-        for key, queries in search_dict.items():
-
-            uids = set()
-
-            if key == OperatorType.OR and isinstance(queries, list):
-                for query in queries:
-                    run_uids = self.get_run_ids_by_search(search_dict=query, experiment_name=experiment_name)
-                    uids = uids.union(run_uids)
-
-            elif key == OperatorType.AND and isinstance(queries, list):
-                for query in queries:
-                    run_uids = self.get_run_ids_by_search(search_dict=query, experiment_name=experiment_name)
-                    if not uids:
-                        uids = set(run_uids)
-                    else:
-                        uids = uids.intersection(run_uids)
-
-            elif key == OperatorType.NOT and not isinstance(queries, list):
-                # Get the list of all the runs for the experiment
-                if len(all_runs):
-                    # TODO: Find a better way to get all the runs rather than using the tag
-                    all_runs = set(self.get_run_ids_by_search(search_dict={ResultType.tag.value},
-                                                              experiment_name=experiment_name))
-                run_uids = self.get_run_ids_by_search(search_dict=queries, experiment_name=experiment_name)
-                if run_uids is None:
-                    return None
-                uids = all_runs.difference(run_uids)
-
-            else:
-                return set()
-
-        return uids
+        plan = compile_run_search(search_dict, experiment_name=experiment_name, to_filter=_to_leaf_filter)
+
+        ttl = self.pypads.config.get(run_search_cache_ttl, 0)
+        if ttl <= 0:
+            return set(self.pypads.backend.search_run_ids(plan))
+
+        if not self.pypads.cache.exists(RUN_SEARCH_CACHE):
+            self.pypads.cache.add(RUN_SEARCH_CACHE, {})
+        searches = self.pypads.cache.get(RUN_SEARCH_CACHE)
+        now = time.time()
+        if not refresh and plan.key in searches:
+            timestamp, run_ids = searches[plan.key]
+            if now - timestamp < ttl:
+                return set(run_ids)
+
+        run_ids = self.pypads.backend.search_run_ids(plan)
+        # Drop expired searches on every write to keep the cache from growing
+        for key in [k for k, (timestamp, _) in searches.items() if now - timestamp >= ttl]:
+            del searches[key]
+        searches[plan.key] = (now, frozenset(run_ids))
+        return set(run_ids)
 
     @result
     def get_data_frame(self, run_ids, inclusion_dicts=None):
         """
-        Returns a pandas data frame containing results of the last runs of the experiment.
+        Returns a pandas data frame containing results of the last runs of the experiment. The entries of all runs are
+        fetched with one query per inclusion dict and only hold the fields needed for the data frame.
         @:param inclusion_dict: Search for run objects to include in the data frame for the found runs.
          Defaults to parameters, metrics and tags.
         :return:
         """
 
         if isinstance(run_ids, str):
-            run_ids = {run_ids}
-        elif isinstance(run_ids, list):
-            run_ids = set(run_ids)
+            run_ids = [run_ids]
+        # Remove duplicates but keep the order of the runs for the rows
+        run_ids = list(dict.fromkeys(run_ids))
 
         if inclusion_dicts is None:
             inclusion_dicts = [{"storage_type": ResultType.parameter.value}, {"storage_type": ResultType.metric.value},
                                {"storage_type": ResultType.tag.value}]
 
-        df = DataFrame()
-        for run_id in run_ids:
-            row = {}
-            for search in inclusion_dicts:
-                search["run.uid"] = run_id
-                found = self._get_by_dict(search)
-                if found is None:
-                    continue
-
-                entries = {}
-                for row_ in found:
-                    arr = entries.get(row_.storage_type.value + "_" + row_.name, [])
-                    arr.append(row_)
-                    entries[row_.storage_type.value + "_" + row_.name] = arr
-
-                row.update({key: (value[0] if len(value) == 1 else value)
-                            for key, value in entries.items()})
-
-            if not bool(row):
+        # Query all runs at once per inclusion dict and collect the entries by column and run
+        columns = {}
+        for search in inclusion_dicts:
+            found = self._get_by_dict({**search, "run.uid": {"$in": run_ids},
+                                       "chosen_columns": DATA_FRAME_PROJECTION})
+            if found is None:
                 continue
 
-            index = row.keys()
-            data = row.values()
-            run_series = Series(data=[v for v in data], index=index, name=run_id)
-            df = df.append(run_series)
-        return df
+            storage_type = ResultType(search["storage_type"])
+            for entry in found:
+                cells = columns.setdefault(storage_type.value + "_" + str(entry.get("name")), {})
+                cells.setdefault(entry["run"]["uid"], []).append(
+                    ResultEntry(storage_type, entry.get("name"), entry.get("data"), entry.get("step")))
+
+        if not bool(columns):
+            return DataFrame()
+
+        df = DataFrame({key: {run_id: (value[0] if len(value) == 1 else value) for run_id, value in cells.items()}
+                        for key, cells in columns.items()})
+        return df.reindex([run_id for run_id in run_ids if run_id in df.index])
 
     # @result
     # def get_data_frame(self, experiment_names=None, experiment_ids=None, run_ids=None, search_dict=None):
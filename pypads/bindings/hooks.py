@@ -8,7 +8,7 @@ from pypads.utils.logging_util import FileFormats
 DEFAULT_HOOK_MAPPING = {
     "init": {"on": ["pypads_init"]},
     "parameters": {"on": ["pypads_fit"]},
-    "hardware": {"on": ["pypads_fit"]},
+    "hardware": {"on": ["pypads_fit", "pypads_predict"]},
     "output": {"on": ["pypads_fit", "pypads_predict"]},
     "input": {"on": ["pypads_fit"], "with": {"_pypads_write_format": FileFormats.text}},
     "metric": {"on": ["pypads_metric"]},
@@ -0,0 +1,127 @@
+import random
+import threading
+import time
+
+from pypads import logger
+
+# Keys of a sampling policy in the config
+EVERY = "every"  # Only log every n-th call
+FIRST = "first"  # Only log the first k calls
+PROBABILITY = "probability"  # Log a call with the given probability
+RATE = "rate"  # Log at most the given number of calls per second
+BURST = "burst"  # Number of calls which can be logged at once if the rate limit wasn't reached for a while
+
+POLICY_KEYS = {EVERY, FIRST, PROBABILITY, RATE, BURST}
+
+# Name of the run cache entry holding the policies of the hooks by wrapped function and event
+SAMPLING_POLICIES = "sampling_policies"
+
+_policies_lock = threading.Lock()
+
+
+class SamplingPolicy:
+    """
+    Policy deciding if the loggers of a hook should be executed on a call of the hooked function. Calls which are not
+    sampled go straight to the original function. Counters are kept per wrapped function and event in the run cache
+    (see get_sampling_policy) and reset for every run.
+    """
+
+    def __init__(self, every=None, first=None, probability=None, rate=None, burst=None, config=None):
+        """
+        :param every: Only log every n-th call
+        :param first: Only log the first k calls
+        :param probability: Log a call with the given probability
+        :param rate: Log at most the given number of calls per second (token bucket)
+        :param burst: Size of the token bucket. Defaults to max(1, rate)
+        :param config: Config entry the policy was built from
+        """
+        self._config = config
+        self._every = every
+        self._first = first
+        self._probability = probability
+        self._rate = rate
+        self._burst = burst if burst is not None else max(1.0, rate or 0)
+        self._lock = threading.Lock()
+        self._run_id = None
+        self._calls = 0
+        self._tokens = self._burst
+        self._last = time.time()
+
+    @property
+    def config(self):
+        return self._config
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state["_lock"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def from_dict(config: dict):
+        """
+        Build a policy from given config entry.
+        :param config: Dict holding the policy e.g. {"every": 10, "rate": 5}
+        :return: SamplingPolicy or None if the entry doesn't limit anything
+        """
+        if not config:
+            return None
+        unknown = set(config.keys()) - POLICY_KEYS
+        if len(unknown) > 0:
+            logger.warning("Unknown keys {} in sampling policy {}. Supported keys are {}.", unknown, config,
+                           POLICY_KEYS)
+        return SamplingPolicy(**{k: v for k, v in config.items() if k in POLICY_KEYS}, config=dict(config))
+
+    def sample(self, run_id):
+        """
+        Decide if the current call should be logged.
+        :param run_id: Id of the active run. Counters are reset if the run changed.
+        :return: True if the loggers of the hook are to be executed
+        """
+        with self._lock:
+            if self._run_id != run_id:
+                self._run_id = run_id
+                self._calls = 0
+                self._tokens = self._burst
+                self._last = time.time()
+            call = self._calls
+            self._calls += 1
+
+            if self._first is not None and call >= self._first:
+                return False
+            if self._every is not None and call % self._every != 0:
+                return False
+            if self._probability is not None and random.random() >= self._probability:
+                return False
+            if self._rate is not None:
+                now = time.time()
+                self._tokens = min(self._burst, self._tokens + (now - self._last) * self._rate)
+                self._last = now
+                if self._tokens < 1:
+                    return False
+                self._tokens -= 1
+            return True
+
+
+def get_sampling_policy(pads, key, config: dict):
+    """
+    Get the policy of a hook of a wrapped function. The policy is kept in the run cache to keep its counters if the
+    hook chain of the function gets recompiled. It is only rebuilt if its entry in the config changed.
+    :param pads: PyPads instance
+    :param key: Key of the wrapped function and the event of the hook
+    :param config: Entry of the policy in the config
+    :return: SamplingPolicy or None if the entry doesn't limit anything
+    """
+    with _policies_lock:
+        policies = pads.cache.run_get(SAMPLING_POLICIES)
+        if policies is None:
+            policies = {}
+            pads.cache.run_add(SAMPLING_POLICIES, policies)
+        policy = policies.get(key)
+        if policy is None or policy.config != config:
+            policy = SamplingPolicy.from_dict(config)
+            policies[key] = policy
+        return policy
@@ -1,5 +1,8 @@
 import glob
+import json
 import os
+import pickle
+import re
 from typing import List, Set, Tuple, Generator, Iterable, Type
 
 import yaml
@@ -9,7 +12,7 @@ from pypads import logger
 from pypads.bindings.anchors import Anchor, get_anchor
 from pypads.bindings.hooks import Hook
 from pypads.importext.package_path import RegexMatcher, PackagePath, PackagePathMatcher, \
-    SerializableMatcher, Package
+    SerializableMatcher, Package, PackagePathSegment, StaticMatcher
 from pypads.importext.versioning import LibSelector
 from pypads.model.domain import MappingModel
 from pypads.model.metadata import ModelObject
@@ -20,6 +23,13 @@ default_mapping_file_paths.extend(glob.glob(
     os.path.abspath(
         os.path.join(os.path.dirname(__file__), "..", "bindings", "resources", "mapping", "**.yml"))))
 
+# Version of the compiled form of mapping files. Increase this if the way mappings are built changes.
+COMPILED_MAPPING_FORMAT = 1
+
+
+def _to_anchor(anchor):
+    return get_anchor(anchor) or Anchor(anchor, "Runtime anchor. No description available.")
+
 
 class Mapping:
     """default_mapping_file_paths
@@ -38,6 +48,7 @@ class Mapping:
             self._import_hooks.add(Hook(a, self))
         self._matcher = matcher
         self._inherited = inherited
+        self._hash = None
 
     def is_applicable(self, ctx, obj):
         """
@@ -112,7 +123,78 @@ class Mapping:
                self.import_hooks == other.import_hooks and self.values == other.values
 
     def __hash__(self):
-        return hash((self.reference, "|".join([str(h) for h in self.hooks.union(self.import_hooks)]), str(self.values)))
+        # Mappings are put into sets on every lookup. Building the hash from their string representation is expensive.
+        if self._hash is None:
+            self._hash = hash((self.reference, "|".join([str(h) for h in self.hooks.union(self.import_hooks)]),
+                               str(self.values)))
+        return self._hash
+
+
+class MappingIndex:
+    """
+    Compiled index over the mappings of a collection. Static segments are looked up in a prefix trie while the regex
+    segments of a level are combined into a single pattern rejecting most segments at once. The children matching a
+    segment are cached per level.
+    """
+
+    def __init__(self, path_map: dict):
+        """
+        :param path_map: Nested mapping dict of a MappingCollection
+        """
+        self.static = {}
+        self.regex = []
+        self.mappings = list(path_map.get(":mapping", []))
+        for k, v in path_map.items():
+            if isinstance(k, str) and ":mapping" == k:
+                continue
+            if isinstance(k, RegexMatcher):
+                self.regex.append((re.compile(k.content), MappingIndex(v)))
+            else:
+                self.static[k.content if hasattr(k, "content") else str(k)] = MappingIndex(v)
+
+        self._combined = None
+        if len(self.regex) > 1:
+            try:
+                self._combined = re.compile("|".join("(?:{})".format(r.pattern) for r, _ in self.regex))
+            except re.error:
+                # Patterns with global flags can't be combined
+                self._combined = None
+
+        # All mappings stored below this level
+        self.all_mappings = self.mappings + [m for c in list(self.static.values()) + [c for _, c in self.regex]
+                                             for m in c.all_mappings]
+        self._children = {}
+
+    def children(self, segment: str):
+        """
+        Get all levels of the index matching given segment.
+        :param segment: Segment of a package path
+        :return: List of matching levels
+        """
+        children = self._children.get(segment)
+        if children is None:
+            children = []
+            if segment in self.static:
+                children.append(self.static[segment])
+            if len(self.regex) > 0 and (self._combined is None or self._combined.match(segment)):
+                children.extend(c for r, c in self.regex if r.match(segment))
+            self._children[segment] = children
+        return children
+
+    def find(self, segments):
+        """
+        Find all mappings matching given segments.
+        :param segments: Segments of a package path
+        :return: List of mappings
+        """
+        levels = [self]
+        for segment in segments:
+            if isinstance(segment, PackagePathSegment):
+                segment = segment.content
+            levels = [c for level in levels for c in level.children(segment)]
+            if len(levels) == 0:
+                return []
+        return [m for level in levels for m in level.all_mappings]
 
 
 class MappingCollection(ModelObject):
@@ -125,6 +207,7 @@ class MappingCollection(ModelObject):
         :param library: Library information including library version constraint and name
         """
         self._mappings = {}
+        self._index = None
         self._name = key
         self._author = author
         self._version = version
@@ -157,6 +240,18 @@ class MappingCollection(ModelObject):
     def mappings(self):
         return self._mappings
 
+    @property
+    def index(self) -> MappingIndex:
+        """
+        Compiled index of the mappings. The index is built on first access after a mapping was added. It isn't
+        stored with the compiled mapping file, as restoring it has to compile the same regex patterns again and
+        isn't faster than building it.
+        :return:
+        """
+        if self._index is None:
+            self._index = MappingIndex(self._mappings)
+        return self._index
+
     def add_mapping(self, mapping: Mapping):
         """
         Add a mapping to the collection.
@@ -171,6 +266,34 @@ class MappingCollection(ModelObject):
         if ":mapping" not in path_map:
             path_map[":mapping"] = []
         path_map[":mapping"].append(mapping)
+        self._index = None
+
+    def compile(self):
+        """
+        Compile the collection to plain data which can be restored without building the mappings again.
+        :return: Dict holding the metadata and the flattened mappings of the collection
+        """
+        return {
+            "format": COMPILED_MAPPING_FORMAT,
+            "version": self._version,
+            "library": {"name": self._lib.name, "version": self._lib.constraint} if self._lib else None,
+            "author": self._author,
+            "mappings": [([("re" if isinstance(m, RegexMatcher) else "static", m.content) for m in
+                           mapping.matcher.matchers],
+                          [str(h.anchor) for h in mapping.hooks], [str(h.anchor) for h in mapping.import_hooks],
+                          mapping.values) for mapping in self._get_all_mappings()]
+        }
+
+    def _add_compiled(self, compiled_mappings):
+        """
+        Add the mappings of a compiled collection.
+        :param compiled_mappings: Flattened mappings produced by compile
+        :return:
+        """
+        for matchers, anchors, import_anchors, values in compiled_mappings:
+            matcher = PackagePathMatcher([RegexMatcher(c) if t == "re" else StaticMatcher(c) for t, c in matchers])
+            self.add_mapping(Mapping(matcher, self, {_to_anchor(a) for a in anchors},
+                                     {_to_anchor(a) for a in import_anchors}, values))
 
     def _get_all_mappings(self, current_path=None):
         """
@@ -198,9 +321,9 @@ class MappingCollection(ModelObject):
         the map to find relevant mapping files.
         :return:
         """
-        mappings = []
         if current_path is None:
-            current_path = self._mappings
+            return self.index.find(segments)
+        mappings = []
         if len(segments) > 0:
             if segments[0] in current_path:
                 mappings = mappings + self.find_mappings(segments[1:], current_path[segments[0]])
@@ -232,12 +355,12 @@ class MappingSchema:
             anchors = [anchors]
         self._anchors = set()
         for anchor in anchors:
-            self._anchors.add(get_anchor(anchor) or Anchor(anchor, "Runtime anchor. No description available."))
+            self._anchors.add(_to_anchor(anchor))
         if not isinstance(import_anchors, Iterable):
             import_anchors = [import_anchors]
         self._import_anchors = set()
         for anchor in import_anchors:
-            self._import_anchors.add(get_anchor(anchor) or Anchor(anchor, "Runtime anchor. No description available."))
+            self._import_anchors.add(_to_anchor(anchor))
         self._values = values
 
     @property
@@ -363,18 +486,64 @@ class MappingFile(SerializedMapping):
     Class referencing a file holding a mapping.
     """
 
-    def __init__(self, path, name=None):
+    def __init__(self, path, name=None, cache_folder=None):
+        """
+        :param path: Path to the mapping file
+        :param name: Name of the collection. Defaults to the file name.
+        :param cache_folder: Folder holding the compiled mapping files. Compiled files are looked up by the hash of
+        the file content. Parsing the yaml is skipped if one exists.
+        """
         with open(path, encoding='utf-8') as f:
             if name is None:
                 name = os.path.basename(f.name)
             data = f.read()
         self.path = path
-        super().__init__(name, data)
 
         # computing the hash of the mapping file
-        self._hash = persistent_hash(data)
+        mapping_hash = persistent_hash(data)
+
+        compiled = self._load_compiled(cache_folder, mapping_hash) if cache_folder else None
+        if compiled is not None:
+            MappingCollection.__init__(self, name, compiled["version"], compiled["library"], compiled["author"])
+            self._add_compiled(compiled["mappings"])
+        else:
+            super().__init__(name, data)
+            if cache_folder:
+                self._store_compiled(cache_folder, mapping_hash)
+
+        self._hash = mapping_hash
         self.uid = self._hash
 
+    @staticmethod
+    def _compiled_path(cache_folder, mapping_hash):
+        return os.path.join(cache_folder, "{}.pickle".format(mapping_hash))
+
+    @staticmethod
+    def _load_compiled(cache_folder, mapping_hash):
+        path = MappingFile._compiled_path(cache_folder, mapping_hash)
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, "rb") as f:
+                compiled = pickle.load(f)
+            if compiled.get("format") == COMPILED_MAPPING_FORMAT:
+                return compiled
+        except Exception as e:
+            logger.debug("Couldn't load compiled mapping {}: {}".format(path, str(e)))
+        return None
+
+    def _store_compiled(self, cache_folder, mapping_hash):
+        path = self._compiled_path(cache_folder, mapping_hash)
+        try:
+            os.makedirs(cache_folder, exist_ok=True)
+            # Write to a temporary file first as other processes might load the compiled mapping concurrently
+            tmp_path = "{}.{}.tmp".format(path, os.getpid())
+            with open(tmp_path, "wb") as f:
+                pickle.dump(self.compile(), f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, path)
+        except Exception as e:
+            logger.debug("Couldn't store compiled mapping {}: {}".format(path, str(e)))
+
 
 class MappingRegistry:
     """
@@ -394,6 +563,13 @@ class MappingRegistry:
 
         self._mappings = {}
 
+        # Resolved version and version compatible collections by top level package name
+        self._resolved = {}
+
+        # Compiled mapping files and the hashes of mappings already registered in a mapping repository
+        self._cache_folder = os.path.join(pypads.folder, "cache", "mappings")
+        self._registrations = None
+
         for path in mapping_file_paths:
             self.load_mapping(path)
 
@@ -452,15 +628,61 @@ class MappingRegistry:
         else:
             mapping_repo = self._pypads.mapping_repository
             mapping_hash = mapping._hash
-            if not mapping_repo.has_object(uid=mapping_hash):
-                mapping_object = mapping_repo.get_object(uid=mapping_hash)
-                # Just init context once here
-                with mapping_object.init_context():
-                    if isinstance(mapping, MappingFile):
-                        mapping.mapping_file = mapping_object.log_artifact(local_path=mapping.path,
-                                                                           description="A copy of the mapping file used.")
-                    mapping_object.log_json(mapping)
+            if not self._is_registered(mapping_repo, mapping_hash):
+                if not mapping_repo.has_object(uid=mapping_hash):
+                    mapping_object = mapping_repo.get_object(uid=mapping_hash)
+                    # Just init context once here
+                    with mapping_object.init_context():
+                        if isinstance(mapping, MappingFile):
+                            mapping.mapping_file = mapping_object.log_artifact(
+                                local_path=mapping.path, description="A copy of the mapping file used.")
+                        mapping_object.log_json(mapping)
+                self._register(mapping_repo, mapping_hash)
             self._mappings[key] = mapping
+            self._resolved = {}
+
+    def _registration_key(self, mapping_repo):
+        return "{}|{}".format(self._pypads.backend.uri, mapping_repo.id)
+
+    def _load_registrations(self):
+        if self._registrations is None:
+            self._registrations = {}
+            path = os.path.join(self._cache_folder, "registrations.json")
+            if os.path.exists(path):
+                try:
+                    with open(path, encoding="utf-8") as f:
+                        self._registrations = {k: set(v) for k, v in json.load(f).items()}
+                except Exception as e:
+                    logger.debug("Couldn't load mapping registrations {}: {}".format(path, str(e)))
+        return self._registrations
+
+    def _is_registered(self, mapping_repo, mapping_hash):
+        """
+        Check if a mapping was already registered in the mapping repository of the same backend.
+        :param mapping_repo: Mapping repository
+        :param mapping_hash: Hash of the mapping
+        :return:
+        """
+        return str(mapping_hash) in self._load_registrations().get(self._registration_key(mapping_repo), set())
+
+    def _register(self, mapping_repo, mapping_hash):
+        """
+        Remember that a mapping is registered in the mapping repository of the backend.
+        :param mapping_repo: Mapping repository
+        :param mapping_hash: Hash of the mapping
+        :return:
+        """
+        registrations = self._load_registrations()
+        registrations.setdefault(self._registration_key(mapping_repo), set()).add(str(mapping_hash))
+        path = os.path.join(self._cache_folder, "registrations.json")
+        try:
+            os.makedirs(self._cache_folder, exist_ok=True)
+            tmp_path = "{}.{}.tmp".format(path, os.getpid())
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({k: sorted(v) for k, v in registrations.items()}, f)
+            os.replace(tmp_path, path)
+        except Exception as e:
+            logger.debug("Couldn't store mapping registrations {}: {}".format(path, str(e)))
 
     def load_mapping(self, path):
         """
@@ -468,7 +690,7 @@ class MappingRegistry:
         :param path: Path to the mapping file.
         :return:
         """
-        self.add_mapping(MappingFile(path))
+        self.add_mapping(MappingFile(path, cache_folder=self._cache_folder))
 
     def get_libraries(self):
         """
@@ -480,29 +702,42 @@ class MappingRegistry:
             all_libs.add(mapping.lib)
         return all_libs
 
+    def resolve(self, name):
+        """
+        Resolve the version of a top level package and the mapping collections supporting it. The resolution is cached
+        until mappings are added to the registry.
+        :param name: Name of the top level package
+        :return: Tuple of the version and the list of fitting collections
+        """
+        resolved = self._resolved.get(name)
+        if resolved is None:
+            if not any([name == s.name for s, _ in self.get_entries()]):
+                resolved = (None, [])
+            else:
+                lib_version = find_package_version(name)
+
+                # Take only mappings which are fitting for versions if we have a selector
+                if lib_version:
+                    lib_selector = LibSelector(name=name, constraint=lib_version)
+                    resolved = (lib_version, [c for s, c in self.get_entries() if s.allows_any(lib_selector)])
+
+                # Otherwise just use all name fitting mappings. These are not cached as the package might still be
+                # initializing and provide its version later on
+                else:
+                    return None, [c for s, c in self.get_entries() if s.name == name]
+            self._resolved[name] = resolved
+        return resolved
+
     def get_relevant_mappings(self, package: Package):
         """
         Function to find all relevant mappings. This produces a generator getting extended with found subclasses
         :return:
         """
-        if any([package.path.segments[0] == s.name for s, _ in self.get_entries()]):
-            lib_version = find_package_version(str(package.path.segments[0]))
-            mappings = set()
-
-            # Take only mappings which are fitting for versions if we have a selector
-            if lib_version:
-                lib_selector = LibSelector(name=str(package.path.segments[0]), constraint=lib_version)
-                for k, collection in [(s, c) for s, c in self.get_entries() if s.allows_any(lib_selector)]:
-                    for m in collection.find_mappings(package.path.segments):
-                        mappings.add(m)
-
-            # Otherwise just use all name fitting mappings
-            else:
-                for k, collection in [(s, c) for s, c in self.get_entries() if s.name == package.path.segments[0]]:
-                    for m in collection.find_mappings(package.path.segments):
-                        mappings.add(m)
-            return mappings
-        return set()
+        _, collections = self.resolve(str(package.path.segments[0]))
+        mappings = set()
+        for collection in collections:
+            mappings.update(collection.find_mappings(package.path.segments))
+        return mappings
 
 
 class MatchedMapping:
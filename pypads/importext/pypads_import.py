@@ -117,18 +117,25 @@ def add_wrappings(self, module):
     mro_entry_history = {}
 
     if current_pads:
+        module_wrapper = current_pads.wrap_manager.module_wrapper
+        affected = False
+
         # TODO we might want to make this configurable/improve performance.
         #  This looks at every imported class and every mapping.
         # On execution of a module we search for relevant mappings
         # For every var on module
-        try:
-            members = inspect.getmembers(module,
-                                         lambda x: hasattr(x, "__module__") and x.__module__ == module.__name__)
-        except Exception as e:
-            logger.debug(
-                "getmembers of inspect failed on module '" + str(module.__name__) + "' with expection" + str(
-                    e) + ". Falling back to dir to get the members of the module.")
-            members = [(name, getattr(module, name)) for name in dir(module)]
+        if reference in module_wrapper.known_unaffected_module_names:
+            # Another process with the same mappings (e.g. the parent of a worker) already found nothing to wrap
+            members = []
+        else:
+            try:
+                members = inspect.getmembers(module,
+                                             lambda x: hasattr(x, "__module__") and x.__module__ == module.__name__)
+            except Exception as e:
+                logger.debug(
+                    "getmembers of inspect failed on module '" + str(module.__name__) + "' with expection" + str(
+                        e) + ". Falling back to dir to get the members of the module.")
+                members = [(name, getattr(module, name)) for name in dir(module)]
 
         for name, obj in members:
             if obj is not None:
@@ -158,6 +165,7 @@ def add_wrappings(self, module):
                         logger.debug("Skipping some superclasses of " + str(obj) + ". " + str(e))
                 mappings = mappings.union(_get_relevant_mappings(package))
                 if len(mappings) > 0:
+                    affected = True
                     if not has_delayed_wrapping():
                         current_pads.wrap_manager.wrap(obj, Context(module, reference),
                                                        {MatchedMapping(mapping, package.path) for mapping in
@@ -170,6 +178,9 @@ def add_wrappings(self, module):
                                                                   {MatchedMapping(mapping, package.path)
                                                                    for mapping in mappings}))
 
+        if not affected:
+            module_wrapper.add_unaffected_module_name(reference)
+
         if reference in _import_loggers_queues:
             # execute import logger of this reference
             while len(_import_loggers_queues[reference]) > 0:
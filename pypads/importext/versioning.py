@@ -1,4 +1,5 @@
 import re
+from functools import lru_cache
 from typing import Type
 
 from pydantic.main import BaseModel
@@ -10,6 +11,22 @@ from pypads.model.metadata import ModelObject
 from pypads.utils.util import is_package_available, find_package_version, find_package_regex_versions
 
 
+@lru_cache(maxsize=None)
+def _parse_constraint(constraint):
+    """
+    Parse a version constraint. Constraints are immutable and therefore shared by all selectors using them.
+    :param constraint: Constraint string
+    :return: VersionConstraint
+    """
+    return parse_constraint(constraint)
+
+
+@lru_cache(maxsize=1024)
+def _parse_version(version):
+    from pypads.importext.semver import Version
+    return Version.parse(version)
+
+
 class LibSelector(ModelObject):
     """
     Selector class holding version constraint and name of a library. @see poetry sem versioning
@@ -22,7 +39,7 @@ class LibSelector(ModelObject):
     def __init__(self, *args, name, regex=False, constraint: str = "*", specificity: int = None, **kwargs) -> None:
         super().__init__(*args, name=name, regex=regex, constraint=constraint,
                          specificity=specificity or self._calc_specificity(), **kwargs)
-        self._parsed_constraint = parse_constraint(constraint)
+        self._parsed_constraint = _parse_constraint(constraint)
 
     @staticmethod
     def from_dict(library):
@@ -68,8 +85,7 @@ class LibSelector(ModelObject):
         :param version:
         :return:
         """
-        from pypads.importext.semver import Version
-        return self._parsed_constraint.allows(Version.parse(version))
+        return self._parsed_constraint.allows(_parse_version(version))
 
     def __str__(self):
         return "LibSelector[name=" + self.name + "," + self.constraint + "]"
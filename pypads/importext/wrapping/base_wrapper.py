@@ -33,6 +33,9 @@ class Context(ModelHolder):
     Context of the wrapping. In general this is a class or module
     """
 
+    # Incremented whenever hooks or mappings are stored to invalidate compiled hook chains
+    hook_version = 0
+
     @classmethod
     def get_model_cls(cls) -> Type[BaseModel]:
         return ContextModel
@@ -72,6 +75,7 @@ class Context(ModelHolder):
             if not hasattr(holder, "_pypads_mapping_" + wrappee.__name__):
                 setattr(holder, "_pypads_mapping_" + wrappee.__name__, set())
             getattr(holder, "_pypads_mapping_" + wrappee.__name__).add(matched_mapping)
+            Context.hook_version += 1
 
         except TypeError as e:
             logger.debug("Can't set attribute '" + wrappee.__name__ + "' on '" + str(self._c) + "'.")
@@ -87,6 +91,7 @@ class Context(ModelHolder):
             if not hasattr(holder, "_pypads_hooks_" + wrappee.__name__):
                 setattr(holder, "_pypads_hooks_" + wrappee.__name__, set())
             getattr(holder, "_pypads_hooks_" + wrappee.__name__).add(hook)
+            Context.hook_version += 1
 
         except TypeError as e:
             logger.debug("Can't set attribute '" + wrappee.__name__ + "' on '" + str(self._c) + "'.")
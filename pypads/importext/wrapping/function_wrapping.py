@@ -1,4 +1,6 @@
+import threading
 import types
+from collections import OrderedDict
 from contextlib import contextmanager
 from functools import wraps
 from typing import Set
@@ -6,13 +8,132 @@ from typing import Set
 from pypads import logger
 from pypads.app.call import FunctionReference, CallAccessor, Call
 from pypads.app.env import InjectionLoggerEnv
+from pypads.bindings.sampling import get_sampling_policy
 from pypads.importext.mappings import MatchedMapping
 from pypads.importext.wrapping.base_wrapper import BaseWrapper, Context
 from pypads.injections.analysis.call_tracker import add_call, finish_call
+from pypads.utils.logging_util import merge_mapping_data
 from pypads.utils.util import get_experiment_id, get_run_id
+from pypads.variables import hook_sampling
 
 error = False
 
+# Descriptions of the last seen instances for debug messages. Keyed by id of the instance.
+MAX_INSTANCE_DESCRIPTIONS = 256
+_instance_descriptions = OrderedDict()
+_instance_descriptions_lock = threading.Lock()
+
+
+def describe_instance(instance):
+    """
+    Get a printable description of an instance. Building the string representation of an estimator or a model can be
+    expensive, therefore the last MAX_INSTANCE_DESCRIPTIONS descriptions are cached.
+    :param instance: Instance to describe
+    :return: Description of the instance
+    """
+    key = id(instance)
+    with _instance_descriptions_lock:
+        cached = _instance_descriptions.get(key)
+        # Ids can be reused after an object got garbage collected
+        if cached is not None and cached[0] is type(instance):
+            _instance_descriptions.move_to_end(key)
+            return cached[1]
+    try:
+        description = str(instance)
+    except Exception as e:
+        if hasattr(instance, '__class__'):
+            if hasattr(instance.__class__, '__name__'):
+                description = instance.__class__.__name__
+            else:
+                description = str(instance.__class__)
+        else:
+            description = ""
+    with _instance_descriptions_lock:
+        _instance_descriptions[key] = (type(instance), description)
+        if len(_instance_descriptions) > MAX_INSTANCE_DESCRIPTIONS:
+            _instance_descriptions.popitem(last=False)
+    return description
+
+
+class _HookBinding:
+    """
+    Instance and env of a single hook in the chain of a tracked call.
+    """
+    __slots__ = ["instance", "env"]
+
+    def __init__(self, instance, env):
+        self.instance = instance
+        self.env = env
+
+
+class HookChain:
+    """
+    Precompiled dispatch chain of the hooks of a wrapped function. The hooks are sorted and the mapping data is merged
+    only once instead of on every call. Hooks with a sampling policy are skipped on calls the policy doesn't sample.
+    The state of the policies is kept in the run cache, as the chain is recompiled whenever hooks are stored. The chain
+    only holds the policies resolved for the last run it was called in.
+    """
+
+    def __init__(self, hooks, mappings, env_setter, version, policies=None, key=None, pads=None):
+        """
+        :param hooks: Sorted (hook, config) tuples
+        :param mappings: Matched mappings of the wrapped function
+        :param env_setter: Function setting the env of a hook
+        :param version: Version of the stored hooks the chain was compiled for
+        :param policies: Sampling policies by event name of the hook config
+        :param key: Key of the wrapped function the state of the sampling policies is kept for
+        :param pads: PyPads instance holding the state of the sampling policies in its run cache
+        """
+        policies = policies or {}
+        self.hooks = tuple((hook, config, policies.get(config.event_name) or None) for hook, config in hooks)
+        self.key = key
+        self.pads = pads
+        # Run id and the policies resolved for it by event name
+        self._resolved = (None, {})
+        self.mappings = mappings
+        self.data = merge_mapping_data(mappings) if mappings else {}
+        self.env_setter = env_setter
+        self.version = version
+
+    def bind(self, callback, instance, call: Call):
+        """
+        Stack the hooks of the chain on top of the callback for a single call.
+        :param callback: Function to call after all hooks
+        :param instance: Instance or class the function is called on. None for static methods and functions.
+        :param call: Tracked call
+        :return: Callback executing the first hook
+        """
+        if not self.hooks:
+            return callback
+        experiment_id = get_experiment_id()
+        run_id = get_run_id()
+        policies = self._policies(run_id)
+        for hook, config, policy in self.hooks:
+            # For every hook we defined on the given function in out mapping file execute it before running the code
+            if policy is not None and not policies[config.event_name].sample(run_id):
+                continue
+            if call.has_hook(hook):
+                logger.opt(lazy=True).debug("{} defined hook with config {} is tracked multiple times on {}. Ignoring "
+                                            "second hooking.", lambda: hook, lambda: config, lambda: call)
+                continue
+            env = InjectionLoggerEnv(self.mappings, hook, callback, call, config.parameters, experiment_id, run_id,
+                                     data=self.data)
+            callback = types.MethodType(self.env_setter, _HookBinding(instance, env))
+        return callback
+
+    def _policies(self, run_id):
+        """
+        Get the sampling policies of the hooks for given run. They are looked up in the run cache only once per run.
+        :param run_id: Id of the active run
+        :return: Sampling policies by event name
+        """
+        resolved_run_id, policies = self._resolved
+        if resolved_run_id != run_id:
+            policies = {config.event_name: get_sampling_policy(self.pads, (self.key, config.event_name), policy)
+                        for hook, config, policy in self.hooks if policy is not None}
+            self._resolved = (run_id, policies)
+        return policies
+
 
 class FunctionWrapper(BaseWrapper):
 
@@ -128,16 +249,6 @@ class FunctionWrapper(BaseWrapper):
         call = None
         try:
             current_call: Call = self._pypads.call_tracker.current_call()
-            try:
-                instance_str = str(instance)
-            except Exception as e:
-                if hasattr(instance, '__class__'):
-                    if hasattr(instance.__class__, '__name__'):
-                        instance_str =  instance.__class__.__name__
-                    else:
-                        instance_str = str(instance.__class__)
-                else:
-                    instance_str = ""
             # Don't make a new call if the last call has the same identity as the current one
             # Or if the instance method access yields a different method than the current original (inherited methods)
             # And the instance as well as the function name where the same
@@ -150,10 +261,13 @@ class FunctionWrapper(BaseWrapper):
                 # if not fn_reference.context.original(
                 #        fn_reference.wrappee) == fn_reference.wrappee and current_call is not None:
                 call = current_call
-                logger.debug(f"Reused existing call {call} in {fn_reference} of {instance_str}.")
+                # Only describe the instance if the message is going to be logged
+                logger.opt(lazy=True).debug("Reused existing call {} in {} of {}.", lambda: call,
+                                            lambda: fn_reference, lambda: describe_instance(instance))
             else:
                 call = add_call(accessor)
-                logger.debug(f"Created new call to track {call} in {fn_reference} of {instance_str}.")
+                logger.opt(lazy=True).debug("Created new call to track {} in {} of {}.", lambda: call,
+                                            lambda: fn_reference, lambda: describe_instance(instance))
             yield call
         finally:
             if call and not current_call == call:
@@ -172,7 +286,7 @@ class FunctionWrapper(BaseWrapper):
             @wraps(fn)
             def entry(*args, _pypads_context=context, _pypads_mapped_by=mappings, **kwargs):
 
-                logger.debug("Call to tracked static method or function " + str(fn))
+                logger.debug("Call to tracked static method or function {}", fn)
 
                 global error
                 if self._pypads.api.active_run():
@@ -188,12 +302,7 @@ class FunctionWrapper(BaseWrapper):
                             out = callback(*args, **kwargs)
                             return out
 
-                        hooks = context.get_hooks(fn)
-
-                        for (h, config) in hooks:
-                            c = self._add_hook(h, config, callback, call, context.get_wrap_metas(fn))
-                            if c:
-                                callback = c
+                        callback = self._get_hook_chain(fn_reference, context, fn).bind(callback, None, call)
 
                         # start executing the stack
                         out = callback(*args, **kwargs)
@@ -208,7 +317,7 @@ class FunctionWrapper(BaseWrapper):
             @wraps(fn)
             def entry(_self, *args, _pypads_context=context, _pypads_mapped_by=mappings, **kwargs):
                 # print("Call to tracked class method " + str(fn) + str(id(fn)))
-                logger.debug("Call to tracked method " + str(fn))
+                logger.debug("Call to tracked method {}", fn)
 
                 global error
                 if self._pypads.api.active_run():
@@ -225,12 +334,7 @@ class FunctionWrapper(BaseWrapper):
                             out = callback(*args, **kwargs)
                             return out
 
-                        hooks = context.get_hooks(fn)
-
-                        for (h, config) in hooks:
-                            c = self._add_hook(h, config, callback, call, context.get_wrap_metas(fn))
-                            if c:
-                                callback = types.MethodType(c, _self)
+                        callback = self._get_hook_chain(fn_reference, context, fn).bind(callback, _self, call)
 
                         # start executing the stack
                         out = callback(*args, **kwargs)
@@ -246,7 +350,7 @@ class FunctionWrapper(BaseWrapper):
         elif fn_reference.is_class_method():
             @wraps(fn)
             def entry(_cls, *args, _pypads_context=context, pypads_mapped_by=mappings, **kwargs):
-                logger.debug("Call to tracked class method " + str(fn))
+                logger.debug("Call to tracked class method {}", fn)
 
                 global error
                 if self._pypads.api.active_run():
@@ -263,12 +367,7 @@ class FunctionWrapper(BaseWrapper):
                             out = callback(*args, **kwargs)
                             return out
 
-                        hooks = context.get_hooks(fn)
-
-                        for (h, config) in hooks:
-                            c = self._add_hook(h, config, callback, call, context.get_wrap_metas(fn))
-                            if c:
-                                callback = types.MethodType(c, _cls)
+                        callback = self._get_hook_chain(fn_reference, context, fn).bind(callback, _cls, call)
 
                         # start executing the stack
                         out = callback(*args, **kwargs)
@@ -286,7 +385,7 @@ class FunctionWrapper(BaseWrapper):
 
             @wraps(tmp_fn)
             def entry(_self, *args, _pypads_context=context, _pypads_mapped_by=mappings, **kwargs):
-                logger.debug("Call to tracked _IffHasAttrDescriptor " + str(fn))
+                logger.debug("Call to tracked _IffHasAttrDescriptor {}", fn)
 
                 global error
                 if self._pypads.api.active_run():
@@ -303,12 +402,7 @@ class FunctionWrapper(BaseWrapper):
                             out = callback(*args, **kwargs)
                             return out
 
-                        hooks = context.get_hooks(fn)
-
-                        for (h, config) in hooks:
-                            c = self._add_hook(h, config, callback, call, context.get_wrap_metas(fn))
-                            if c:
-                                callback = types.MethodType(c, _self)
+                        callback = self._get_hook_chain(fn_reference, context, fn).bind(callback, _self, call)
 
                         # start executing the stack
                         out = callback(*args, **kwargs)
@@ -327,60 +421,42 @@ class FunctionWrapper(BaseWrapper):
         # print("Wrapped " + str(fn) + str(id(fn)))
         return entry
 
-    def _add_hook(self, hook, config, callback, call: Call, mappings, data=None):
-        # For every hook we defined on the given function in out mapping file execute it before running the code
-        if not call.has_hook(hook):
-            return self._get_env_setter(
-                _pypads_env=InjectionLoggerEnv(mappings, hook, callback, call, config.parameters, get_experiment_id(),
-                                               get_run_id(), data=data))
-        else:
-            logger.debug(
-                f"{hook} defined hook with config {config} is tracked multiple times on {call}. Ignoring second hooking.")
-            return None
-
-    def _get_env_setter(self, _pypads_env: InjectionLoggerEnv):
+    def _get_hook_chain(self, fn_reference: FunctionReference, context: Context, fn):
+        """
+        Get the compiled hook chain of a wrapped function. The chain is compiled on the first call and recompiled only
+        if hooks or mappings were stored in the meantime.
+        :param fn_reference: Reference to the wrapped function
+        :param context: Context holding the hooks of the function
+        :param fn: Wrapped function
+        :return: HookChain
         """
-        This wrapper sets the context
+        chain = fn_reference._hook_chain
+        if chain is None or chain.version != Context.hook_version:
+            chain = HookChain(context.get_hooks(fn), context.get_wrap_metas(fn),
+                              self._get_env_setter(fn_reference), Context.hook_version,
+                              policies=self._pypads.config.get(hook_sampling, {}),
+                              key=(fn_reference.context.reference, fn_reference.fn_name), pads=self._pypads)
+            fn_reference._hook_chain = chain
+        return chain
+
+    def _get_env_setter(self, fn_reference: FunctionReference):
+        """
+        This wrapper sets the context. The setter is bound to a _HookBinding holding the instance and the env of the hook.
         :return:
         """
-        env = _pypads_env
-        call: Call = env.call
-        cid = call.call_id
-
-        # TODO maybe use https://gist.github.com/MacHu-GWU/0170849f693aa5f8d129aa03fc358305
-        if cid.is_static_method():
-            @wraps(cid.wrappee)
-            def env_setter(*args, _pypads_env=env, **kwargs):
-                logger.debug("Static method hook " + str(cid.context) + str(cid.wrappee) + str(env.hook))
-                return self._wrapped_inner_function(None, *args, _pypads_env=_pypads_env, **kwargs)
-
-            return env_setter
-        elif cid.is_function():
-            @wraps(cid.wrappee)
-            def env_setter(_self, *args, _pypads_env=env, **kwargs):
-                logger.debug("Method hook " + str(cid.context) + str(cid.wrappee) + str(env.hook))
-                return self._wrapped_inner_function(_self, *args, _pypads_env=_pypads_env, **kwargs)
-
-            return env_setter
-        elif cid.is_class_method():
-            @wraps(cid.wrappee)
-            def env_setter(_cls, *args, _pypads_env=env, **kwargs):
-                logger.debug("Class method hook " + str(cid.context) + str(cid.wrappee) + str(env.hook))
-                return self._wrapped_inner_function(_cls, *args, _pypads_env=_pypads_env,
-                                                    **kwargs)
-
-            return env_setter
-        elif cid.is_special_wrapped():
-            tmp_fn = getattr(cid.context.container, cid.wrappee.__name__)
+        if fn_reference.is_special_wrapped():
+            wrappee = getattr(fn_reference.context.container, fn_reference.wrappee.__name__)
+        else:
+            wrappee = fn_reference.wrappee
 
-            @wraps(tmp_fn)
-            def env_setter(_self, *args, _pypads_env=env, **kwargs):
-                logger.debug("Method hook " + str(cid.context) + str(cid.wrappee) + str(env.hook))
-                return self._wrapped_inner_function(_self, *args, _pypads_env=_pypads_env, **kwargs)
+        @wraps(wrappee)
+        def env_setter(_pypads_binding, *args, **kwargs):
+            env = _pypads_binding.env
+            logger.opt(lazy=True).debug("Hook {} on {}.{}", lambda: env.hook, lambda: fn_reference.context,
+                                        lambda: fn_reference.wrappee)
+            return self._wrapped_inner_function(_pypads_binding.instance, *args, _pypads_env=env, **kwargs)
 
-            return env_setter
-        else:
-            raise ValueError("Failed!")
+        return env_setter
 
     @staticmethod
     def _wrapped_inner_function(_self, *args, _pypads_env: InjectionLoggerEnv, **kwargs):
@@ -11,6 +11,8 @@ class ModuleWrapper(BaseWrapper):
     def __init__(self, pypads):
         super().__init__(pypads)
         self._punched_module_names = set()
+        self._unaffected_module_names = set()
+        self._known_unaffected_module_names = frozenset()
 
     @property
     def punched_module_names(self):
@@ -19,6 +21,27 @@ class ModuleWrapper(BaseWrapper):
     def add_punched_module_name(self, name):
         self._punched_module_names.add(name)
 
+    @property
+    def unaffected_module_names(self):
+        """
+        Names of the modules which were searched for mappings on import without finding any.
+        """
+        return self._unaffected_module_names
+
+    def add_unaffected_module_name(self, name):
+        self._unaffected_module_names.add(name)
+
+    @property
+    def known_unaffected_module_names(self):
+        """
+        Names of the modules another process already searched for mappings without finding any. Searching them again
+        on import is skipped.
+        """
+        return self._known_unaffected_module_names
+
+    def set_known_unaffected_module_names(self, names):
+        self._known_unaffected_module_names = frozenset(names)
+
     def wrap(self, module, context, matched_mappings: Set[MatchedMapping]):
         """
         Function to wrap modules with pypads functionality
@@ -1,7 +1,6 @@
-from collections.__init__ import OrderedDict
-
 from pypads import logger
 from pypads.app.call import CallAccessor, CallId, Call
+from pypads.variables import keep_finished_calls
 
 
 # class CallMapping(CallAccessor):
@@ -15,6 +14,73 @@ from pypads.app.call import CallAccessor, CallId, Call
 #         return self._mapping
 
 
+class CallRegistry:
+    """
+    Index assigning instance numbers and counting the calls per function and instance. Call objects are only kept
+    if configured. Otherwise they are dropped as soon as they are finished.
+    """
+
+    def __init__(self, keep_calls=True):
+        """
+        :param keep_calls: Keep finished call objects. If False only the counters are kept.
+        """
+        self._keep_calls = keep_calls
+        self._instance_numbers = {}
+        self._counters = {}
+        self._calls = {}
+
+    @property
+    def keep_calls(self):
+        return self._keep_calls
+
+    def instance_number(self, function_id, instance_id):
+        """
+        Get the number of an instance for a function. Instances are numbered in the order of their first call.
+        :param function_id: Id of the function
+        :param instance_id: Id of the instance
+        :return:
+        """
+        instances = self._instance_numbers.setdefault(function_id, {})
+        if instance_id not in instances:
+            instances[instance_id] = len(instances)
+        return instances[instance_id]
+
+    def call_number(self, function_id, instance_id):
+        """
+        Get the number of calls of a function on an instance.
+        :param function_id: Id of the function
+        :param instance_id: Id of the instance
+        :return:
+        """
+        return self._counters.get((function_id, instance_id), 0)
+
+    def calls(self, function_id, instance_id):
+        """
+        Get the stored calls of a function on an instance.
+        :param function_id: Id of the function
+        :param instance_id: Id of the instance
+        :return:
+        """
+        return self._calls.get((function_id, instance_id), [])
+
+    def add(self, call: Call):
+        key = (call.call_id.function_id, call.call_id.instance_id)
+        self._counters[key] = self._counters.get(key, 0) + 1
+        self._calls.setdefault(key, []).append(call)
+
+    def finish(self, call: Call):
+        if not self._keep_calls:
+            key = (call.call_id.function_id, call.call_id.instance_id)
+            calls = self._calls.get(key)
+            if calls is not None:
+                try:
+                    calls.remove(call)
+                except ValueError:
+                    pass
+                if len(calls) == 0:
+                    del self._calls[key]
+
+
 class CallTracker:
     """
     This class tracks the number of execution per instance of an object.
@@ -25,16 +91,7 @@ class CallTracker:
         self._call_stack = []
 
     def instance_call_number(self, accessor):
-        function_calls: OrderedDict = self.function_call_dict(accessor.function_id)
-        instance_id = accessor.instance_id
-
-        call_items = list(function_calls.items())
-        for instance_number in range(0, len(call_items)):
-            # noinspection PyUnresolvedReferences
-            key, value = call_items[instance_number]
-            if key == instance_id:
-                return instance_number
-        return 0
+        return self.call_registry().instance_number(accessor.function_id, accessor.instance_id)
 
     @property
     def call_stack(self):
@@ -49,7 +106,7 @@ class CallTracker:
         :param accessor:
         :return:
         """
-        return len(self.calls(accessor))
+        return self.call_registry().call_number(accessor.function_id, accessor.instance_id)
 
     def make_call_id(self, accessor: CallAccessor) -> CallId:
         """
@@ -67,7 +124,7 @@ class CallTracker:
         :return:
         """
         call = self._call_stack[-1]
-        return self.call_number(call.accessor)
+        return self.call_number(call.call_id)
 
     def current_call(self):
         """
@@ -79,36 +136,24 @@ class CallTracker:
     def current_process(self):
         return str(self._call_stack[-1].call_id.process) + "." + str(self._call_stack[-1].call_id.thread)
 
-    def call_objects(self):
+    def call_registry(self) -> CallRegistry:
         """
-        Get all call objects which are stored in our tracker.
+        Get the registry of the calls of the current run.
         :return:
         """
-        # Add call_objects if not exists in cache
-        if not self._pads.cache.run_exists("call_objects"):
-            self._pads.cache.run_add("call_objects", {})
-        return self._pads.cache.run_get("call_objects")
-
-    def function_call_dict(self, function_id) -> OrderedDict:
-        call_objects = self.call_objects()
-        if function_id not in call_objects:
-            call_objects[function_id] = OrderedDict()
-        return call_objects[function_id]
+        # Add call_registry if not exists in cache
+        if not self._pads.cache.run_exists("call_registry"):
+            self._pads.cache.run_add("call_registry",
+                                     CallRegistry(keep_calls=self._pads.config.get(keep_finished_calls, True)))
+        return self._pads.cache.run_get("call_registry")
 
     def calls(self, accessor: CallAccessor):
         """
-        Get all calls of given call accessor.
+        Get all stored calls of given call accessor.
         :param accessor:
         :return:
         """
-        instance_id = accessor.instance_id
-        function_id = accessor.function_id
-
-        function_calls = self.function_call_dict(function_id)
-        if instance_id not in function_calls:
-            function_calls[instance_id] = []
-
-        return function_calls[instance_id]
+        return self.call_registry().calls(accessor.function_id, accessor.instance_id)
 
     def is_recursive(self, accessor: CallAccessor):
         # TODO change the naming
@@ -126,17 +171,18 @@ class CallTracker:
         :return: A dict for holding information about the call.
         """
         self._call_stack.append(call)
-
-        calls = self.calls(call.call_id)
-        calls.append(call)
+        self.call_registry().add(call)
         return call
 
     def finish(self, call):
-        if call in self._call_stack:
+        if len(self._call_stack) > 0 and self._call_stack[-1] is call:
+            self._call_stack.pop()
+        elif call in self._call_stack:
             self._call_stack.remove(call)
-            # TODO clear memory in call_objects?
         else:
             logger.error("Tried to finish call which is not on the stack. " + str(call))
+            return
+        self.call_registry().finish(call)
 
 
 def add_call(accessor):
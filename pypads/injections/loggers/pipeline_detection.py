@@ -1,17 +1,17 @@
 import os
 import pathlib
 from dataclasses import dataclass
-from typing import Type, Union
+from typing import Type, Union, List
 
 from pydantic import BaseModel
 
 from pypads import logger
 from pypads.app.env import LoggerEnv
 from pypads.app.injections.injection import InjectionLoggerCall, MultiInjectionLogger, MultiInjectionLoggerCall
-from pypads.app.injections.tracked_object import TrackedObject
+from pypads.app.injections.tracked_object import TrackedObject, Artifact
 from pypads.model.logger_call import InjectionLoggerCallModel
 from pypads.model.logger_output import OutputModel, TrackedObjectModel
-from pypads.utils.logging_util import get_temp_folder
+from pypads.utils.logging_util import get_temp_folder, FileFormats
 from pypads.utils.util import is_package_available
 
 
@@ -125,6 +125,123 @@ DATA_EDGE = "data_flow"
 DATA_ID_EDGE = "data_id"
 CALL_ORDER_EDGE = "call_order"
 
+# Edge kinds are stored as their index in this tuple
+EDGE_KINDS = (OF_EDGE, DATA_EDGE, DATA_ID_EDGE, CALL_ORDER_EDGE)
+
+# Number of edges after which the edge log is flushed into an artifact
+EDGE_LOG_CHUNK_SIZE = 10000
+
+ENTRY_NODE = -1
+
+
+class PipelineEdgeLog:
+    """
+    Append-only log of the nodes and edges of a pipeline. Nodes get integer ids and their label is only written once.
+    Edges are kept as (source, target, kind, step) tuples until they are flushed in chunks. Only the nodes of processes,
+    threads, classes, instances and functions are remembered. Nodes of single calls are written once and forgotten.
+    """
+
+    def __init__(self, chunk_size=EDGE_LOG_CHUNK_SIZE):
+        self._chunk_size = chunk_size
+        self._node_ids = {}
+        self._of_edges = set()
+        self._nodes = []
+        self._edges = []
+        self._number_of_nodes = 0
+        self._number_of_edges = 0
+
+    @property
+    def number_of_nodes(self):
+        return self._number_of_nodes + (1 if ENTRY_NODE in self._node_ids else 0)
+
+    @property
+    def number_of_edges(self):
+        return self._number_of_edges
+
+    def node(self, node):
+        """
+        Get the id of a node. Unknown nodes are added to the log.
+        :param node: Node to add
+        :return: Integer id of the node
+        """
+        node_id = self._node_ids.get(node)
+        if node_id is None:
+            node_id = ENTRY_NODE if node == ENTRY_NODE else self._new_id()
+            self._node_ids[node] = node_id
+            self._nodes.append((node_id, "entry" if node == ENTRY_NODE else str(node)))
+        return node_id
+
+    def call_node(self, node):
+        """
+        Add the node of a single call. Calls are unique, therefore the node isn't remembered.
+        :param node: Node to add
+        :return: Integer id of the node
+        """
+        node_id = self._new_id()
+        self._nodes.append((node_id, str(node)))
+        return node_id
+
+    def _new_id(self):
+        node_id = self._number_of_nodes
+        self._number_of_nodes += 1
+        return node_id
+
+    def add_edge(self, source: int, target: int, kind, step=None):
+        self._edges.append((source, target, EDGE_KINDS.index(kind), step))
+        self._number_of_edges += 1
+
+    def add_of_edge(self, child: int, parent: int):
+        """
+        Add an edge from a node to the node it is part of. The edge is only added once.
+        Use add_edge for call nodes, as their edges are unique anyway.
+        """
+        if (child, parent) not in self._of_edges:
+            self._of_edges.add((child, parent))
+            self.add_edge(child, parent, OF_EDGE)
+
+    def is_full(self):
+        return len(self._edges) >= self._chunk_size
+
+    def has_pending(self):
+        return len(self._nodes) > 0 or len(self._edges) > 0
+
+    def pending_chunk(self):
+        """
+        Get the nodes and edges added since the last chunk without removing them from the log.
+        :return: Json serializable chunk
+        """
+        return {"edge_kinds": list(EDGE_KINDS), "nodes": list(self._nodes), "edges": list(self._edges)}
+
+    def pop_chunk(self):
+        """
+        Get the nodes and edges added since the last chunk.
+        :return: Json serializable chunk
+        """
+        chunk = {"edge_kinds": list(EDGE_KINDS), "nodes": self._nodes, "edges": self._edges}
+        self._nodes = []
+        self._edges = []
+        return chunk
+
+    @staticmethod
+    def to_network(chunks):
+        """
+        Rebuild a networkx graph from chunks of the edge log.
+        :param chunks: Chunks of the edge log in any order
+        :return: MultiDiGraph
+        """
+        from networkx import MultiDiGraph
+        network = MultiDiGraph()
+        for chunk in chunks:
+            for node_id, label in chunk["nodes"]:
+                network.add_node(node_id, label=label)
+        for chunk in chunks:
+            kinds = chunk.get("edge_kinds", EDGE_KINDS)
+            for source, target, kind, step in chunk["edges"]:
+                kind = kinds[kind]
+                network.add_edge(source, target, plain_label=kind,
+                                 label=kind if step is None else f"{step}:{kind}")
+        return network
+
 
 class PipelineTO(TrackedObject):
     """
@@ -135,9 +252,11 @@ class PipelineTO(TrackedObject):
         type: str = "Pipeline"
         description = "The Pipeline of the experiment."
 
-        network: dict = ...
+        edge_log: List[str] = []  # Paths of the artifacts holding the chunks of the edge log
         pipeline_type: str = ...
         number_of_steps: int = ...
+        number_of_nodes: int = ...
+        number_of_edges: int = ...
 
         class Config:
             orm_mode = True
@@ -147,48 +266,70 @@ class PipelineTO(TrackedObject):
     def get_model_cls(cls) -> Type[BaseModel]:
         return cls.PipelineModel
 
-    def __init__(self, *args, network=None, pipeline_type="", **kwargs):
+    def __init__(self, *args, pipeline_type="", **kwargs):
         self._data_flow = {}
         self._data_id_flow = {}
         self._last_tracked = None
         self._number_of_steps = 0
-        self._network = network
+        self._log = PipelineEdgeLog()
+        self._edge_log = []
         super().__init__(*args, pipeline_type=pipeline_type, **kwargs)
 
-    def _get_network(self):
-        return self.network
+    @property
+    def log(self):
+        return self._log
 
-    def _set_network(self, network: dict):
-        self.network = network
+    @property
+    def edge_log(self):
+        return self._edge_log
 
     @property
-    def network(self):
-        import networkx as nx
-        return self._convert_nodes_to_str(nx.to_dict_of_dicts(self._network))
-
-    def _convert_nodes_to_str(self, network_dict):
-        out = {}
-        for k, v in network_dict.items():
-            if isinstance(v, dict):
-                out[self._convert_node_to_str(k)] = self._convert_nodes_to_str(v)
-            else:
-                out[self._convert_node_to_str(k)] = v
-        return out
+    def number_of_nodes(self):
+        return self._log.number_of_nodes
 
-    @staticmethod
-    def _convert_node_to_str(node):
-        if isinstance(node, str):
-            return node
-        else:
-            return str(node)
+    @property
+    def number_of_edges(self):
+        return self._log.number_of_edges
+
+    def flush(self):
+        """
+        Store the pending part of the edge log as artifact.
+        :return:
+        """
+        if not self._log.has_pending():
+            return
+        artifact = Artifact(data=f"pipeline/edge_log_{len(self._edge_log)}", content=self._log.pop_chunk(),
+                            file_format=FileFormats.json, description="A chunk of the edge log of the pipeline.",
+                            parent=self)
+        artifact.store()
+        self._edge_log.append(artifact.data)
+        # The chunk is loaded from the backend again if needed
+        artifact._content = None
 
     @property
     def nx_network(self):
-        return self._network
+        """
+        Rebuild the networkx graph of the pipeline from the stored edge log and the pending part of the log.
+        Reading the network doesn't store anything, call flush to write the pending part.
+        :return:
+        """
+        from pypads.app.pypads import get_current_pads
+        pads = get_current_pads()
+        chunks = [pads.backend.load_artifact_data(self.run.uid, path) for path in self._edge_log]
+        chunks.append(self._log.pending_chunk())
+        return PipelineEdgeLog.to_network(chunks)
 
-    @network.setter
-    def network(self, value):
-        self._network = value
+    @staticmethod
+    def load_network(run_id, edge_log):
+        """
+        Rebuild the networkx graph of a stored pipeline.
+        :param run_id: Run the pipeline was logged in
+        :param edge_log: Paths of the chunks of the edge log
+        :return: MultiDiGraph
+        """
+        from pypads.app.pypads import get_current_pads
+        pads = get_current_pads()
+        return PipelineEdgeLog.to_network([pads.backend.load_artifact_data(run_id, path) for path in edge_log])
 
     @property
     def last_tracked(self):
@@ -223,8 +364,8 @@ class PipelineTO(TrackedObject):
 
 class PipelineTrackerILF(MultiInjectionLogger):
     """
-    Injection logger to track the execution graph of calls themselves. The logger itself uses networkx to build a
-    call graph.
+    Injection logger to track the execution graph of calls themselves. The calls are written to an edge log which
+    can be rebuilt into a networkx call graph.
     """
     name = "Generic Pipeline Logger"
     type: str = "PipelineLogger"
@@ -257,18 +398,16 @@ class PipelineTrackerILF(MultiInjectionLogger):
     @staticmethod
     def finalize_output(pads, logger_call, output, *args, **kwargs):
         pipeline: PipelineTO = pads.cache.run_get("pipeline")
-
-        from networkx import MultiDiGraph
-        network: MultiDiGraph = pipeline.nx_network
-
-        base_folder = get_temp_folder()
-        path = os.path.join(base_folder, "pipeline_graph.png")
-        if not os.path.exists(base_folder):
-            pathlib.Path(base_folder).mkdir(parents=True, exist_ok=True)
+        pipeline.flush()
 
         if is_package_available("agraph") and is_package_available("graphviz") and is_package_available("pygraphviz"):
+            base_folder = get_temp_folder()
+            path = os.path.join(base_folder, "pipeline_graph.png")
+            if not os.path.exists(base_folder):
+                pathlib.Path(base_folder).mkdir(parents=True, exist_ok=True)
+
             from networkx.drawing.nx_agraph import to_agraph
-            agraph = to_agraph(network)
+            agraph = to_agraph(pipeline.nx_network)
             agraph.layout('dot')
             agraph.draw(path)
             pipeline.store_artifact(path, "pipeline_graph.png",
@@ -352,16 +491,6 @@ class PipelineTrackerILF(MultiInjectionLogger):
         # call.output = output.store()
         # call.store()
 
-    @staticmethod
-    def _add_to_network(node, network):
-        if not network.has_node(node):
-            network.add_node(node, label=str(node))
-
-    @staticmethod
-    def _add_of_edge(child, parent, network):
-        if not network.has_edge(child, parent, OF_EDGE):
-            network.add_edge(child, parent, plain_label=OF_EDGE, label=OF_EDGE)
-
     def __pre__(self, ctx, *args, _logger_call: Union[MultiInjectionLoggerCall, InjectionLoggerCallModel],
                 _pypads_pipeline_type="normal", _pypads_pipeline_args=False, _pypads_env: LoggerEnv, _logger_output,
                 **kwargs):
@@ -372,15 +501,14 @@ class PipelineTrackerILF(MultiInjectionLogger):
         # Initialized the pipeline_tracker by adding itself to the cache
         pads = _pypads_env.pypads
 
-        # Get the network from the shared logger output
-        import networkx as nx
+        # Get the edge log from the shared logger output
         if not pads.cache.run_exists("pipeline"):
-            pipeline = PipelineTO(network=nx.MultiDiGraph(), parent=_logger_output, pipeline_type=_pypads_pipeline_type)
+            pipeline = PipelineTO(parent=_logger_output, pipeline_type=_pypads_pipeline_type)
             pads.cache.run_add("pipeline", pipeline)
         else:
             pipeline = pads.cache.run_get("pipeline")
 
-        network = pipeline.nx_network
+        log = pipeline.log
 
         # Convert current call to a nodes
         # TODO original call references the first call of the multi_injection_logger
@@ -392,51 +520,45 @@ class PipelineTrackerILF(MultiInjectionLogger):
         call_node = CallNode(call=_logger_call.call_stack[-1].call_id.call_number, function_node=function_node)
 
         # Add nodes to network
-        self._add_to_network(process_node, network)
-        self._add_to_network(thread_node, network)
-        self._add_to_network(class_node, network)
-        self._add_to_network(instance_node, network)
-        self._add_to_network(function_node, network)
-        self._add_to_network(call_node, network)
+        nodes = [log.node(n) for n in [process_node, thread_node, class_node, instance_node, function_node]]
+        call_id = log.call_node(call_node)
 
         # Interlink nodes via of_edges
-        self._add_of_edge(thread_node, process_node, network)
-        self._add_of_edge(class_node, thread_node, network)
-        self._add_of_edge(instance_node, class_node, network)
-        self._add_of_edge(function_node, instance_node, network)
-        self._add_of_edge(call_node, function_node, network)
+        for child, parent in zip(nodes[1:], nodes[:-1]):
+            log.add_of_edge(child, parent)
+        log.add_edge(call_id, nodes[-1], OF_EDGE)
 
         # Add entry edge if needed
-        if len(network.nodes) == 6:
-            network.add_node(-1, label="entry")
-            network.add_edge(-1, call_node, plain_label=CALL_ORDER_EDGE,
-                             label=f"{pipeline.number_of_steps}:{CALL_ORDER_EDGE}")
+        if pipeline.last_tracked is None:
+            log.add_edge(log.node(ENTRY_NODE), call_id, CALL_ORDER_EDGE, step=pipeline.number_of_steps)
 
         # Add order edge
-        if pipeline.last_tracked is not None:
-            network.add_edge(pipeline.last_tracked, call_node, plain_label=CALL_ORDER_EDGE,
-                             label=f"{pipeline.increment_step()}:{CALL_ORDER_EDGE}")
+        else:
+            log.add_edge(pipeline.last_tracked, call_id, CALL_ORDER_EDGE, step=pipeline.increment_step())
 
         # Add data edges
         for val in kwargs["_args"]:
-            self._check_data_edge(val, call_node, pipeline)
+            self._check_data_edge(val, call_id, pipeline)
 
         # Add data edges
         for _, val in kwargs["_kwargs"].items():
-            self._check_data_edge(val, call_node, pipeline)
+            self._check_data_edge(val, call_id, pipeline)
+
+        pipeline.last_tracked = call_id
 
-        pipeline.last_tracked = call_node
-        return call_node
+        # Write the edge log in chunks instead of keeping the whole graph
+        if log.is_full():
+            pipeline.flush()
+        return call_id
 
     @staticmethod
-    def _check_data_edge(val, call_node, pipeline):
+    def _check_data_edge(val, call_id, pipeline):
         """
-        Add data flow edges depending on the hash of the data and the id of the data
+        Add data flow edges depending on the id of the data. The ids of the results of tracked calls are
+        collected in data_id_flow by __post__.
         """
-        network = pipeline.nx_network
-        if id(val) in pipeline.data_flow:
-            network.add_edge(pipeline.data_flow[id(val)], call_node, plain_label=DATA_ID_EDGE,
-                             label=DATA_ID_EDGE)
+        if id(val) in pipeline.data_id_flow:
+            pipeline.log.add_edge(pipeline.data_id_flow[id(val)], call_id, DATA_ID_EDGE)
             # try:
             #     data_hash = persistent_hash(val)
             #     if data_hash in pipeline.data_flow:
@@ -52,6 +52,7 @@ class IGitRSF(RunSetup):
     name = "Generic Git Run Setup Logger"
     type: str = "GitRunLogger"
     _dependencies = {"git"}
+    _concurrent = True
 
     class IGitRSFOutput(OutputModel):
         type: str = "IGitRSF-Output"
@@ -90,7 +91,10 @@ class IGitRSF(RunSetup):
                     git_info.add_tag(PYPADS_GIT_BRANCH, managed_git.branch)
                     git_info.add_tag(PYPADS_GIT_DESC, repo.description, description="Repository description")
                     git_info.add_tag("pypads.git.describe", repo.git.describe("--all"), description="")
-                    git_info.store_git_log(PYPADS_GIT_REMOTES, repo.git.log(kill_after_timeout=_pypads_timeout))
+                    # The log of a commit doesn't change
+                    git_info.store_git_log(PYPADS_GIT_REMOTES, pads.host_cache.get(
+                        "git_log_" + repo.head.commit.hexsha,
+                        lambda: repo.git.log(kill_after_timeout=_pypads_timeout)))
                     remotes = repo.remotes
                     remote_out = "No remotes existing"
                     if len(remotes) > 0:
@@ -1,15 +1,464 @@
-from typing import Type, Union, Optional, List
+import math
+import random
+import threading
+import time
+from array import array
+from typing import Type, Union, Optional, List, Dict
 
 from pydantic import BaseModel
 
 from pypads import logger
 from pypads.app.env import LoggerEnv
 from pypads.app.injections.run_loggers import RunSetup
-from pypads.app.injections.tracked_object import TrackedObject
+from pypads.app.injections.tracked_object import TrackedObject, Artifact
 from pypads.app.misc.mixins import DEFAULT_ORDER
 from pypads.model.logger_output import OutputModel, TrackedObjectModel
 from pypads.model.models import IdReference
+from pypads.utils.logging_util import FileFormats
 from pypads.utils.util import sizeof_fmt, uri_to_path, PeriodicThread
+from pypads.variables import resource_sampling_period
+
+# Number of samples of a time series kept in memory before they are flushed into a segment
+SEGMENT_SIZE = 60
+
+# Number of samples per column kept to estimate the percentiles of the summary
+RESERVOIR_SIZE = 1024
+
+# Percentiles given in the summary of a time series
+SUMMARY_PERCENTILES = [50, 90, 99]
+
+
+class TimeSeriesBuffer:
+    """
+    Array backed buffer of a time series with a timestamp and a float column per measured value. Only the samples which
+    weren't popped yet are kept. The summary of each column is updated on every sample, with the percentiles being
+    estimated on a reservoir of bounded size.
+    """
+
+    def __init__(self, columns, segment_size=SEGMENT_SIZE, reservoir_size=RESERVOIR_SIZE):
+        """
+        :param columns: Names of the measured values
+        :param segment_size: Number of samples after which the buffer is full
+        :param reservoir_size: Number of samples per column used to estimate the percentiles
+        """
+        self._columns = list(columns)
+        self._segment_size = segment_size
+        self._reservoir_size = reservoir_size
+        self._timestamps = array("d")
+        self._values = [array("d") for _ in self._columns]
+        self._reservoirs = [array("d") for _ in self._columns]
+        self._min = [math.inf] * len(self._columns)
+        self._max = [-math.inf] * len(self._columns)
+        self._sum = [0.0] * len(self._columns)
+        self._number_of_samples = 0
+        self._random = random.Random()
+        self._lock = threading.Lock()
+
+    @property
+    def columns(self):
+        return self._columns
+
+    @property
+    def number_of_samples(self):
+        return self._number_of_samples
+
+    def add(self, values, timestamp=None):
+        """
+        Add a sample to the time series.
+        :param values: Value for each of the columns
+        :param timestamp: Time of the sample. Defaults to now.
+        :return:
+        """
+        if len(values) != len(self._columns):
+            raise ValueError("Sample {} doesn't match the columns {}.".format(values, self._columns))
+        with self._lock:
+            self._timestamps.append(time.time() if timestamp is None else timestamp)
+            # Reservoir sampling: every sample ends up in the reservoir with the same probability
+            slot = self._number_of_samples if self._number_of_samples < self._reservoir_size else \
+                self._random.randrange(self._number_of_samples + 1)
+            for i, value in enumerate(values):
+                value = float(value)
+                self._values[i].append(value)
+                self._min[i] = min(self._min[i], value)
+                self._max[i] = max(self._max[i], value)
+                self._sum[i] += value
+                if slot == len(self._reservoirs[i]):
+                    self._reservoirs[i].append(value)
+                elif slot < self._reservoir_size:
+                    self._reservoirs[i][slot] = value
+            self._number_of_samples += 1
+
+    def is_full(self):
+        return len(self._timestamps) >= self._segment_size
+
+    def has_pending(self):
+        return len(self._timestamps) > 0
+
+    def pop_segment(self):
+        """
+        Get the samples added since the last pop in columnar form and clear them from the buffer.
+        :return: Dict of the timestamp column and the value columns
+        """
+        with self._lock:
+            segment = {"timestamp": self._timestamps.tolist()}
+            for column, values in zip(self._columns, self._values):
+                segment[column] = values.tolist()
+            self._timestamps = array("d")
+            self._values = [array("d") for _ in self._columns]
+        return segment
+
+    def summary(self):
+        """
+        Summary of all samples added to the time series.
+        :return: Dict of min, mean, max and the percentiles per column
+        """
+        summary = {}
+        with self._lock:
+            if self._number_of_samples == 0:
+                return summary
+            for i, column in enumerate(self._columns):
+                reservoir = sorted(self._reservoirs[i])
+                summary[column] = {"min": self._min[i], "mean": self._sum[i] / self._number_of_samples,
+                                   "max": self._max[i]}
+                for percentile in SUMMARY_PERCENTILES:
+                    # Nearest rank on the reservoir
+                    rank = max(0, math.ceil(percentile / 100 * len(reservoir)) - 1)
+                    summary[column]["p{}".format(percentile)] = reservoir[rank]
+        return summary
+
+    @staticmethod
+    def concat(segments):
+        """
+        Join segments of a time series.
+        :param segments: Segments in the order they were popped
+        :return: Dict of the timestamp column and the value columns
+        """
+        series = {}
+        for segment in segments:
+            for column, values in segment.items():
+                series.setdefault(column, []).extend(values)
+        return series
+
+
+class TimeSeriesTO(TrackedObject):
+    """
+    Tracked object holding a periodically measured time series. New samples are buffered and only they are stored as
+    segment artifacts once enough of them were collected. The tracked object itself only holds the references to its
+    segments and the summary of the time series.
+    """
+
+    class TimeSeriesModel(TrackedObjectModel):
+        type: str = "TimeSeries"
+        description: str = "Timeline of periodically measured values."
+        columns: List[str] = []
+        segments: List[str] = []  # Paths of the artifacts holding the segments of the time series
+        number_of_samples: int = 0
+        summary: Dict[str, Dict[str, float]] = {}  # Min, mean, max and percentiles per column
+        period: float = ...
+
+        class Config:
+            orm_mode = True
+
+    @classmethod
+    def get_model_cls(cls) -> Type[BaseModel]:
+        return cls.TimeSeriesModel
+
+    # Folder the segments are stored in
+    _segment_folder = "time_series"
+
+    def __init__(self, *args, columns=None, segment_size=SEGMENT_SIZE, **kwargs):
+        self._buffer = TimeSeriesBuffer(columns or [], segment_size=segment_size)
+        self._segments = []
+        super().__init__(*args, **kwargs)
+
+    @property
+    def columns(self):
+        return self._buffer.columns
+
+    @property
+    def segments(self):
+        return self._segments
+
+    @property
+    def number_of_samples(self):
+        return self._buffer.number_of_samples
+
+    @property
+    def summary(self):
+        return self._buffer.summary()
+
+    def add_sample(self, values, timestamp=None):
+        """
+        Add a sample and store the buffered samples if enough of them were collected.
+        :param values: Value for each of the columns
+        :param timestamp: Time of the sample. Defaults to now.
+        :return:
+        """
+        self._buffer.add(values, timestamp=timestamp)
+        if self._buffer.is_full():
+            self.flush()
+            self.store()
+
+    def flush(self):
+        """
+        Store the buffered samples as segment artifact.
+        :return:
+        """
+        if not self._buffer.has_pending():
+            return
+        artifact = Artifact(data=f"{self._segment_folder}/segment_{len(self._segments)}",
+                            content=self._buffer.pop_segment(), file_format=FileFormats.json,
+                            description="A segment of the time series.", parent=self)
+        artifact.store()
+        self._segments.append(artifact.data)
+        # The segment is loaded from the backend again if needed
+        artifact._content = None
+
+    def finalize(self):
+        """
+        Store the remaining samples and the final summary.
+        :return:
+        """
+        self.flush()
+        return self.store()
+
+    @staticmethod
+    def load_series(run_id, segments):
+        """
+        Load a stored time series.
+        :param run_id: Run the time series was logged in
+        :param segments: Paths of the segments of the time series
+        :return: Dict of the timestamp column and the value columns
+        """
+        from pypads.app.pypads import get_current_pads
+        pads = get_current_pads()
+        return TimeSeriesBuffer.concat([pads.backend.load_artifact_data(run_id, path) for path in segments])
+
+
+class ResourceSample:
+    """
+    Resources used by the process tree of the experiment at a point in time.
+    """
+
+    def __init__(self, timestamp, cpu_seconds, rss, read_bytes, write_bytes, call=None):
+        """
+        :param timestamp: Time of the sample
+        :param cpu_seconds: User and system cpu time of the process tree
+        :param rss: Resident memory of the process tree in bytes
+        :param read_bytes: Bytes read by the process tree
+        :param write_bytes: Bytes written by the process tree
+        :param call: Tracked call active while sampling
+        """
+        self.timestamp = timestamp
+        self.cpu_seconds = cpu_seconds
+        self.rss = rss
+        self.read_bytes = read_bytes
+        self.write_bytes = write_bytes
+        self.call = call
+
+
+class CallResources:
+    """
+    Resources attributed to a tracked call.
+    """
+
+    def __init__(self, start: ResourceSample):
+        self._start = start
+        self.peak_rss = start.rss
+        self.cpu_seconds = 0.0
+        self.read_bytes = 0.0
+        self.write_bytes = 0.0
+
+    def update(self, sample: ResourceSample):
+        self.peak_rss = max(self.peak_rss, sample.rss)
+
+    def finish(self, end: ResourceSample):
+        self.update(end)
+        self.cpu_seconds = max(0.0, end.cpu_seconds - self._start.cpu_seconds)
+        self.read_bytes = max(0.0, end.read_bytes - self._start.read_bytes)
+        self.write_bytes = max(0.0, end.write_bytes - self._start.write_bytes)
+
+
+class ResourceSampler:
+    """
+    Single thread sampling the resources of the process tree of the experiment. The cpu times, resident memory and io
+    counters of every process are read in one pass. Each sample is stamped with the currently tracked call and updates
+    the peak memory of the calls resources are attributed to. Other periodic measurements like the cpu or gpu usage
+    of the system are registered as consumers and executed by the same thread instead of starting own threads.
+    """
+
+    def __init__(self, period=1.0, call_tracker=None):
+        """
+        :param period: Time in seconds between two samples
+        :param call_tracker: Call tracker providing the currently tracked call
+        """
+        import psutil
+        self._process = psutil.Process()
+        self._period = period
+        self._call_tracker = call_tracker
+        self._consumers = []
+        self._calls = {}
+        self._latest = None
+        self._lock = threading.Lock()
+        self._consumer_lock = threading.RLock()
+        self._thread = None
+
+    @property
+    def period(self):
+        return self._period
+
+    def current_call(self):
+        if self._call_tracker is None:
+            return None
+        try:
+            return self._call_tracker.current_call()
+        except IndexError:
+            # The call stack changed while reading it from the sampling thread
+            return None
+
+    def read(self) -> ResourceSample:
+        """
+        Read the resources used by the process tree.
+        :return: Sample of the resources
+        """
+        import psutil
+        cpu_seconds = rss = read_bytes = write_bytes = 0.0
+        try:
+            children = self._process.children(recursive=True)
+        except psutil.Error:
+            children = []
+        for process in [self._process] + children:
+            try:
+                with process.oneshot():
+                    times = process.cpu_times()
+                    cpu_seconds += times.user + times.system
+                    if process is self._process:
+                        # Cpu time of terminated children
+                        cpu_seconds += times.children_user + times.children_system
+                    rss += process.memory_info().rss
+                    if hasattr(process, "io_counters"):
+                        try:
+                            io = process.io_counters()
+                            read_bytes += io.read_bytes
+                            write_bytes += io.write_bytes
+                        except psutil.AccessDenied:
+                            pass
+            except psutil.Error:
+                # The process terminated or can't be accessed
+                continue
+        return ResourceSample(time.time(), cpu_seconds, rss, read_bytes, write_bytes, call=self.current_call())
+
+    def sample(self):
+        """
+        Take a sample, update the attributed calls and execute the due consumers.
+        :return: Sample of the resources
+        """
+        sample = self.read()
+        with self._lock:
+            self._latest = sample
+            for resources in self._calls.values():
+                resources.update(sample)
+        with self._consumer_lock:
+            for consumer in self._consumers:
+                fn, period, last = consumer
+                if period is None or sample.timestamp - last >= period - self._period / 2:
+                    consumer[2] = sample.timestamp
+                    try:
+                        fn(sample)
+                    except Exception as e:
+                        logger.error("Resource sampling consumer {} failed: {}".format(fn, str(e)))
+        return sample
+
+    def add_consumer(self, fn, period=None):
+        """
+        Execute given function on samples.
+        :param fn: Function getting the ResourceSample
+        :param period: Minimal time between two executions. The function is executed on every sample if None.
+        :return:
+        """
+        with self._consumer_lock:
+            self._consumers.append([fn, period, 0.0])
+
+    def remove_consumer(self, fn):
+        """
+        Stop executing given function. This waits for a running execution of the function.
+        :param fn: Function to remove
+        :return:
+        """
+        with self._consumer_lock:
+            self._consumers = [c for c in self._consumers if c[0] != fn]
+
+    def latest(self) -> ResourceSample:
+        """
+        Get the latest sample of the sampling thread. The process tree is only read on the calling thread if the
+        sampling thread isn't running or didn't take a sample yet.
+        :return: Sample of the resources
+        """
+        with self._lock:
+            sample = self._latest
+        if sample is None or self._thread is None:
+            sample = self.read()
+        return sample
+
+    def begin(self, call):
+        """
+        Start attributing resources to a call. The attribution is accurate up to the sampling period.
+        :param call: Tracked call
+        :return:
+        """
+        resources = CallResources(self.latest())
+        with self._lock:
+            self._calls[id(call)] = resources
+
+    def end(self, call) -> Optional[CallResources]:
+        """
+        Stop attributing resources to a call.
+        :param call: Tracked call
+        :return: Resources used during the call or None if the call wasn't started
+        """
+        sample = self.latest()
+        with self._lock:
+            resources = self._calls.pop(id(call), None)
+        if resources is not None:
+            resources.finish(sample)
+        return resources
+
+    def start(self):
+        if self._thread is None:
+            self._thread = PeriodicThread(target=self.sample, sleep=self._period, name="pypads_resource_sampler")
+            self._thread.start()
+
+    def stop(self):
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+
+_sampler_lock = threading.Lock()
+
+
+def get_resource_sampler(pads=None) -> ResourceSampler:
+    """
+    Get the resource sampler of the current run. The sampler is started on first access and stopped on the teardown of
+    the run.
+    :param pads: PyPads instance
+    :return: ResourceSampler
+    """
+    if pads is None:
+        from pypads.app.pypads import get_current_pads
+        pads = get_current_pads()
+    with _sampler_lock:
+        if not pads.cache.run_exists(ResourceSampler.__name__):
+            sampler = ResourceSampler(period=pads.config.get(resource_sampling_period, 1.0),
+                                      call_tracker=pads.call_tracker)
+            sampler.start()
+            pads.cache.run_add(ResourceSampler.__name__, sampler)
+
+            def stop_sampler(*args, **kwargs):
+                sampler.stop()
+
+            pads.api.register_teardown_utility(ResourceSampler.__name__, fn=stop_sampler)
+        return pads.cache.run_get(ResourceSampler.__name__)
 
 
 class SystemStatsTO(TrackedObject):
@@ -42,14 +491,17 @@ class IMacAddressRSF(RunSetup):
     """
     name = "Generic MacAddress Run Setup Logger"
     type: str = "MacAddressRunLogger"
+    _concurrent = True
+    _provided_cached = [SystemStatsTO.__name__]
 
     def __init__(self, *args, order=None, **kwargs):
         super().__init__(*args, order=order if order is not None else DEFAULT_ORDER, **kwargs)
 
     def _call(self, *args, _pypads_env: LoggerEnv, _logger_call, _logger_output, **kwargs):
         import re, uuid
-        cto = SystemStatsTO(mac_address=':'.join(re.findall('..', '%012x' % uuid.getnode())),
-                            parent=_logger_output)
+        mac_address = _pypads_env.pypads.host_cache.get(
+            "mac_address", lambda: ':'.join(re.findall('..', '%012x' % uuid.getnode())))
+        cto = SystemStatsTO(mac_address=mac_address, parent=_logger_output)
         _pypads_env.pypads.cache.run_add(SystemStatsTO.__name__, cto)
         cto.store()
 
@@ -76,6 +528,7 @@ class ISystemRSF(RunSetup):
     """
     _dependencies = {"psutil"}
     _needed_cached = SystemStatsTO.__name__
+    _concurrent = True
     name = "Generic System Run Setup Logger"
     type: str = "SystemRumLogger"
 
@@ -84,66 +537,54 @@ class ISystemRSF(RunSetup):
 
     def _call(self, *args, _pypads_env: LoggerEnv, _pypads_cached_results=None, _logger_call, _logger_output, **kwargs):
         import platform
-        system = platform.uname()
+
+        def get_system():
+            system = platform.uname()
+            return {"system": system.system, "node": system.node, "release": system.release,
+                    "version": system.version, "machine": system.machine, "processor": system.processor}
+
         computer_to: SystemStatsTO = _pypads_cached_results[0]
-        system_info = SystemTO(system=system.system, node=system.node, release=system.release, version=system.version,
-                               machine=system.machine, processor=system.processor, parent=_logger_output)
+        system_info = SystemTO(**_pypads_env.pypads.host_cache.get("system", get_system), parent=_logger_output)
 
         # Update computer to
         computer_to.system = system_info.store()
         computer_to.store()
 
 
-class GpuUsageTO(TrackedObject):
+class GpuUsageTO(TimeSeriesTO):
     """
     Tracked object to be updated live on the gpu usage.
     """
 
-    class GpuUsageTOModel(TrackedObjectModel):
+    class GpuUsageTOModel(TimeSeriesTO.TimeSeriesModel):
         type: str = "GpuUsage"
         description: str = "Timeline about the usage of the in the experiment used gpu."
-
-        class GpuCoreModel(BaseModel):
-            device: int = ...
-            memory: float = ...
-            memoryAllocated: List[float] = ...
-            temperature: List[int] = ...
-            power_usage: List[float] = ...
-
-            class Config:
-                orm_mode = True
-
         gpu_count: int = ...
-        gpu_cores: List[GpuCoreModel] = []
-        period: float = ...
 
     @classmethod
     def get_model_cls(cls) -> Type[BaseModel]:
         return cls.GpuUsageTOModel
 
+    _segment_folder = "gpu_usage"
+
+    # Values measured per gpu
+    GPU_VALUES = ["utilization", "memory_utilization", "memory_allocated", "temperature", "power_usage"]
+
     def __init__(self, *args, **kwargs):
-        super().__init__(*args, **kwargs)
         import pynvml
         try:
             pynvml.nvmlInit()
-            self.gpu_count = pynvml.nvmlDeviceGetCount()
+            gpu_count = pynvml.nvmlDeviceGetCount()
         except pynvml.NVMLError:
-            self.gpu_count = 0
+            gpu_count = 0
+        super().__init__(*args, columns=["gpu_{}_{}".format(i, value) for i in range(gpu_count) for value in
+                                         self.GPU_VALUES], **kwargs)
+        self.gpu_count = gpu_count
 
     def add_gpu_usage(self: Union['GpuUsageTO', GpuUsageTOModel]):
         gpu_cores = _get_gpu_usage(self.gpu_count)
-        if gpu_cores is not None:
-            for idx, (handle, gpu, memory, memory_allocated, temp, power_usage) in enumerate(gpu_cores):
-                if idx >= len(self.gpu_cores):
-                    self.gpu_cores.append(
-                        self.GpuUsageTOModel.GpuCoreModel(device=gpu, memory=memory,
-                                                          memoryAllocated=[memory_allocated], temperature=[temp],
-                                                          power_usage=[power_usage]))
-                else:
-                    core = self.gpu_cores[idx]
-                    core.memoryAllocated.append(memory_allocated)
-                    core.temperature.append(temp)
-                    core.power_usage.append(power_usage)
+        if gpu_cores:
+            self.add_sample([value for _, *values in gpu_cores for value in values])
 
 
 def _get_gpu_usage(gpu_count):
@@ -173,6 +614,7 @@ def _get_gpu_usage(gpu_count):
 class IGpuRSF(RunSetup):
     _dependencies = {"pynvml"}
     _needed_cached = SystemStatsTO.__name__
+    _concurrent = True
     name = "Generic GPU Run Setup Logger"
     type: str = "GPURunLogger"
 
@@ -190,22 +632,21 @@ class IGpuRSF(RunSetup):
     def _call(self, *args, _pypads_period=1.0, _pypads_env: LoggerEnv, _logger_call, _logger_output,
               _pypads_cached_results=None, **kwargs):
         if _pypads_period > 0:
-            gpu_usage_info = GpuUsageTO(parent=_logger_output)
-            gpu_usage_info.period = _pypads_period
+            gpu_usage_info = GpuUsageTO(parent=_logger_output, period=_pypads_period)
 
-            def track_gpu_usage(to: GpuUsageTO):
-                to.add_gpu_usage()
-                to.store()
+            def track_gpu_usage(sample: ResourceSample):
+                gpu_usage_info.add_gpu_usage()
 
             _logger_output.gpu_usage = gpu_usage_info.store()
-            thread = PeriodicThread(target=track_gpu_usage, sleep=_pypads_period, args=(gpu_usage_info,))
-            thread.start()
+            sampler = get_resource_sampler(_pypads_env.pypads)
+            sampler.add_consumer(track_gpu_usage, period=_pypads_period)
 
-            # stop thread store disk_usage object
-            def cleanup_thread(*args, **kwargs):
-                thread.join()
+            # stop sampling and store the remaining samples and summary of the gpu usage
+            def cleanup_consumer(*args, **kwargs):
+                sampler.remove_consumer(track_gpu_usage)
+                gpu_usage_info.finalize()
 
-            _pypads_env.pypads.api.register_teardown_utility(_logger_call, fn=cleanup_thread)
+            _pypads_env.pypads.api.register_teardown_utility(_logger_call, fn=cleanup_consumer)
 
 
 class CpuTO(TrackedObject):
@@ -222,39 +663,28 @@ class CpuTO(TrackedObject):
         return cls.CpuTOModel
 
 
-class CpuUsageTO(TrackedObject):
+class CpuUsageTO(TimeSeriesTO):
     """
     Tracked object to be updated live on the cpu usage.
     """
 
-    class CpuUsageTOModel(TrackedObjectModel):
+    class CpuUsageTOModel(TimeSeriesTO.TimeSeriesModel):
         type: str = "CpuUsage"
         description: str = "Timeline about the usage of the in the experiment used cpu."
 
-        class CpuCoreModel(BaseModel):
-            index: int = ...
-            usage: List[float] = ...
-
-            class Config:
-                orm_mode = True
-
-        cpu_cores: List[CpuCoreModel] = []
-        total_usage: List[str] = []
-        period: float = ...
-
     @classmethod
     def get_model_cls(cls) -> Type[BaseModel]:
         return cls.CpuUsageTOModel
 
+    _segment_folder = "cpu_usage"
+
+    def __init__(self, *args, **kwargs):
+        import psutil
+        super().__init__(*args, columns=["core_{}".format(i) for i in range(psutil.cpu_count(logical=True))] + [
+            "total"], **kwargs)
+
     def add_cpu_usage(self: Union['CpuUsageTO', CpuUsageTOModel]):
-        cores = _get_cpu_usage()
-        for idx, usage in enumerate(cores[:-1]):
-            if idx >= len(self.cpu_cores):
-                self.cpu_cores.append(self.__class__.CpuUsageTOModel.CpuCoreModel(index=idx, usage=[usage]))
-            else:
-                core = self.cpu_cores[idx]
-                core.usage.append(usage)
-        self.total_usage.append(cores[-1])
+        self.add_sample(_get_cpu_usage())
 
 
 def _get_cpu_usage():
@@ -275,6 +705,7 @@ def _get_cpu_usage():
 class ICpuRSF(RunSetup):
     _dependencies = {"psutil"}
     _needed_cached = SystemStatsTO.__name__
+    _concurrent = True
     name = "Generic CPU Run Setup Logger"
     type: str = "CPURunLogger"
 
@@ -293,10 +724,14 @@ class ICpuRSF(RunSetup):
     def _call(self, *args, _pypads_period=1.0, _pypads_env: LoggerEnv, _logger_call, _logger_output,
               _pypads_cached_results=None, **kwargs):
         import psutil
-        freq = psutil.cpu_freq()
+
+        def get_cpu():
+            freq = psutil.cpu_freq()
+            return {"physical_cores": psutil.cpu_count(logical=False), "total_cores": psutil.cpu_count(logical=True),
+                    "max_freq": f"{freq.max:2f}Mhz", "min_freq": f"{freq.min:2f}Mhz"}
+
         computer_to: SystemStatsTO = _pypads_cached_results[0]
-        cpu_info = CpuTO(physical_cores=psutil.cpu_count(logical=False), total_cores=psutil.cpu_count(logical=True),
-                         max_freq=f"{freq.max:2f}Mhz", min_freq=f"{freq.min:2f}Mhz", parent=_logger_output)
+        cpu_info = CpuTO(**_pypads_env.pypads.host_cache.get("cpu", get_cpu), parent=_logger_output)
 
         # Update computer to
         cpu_ref = cpu_info.store()
@@ -305,22 +740,21 @@ class ICpuRSF(RunSetup):
         computer_to.store()
 
         if _pypads_period > 0:
-            cpu_usage_info = CpuUsageTO(parent=_logger_output)
-            cpu_usage_info.period = _pypads_period
+            cpu_usage_info = CpuUsageTO(parent=_logger_output, period=_pypads_period)
 
-            def track_cpu_usage(to: CpuUsageTO):
-                to.add_cpu_usage()
-                to.store()
+            def track_cpu_usage(sample: ResourceSample):
+                cpu_usage_info.add_cpu_usage()
 
             _logger_output.cpu_usage = cpu_usage_info.store()
-            thread = PeriodicThread(target=track_cpu_usage, sleep=_pypads_period, args=(cpu_usage_info,))
-            thread.start()
+            sampler = get_resource_sampler(_pypads_env.pypads)
+            sampler.add_consumer(track_cpu_usage, period=_pypads_period)
 
-            # stop thread store disk_usage object
-            def cleanup_thread(*args, **kwargs):
-                thread.join()
+            # stop sampling and store the remaining samples and summary of the cpu usage
+            def cleanup_consumer(*args, **kwargs):
+                sampler.remove_consumer(track_cpu_usage)
+                cpu_usage_info.finalize()
 
-            _pypads_env.pypads.api.register_teardown_utility(_logger_call, fn=cleanup_thread)
+            _pypads_env.pypads.api.register_teardown_utility(_logger_call, fn=cleanup_consumer)
 
 
 class RamTO(TrackedObject):
@@ -338,6 +772,7 @@ class RamTO(TrackedObject):
 class IRamRSF(RunSetup):
     _dependencies = {"psutil"}
     _needed_cached = SystemStatsTO.__name__
+    _concurrent = True
     name = "Generic Ram Run Setup Logger"
     type: str = "RamRunLogger"
 
@@ -347,11 +782,13 @@ class IRamRSF(RunSetup):
     def _call(self, *args, _pypads_period=1.0, _pypads_env: LoggerEnv, _logger_call, _logger_output,
               _pypads_cached_results=None, **kwargs):
         import psutil
-        memory = psutil.virtual_memory()
-        swap = psutil.swap_memory()
+
+        def get_memory():
+            return {"total_memory": sizeof_fmt(psutil.virtual_memory().total),
+                    "total_swap": sizeof_fmt(psutil.swap_memory().total)}
+
         computer_to: SystemStatsTO = _pypads_cached_results[0]
-        memory_info = RamTO(total_memory=sizeof_fmt(memory.total), total_swap=sizeof_fmt(swap.total),
-                            parent=_logger_output)
+        memory_info = RamTO(**_pypads_env.pypads.host_cache.get("memory", get_memory), parent=_logger_output)
 
         computer_to.memory = memory_info.store()
         computer_to.store()
@@ -372,6 +809,7 @@ class DiskTO(TrackedObject):
 class IDiskRSF(RunSetup):
     _dependencies = {"psutil"}
     _needed_cached = SystemStatsTO.__name__
+    _concurrent = True
     name = "Disk Run Setup Logger"
     type: str = "DiskRunLogger"
 
@@ -405,6 +843,7 @@ class ProcessTO(TrackedObject):
 class IPidRSF(RunSetup):
     _dependencies = {"psutil"}
     _needed_cached = SystemStatsTO.__name__
+    _concurrent = True
     name = "Process Run Setup Logger"
     type: str = "ProcessRunLogger"
 
@@ -439,6 +878,7 @@ class ISocketInfoRSF(RunSetup):
     name = "Socket Run Setup Logger"
     type: str = "SockerRunLogger"
     _needed_cached = SystemStatsTO.__name__
+    _concurrent = True
 
     def __init__(self, *args, order=None, **kwargs):
         super().__init__(*args, order=order if order is not None else DEFAULT_ORDER + 1, **kwargs)
@@ -446,8 +886,80 @@ class ISocketInfoRSF(RunSetup):
     def _call(self, *args, _pypads_env: LoggerEnv, _logger_call, _logger_output, _pypads_cached_results=None, **kwargs):
         computer_to: SystemStatsTO = _pypads_cached_results[0]
         import socket
-        socket_info = SocketTO(hostname=socket.gethostname(), ip=socket.gethostbyname(socket.gethostname()),
-                               parent=_logger_output)
+
+        # The ip address isn't static for the host and has to be measured for every run
+        hostname = socket.gethostname()
+        socket_info = SocketTO(hostname=hostname, ip=socket.gethostbyname(hostname), parent=_logger_output)
 
         computer_to.network = socket_info.store()
         computer_to.store()
+
+
+class ProcessUsageTO(TimeSeriesTO):
+    """
+    Tracked object to be updated live on the resources used by the process tree of the experiment.
+    """
+
+    class ProcessUsageTOModel(TimeSeriesTO.TimeSeriesModel):
+        type: str = "ProcessUsage"
+        description: str = "Timeline about the resources used by the process tree of the experiment."
+        calls: List[str] = []  # Calls active while sampling. The call column holds the index in this list or -1
+
+    @classmethod
+    def get_model_cls(cls) -> Type[BaseModel]:
+        return cls.ProcessUsageTOModel
+
+    _segment_folder = "process_usage"
+
+    def __init__(self, *args, **kwargs):
+        self._calls = {}
+        super().__init__(*args, columns=["cpu_seconds", "rss", "read_bytes", "write_bytes", "call"], **kwargs)
+
+    @property
+    def calls(self):
+        return list(self._calls.keys())
+
+    def add_resource_sample(self, sample: ResourceSample):
+        call = -1
+        if sample.call is not None:
+            call = self._calls.setdefault(str(sample.call.call_id), len(self._calls))
+        self.add_sample([sample.cpu_seconds, sample.rss, sample.read_bytes, sample.write_bytes, call],
+                        timestamp=sample.timestamp)
+
+
+class IResourceRSF(RunSetup):
+    """
+    Run setup tracking the resources used by the process tree of the experiment over the run.
+    """
+    _dependencies = {"psutil"}
+    _concurrent = True
+    name = "Process Resource Run Setup Logger"
+    type: str = "ResourceRunLogger"
+
+    def __init__(self, *args, order=None, **kwargs):
+        super().__init__(*args, order=order if order is not None else DEFAULT_ORDER + 1, **kwargs)
+
+    class IResourceRSFOutput(OutputModel):
+        type: str = "IResourceRSF-Output"
+        process_usage: Optional[IdReference] = ...  # ProcessUsageTO
+
+    @classmethod
+    def output_schema_class(cls) -> Type[OutputModel]:
+        return cls.IResourceRSFOutput
+
+    def _call(self, *args, _pypads_period=None, _pypads_env: LoggerEnv, _logger_call, _logger_output, **kwargs):
+        sampler = get_resource_sampler(_pypads_env.pypads)
+        process_usage_info = ProcessUsageTO(parent=_logger_output, period=_pypads_period or sampler.period)
+
+        def track_process_usage(sample: ResourceSample):
+            process_usage_info.add_resource_sample(sample)
+
+        _logger_output.process_usage = process_usage_info.store()
+        sampler.add_consumer(track_process_usage, period=_pypads_period)
+
+        # stop sampling and store the remaining samples and summary of the process usage
+        def cleanup_consumer(*args, **kwargs):
+            sampler.remove_consumer(track_process_usage)
+            process_usage_info.finalize()
+
+        _pypads_env.pypads.api.register_teardown_utility(_logger_call, fn=cleanup_consumer)
@@ -60,6 +60,7 @@ class DependencyRSF(RunSetup):
         super().__init__(*args, **kwargs)
 
     _dependencies = {"pip"}
+    _concurrent = True
 
     class DependencyRSFOutput(OutputModel):
         type: str = "DependencyRSF-Output"
@@ -81,7 +82,7 @@ class DependencyRSF(RunSetup):
             except ImportError:  # pip < 10.0
                 # noinspection PyUnresolvedReferences,PyPackageRequirements
                 from pip.operations import freeze
-            dependencies.add_dependency(list(freeze.freeze()))
+            dependencies.add_dependency(pads.host_cache.get("pip_freeze", lambda: list(freeze.freeze())))
         except Exception as e:
             _logger_output.set_failure_state(e)
         finally:
@@ -87,6 +87,7 @@ class FileInfo:
     is_dir: bool = ...
     path: str = ...
     file_size: int = ...
+    digest: Optional[str] = None
 
 
 class MetricMetaModel(MetadataModel):
@@ -126,6 +127,7 @@ class ArtifactMetaModel(MetadataModel):
     category: str = "Artifact"
     storage_type: Union[ResultType, str] = ResultType.artifact
     file_size: int = ...
+    digest: Optional[str] = None  # Digest of the content of the artifact
     data: str = ...  # Path to the artifact
 
     class Config:
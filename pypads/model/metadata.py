@@ -1,10 +1,9 @@
 from abc import abstractmethod, ABCMeta
+from copy import copy
 from collections import deque
-from copy import deepcopy
 from typing import Type, List
 
 from pydantic import validate_model, BaseModel, ValidationError, ConfigError
-from pydantic.version import VERSION
 
 from pypads.app.misc.inheritance import SuperStop
 from pypads.model.models import BaseStorageModel, get_reference
@@ -43,6 +42,27 @@ class ModelInterface(SuperStop):
         return self.get_model_cls().__fields__
 
 
+# Reduced model classes by model class and included fields
+_reduced_classes = {}
+
+
+def _reduced_class(cls, include):
+    """
+    Get a class of the model only validating the included fields. The class is only created once per set of fields.
+    :param cls: Model class
+    :param include: Frozenset of field names
+    :return: Model class
+    """
+    key = (cls, include)
+    if key not in _reduced_classes:
+        class ReducedClass(cls, BaseModel):
+            pass
+
+        ReducedClass.__fields__ = {k: v for k, v in ReducedClass.__fields__.items() if k in include}
+        _reduced_classes[key] = ReducedClass
+    return _reduced_classes[key]
+
+
 class ModelObject(ModelInterface, metaclass=ABCMeta):
     """
     An object building the model from itself on the fly.
@@ -52,19 +72,43 @@ class ModelObject(ModelInterface, metaclass=ABCMeta):
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
 
-        fields = set(self.get_model_fields().keys())
+        model_fields = self.get_model_fields()
+        given = set()
 
         # Add given fields to metadata object if not already existing
         for key, val in kwargs.items():
-            if key in fields and not has_direct_attr(self, key):
+            if key in model_fields and not has_direct_attr(self, key):
                 setattr(self, key, val)
-                fields.remove(key)
+                given.add(key)
+
+        # Add defaults which are not given. Fields defined as properties are skipped before checking for an existing
+        # attribute as this would evaluate the property.
+        for key, field in self._default_fields():
+            if key not in given and not has_direct_attr(self, key):
+                setattr(self, key, field.get_default())
 
-        # Add defaults which are not given
-        for key in fields:
-            if not has_direct_attr(self, key) and self.get_model_fields() and (
-                    not hasattr(self.__class__, key) or not isinstance(getattr(self.__class__, key), property)):
-                setattr(self, key, self.get_model_fields()[key].get_default())
+    @classmethod
+    def _default_fields(cls):
+        """
+        Fields of the model which are not defined as property by the class. These get their default value if not
+        given. The list is built once per class.
+        :return: List of field names and fields
+        """
+        if "_pypads_default_fields" not in cls.__dict__:
+            cls._pypads_default_fields = [(key, field) for key, field in cls.get_model_cls().__fields__.items() if
+                                          not isinstance(getattr(cls, key, None), property)]
+        return cls._pypads_default_fields
+
+    def __setattr__(self, name, value):
+        super().__setattr__(name, value)
+        self.invalidate()
+
+    def invalidate(self):
+        """
+        Drop the cached validations of the references of the object. This is done on every change of an attribute.
+        :return:
+        """
+        self.__dict__.pop("_pypads_validated", None)
 
     def _decompose_class(self):
         cls = self.get_model_cls()
@@ -80,8 +124,10 @@ class ModelObject(ModelInterface, metaclass=ABCMeta):
                 raise validation_error
             cls = self.get_model_cls()
             m = cls.__new__(cls)
-            object.__setattr__(m, '__dict__', values)
-            object.__setattr__(m, '__fields_set__', fields_set)
+            # Cached values are shared between the returned models. Copy mutable ones to keep the cache intact.
+            object.__setattr__(m, '__dict__', {k: copy(v) if isinstance(v, (list, dict, set)) else v
+                                               for k, v in values.items()})
+            object.__setattr__(m, '__fields_set__', set(fields_set))
             return m
         else:
             cls, obj = self._decompose_class()
@@ -89,26 +135,51 @@ class ModelObject(ModelInterface, metaclass=ABCMeta):
 
     def validate(self, include=None):
         """
-        Validate the current object.
+        Validate the current object. Validations of a subset of the fields (e.g. for references) are kept until an
+        attribute of the object is set. A full validation is always done again, as fields can be changed in place.
         :param include: Only validate on given parameters
         :return:
         """
+        if include is None:
+            return self._validate()
+        key = frozenset(include)
+        validated = self.__dict__.get("_pypads_validated")
+        if validated is None:
+            validated = {}
+            # Store without invalidating
+            object.__setattr__(self, "_pypads_validated", validated)
+        if key not in validated:
+            validated[key] = self._validate(include=key)
+        return validated[key]
+
+    def _validate(self, include=None):
         cls, obj = self._decompose_class()
 
-        # Disable validation for unneeded fields by deleting fields in a dummy class
+        # Disable validation for unneeded fields by using a reduced class with only the needed fields
         if include is not None:
-            class ReducedClass(cls, BaseModel):
-                pass
-
-            cls = ReducedClass
-            cls.__fields__ = {k: v for k, v in cls.__fields__.items() if k in include}
-        # Todo stop supporting pydantic < 1.7
-        if VERSION >= '1.7':
-            defaults = {k: v.get_default() for k,v in cls.__fields__.items()}
-        else:
-            defaults = cls.__field_defaults__
-        return validate_model(cls, {**deepcopy(defaults),
-                                    **{k: obj[k] for k in obj.keys() if include is None or k in include}})
+            cls = _reduced_class(cls, include)
+
+        # Only the fields of the model are looked up on the object. Defaults are only needed for missing fields.
+        values = {}
+        for key, field in cls.__fields__.items():
+            try:
+                values[key] = obj[key]
+            except KeyError:
+                values[key] = field.get_default()
+        return validate_model(cls, values)
+
+    def dict_and_json(self, force=True, validate=True, include=None, **kwargs):
+        """
+        Get the dict and json representation of the object in a single pass.
+        :param force: Don't raise validation errors
+        :param validate: Validate the object
+        :param include: Only include given parameters
+        :param kwargs: Arguments for the conversion to a dict
+        :return: Tuple of dict and json
+        """
+        model = self.model(force=force, validate=validate, include=include)
+        data = model.dict(include=include, **kwargs)
+        return data, model.__config__.json_dumps(data, default=model.__json_encoder__)
 
     def typed_id(self):
         cls = self.get_model_cls()
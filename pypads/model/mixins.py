@@ -19,20 +19,35 @@ class ProvenanceMixin(ModelObject, metaclass=ABCMeta):
             self._defined_in = lib_model
 
     def model(self, force=False, validate=True, include=None):
-        self.store_lib()
+        # References and other reduced models don't need the library to be stored
+        if include is None or "defined_in" in include:
+            self.store_lib()
         return super().model(force=force, validate=validate, include=include)
 
     def store_lib(self):
-        from pypads.app.pypads import get_current_pads
-        lib_repo = get_current_pads().library_repository
-        # TODO get hash uid for logger
-        lib_hash = persistent_hash((self._defined_in.name, self._defined_in.version))
-        if not lib_repo.has_object(uid=lib_hash):
-            lib_obj = lib_repo.get_object(uid=lib_hash)
-            lib_obj.log_json(self._defined_in)
-        else:
-            lib_obj = lib_repo.get_object(uid=lib_hash)
-        self.defined_in = lib_obj.get_reference()
+        reference = store_library(self._defined_in)
+        # Keep the validated values of the object if the reference didn't change
+        if self.defined_in != reference:
+            self.defined_in = reference
+
+
+def store_library(lib_model: LibraryModel):
+    """
+    Store the descriptor of a library in the library repository if it wasn't stored yet. Storing it switches the active
+    run to the run of the repository.
+    :param lib_model: Descriptor of the library
+    :return: Reference to the stored descriptor
+    """
+    from pypads.app.pypads import get_current_pads
+    lib_repo = get_current_pads().library_repository
+    # TODO get hash uid for logger
+    lib_hash = persistent_hash((lib_model.name, lib_model.version))
+    if not lib_repo.has_object(uid=lib_hash):
+        lib_obj = lib_repo.get_object(uid=lib_hash)
+        lib_obj.log_json(lib_model)
+    else:
+        lib_obj = lib_repo.get_object(uid=lib_hash)
+    return lib_obj.get_reference()
 
 
 def get_library_descriptor(obj) -> LibraryModel:
@@ -8,7 +8,28 @@ import pydantic
 from pydantic import BaseModel, Field, root_validator
 
 from pypads import logger
-from pypads.utils.util import get_backend_uri, get_experiment_id, get_experiment_name, get_run_id, persistent_hash
+from pypads.utils.util import get_backend_uri, get_experiment_id, get_experiment_name, get_run_id, persistent_hash, \
+    id_hash
+
+
+def composite_id(backend_uri, uid):
+    """
+    Compile the id of an entry from the backend it is stored in and its uid.
+    :param backend_uri: Uri of the backend
+    :param uid: Uid of the entry
+    :return: Id
+    """
+    return id_hash(backend_uri, uid)
+
+
+def legacy_composite_id(backend_uri, uid):
+    """
+    Compile the id an entry was stored with before ids were hashed by id_hash. These are only used to read old stores.
+    :param backend_uri: Uri of the backend
+    :param uid: Uid of the entry
+    :return: Id
+    """
+    return str(persistent_hash((backend_uri, uid)))
 
 
 class ResultType(Enum):
@@ -107,7 +128,9 @@ class BaseIdModel(EntryModel, BackendObjectModel):
     uid: Union[str, uuid.UUID] = Field(default_factory=uuid.uuid4)
 
     def __hash__(self):
-        return persistent_hash((self.backend_uri, self.uid))
+        # Models with a composite id don't have to compute it again
+        _id = self.__dict__.get("id")
+        return hash(_id if _id is not None else composite_id(self.backend_uri, self.uid))
 
 
 class IdHashModel(BaseIdModel):
@@ -122,9 +145,7 @@ class IdHashModel(BaseIdModel):
     @root_validator
     def default_ts_modified(cls, values):
         if 'id' not in values or values['id'] is None:
-            reference_class = get_reference_class(values)
-            values['id'] = str(to_reference(
-                {k: values[k] for k in values.keys() if k in reference_class.__fields__.keys()}).__hash__())
+            values['id'] = composite_id(values.get('backend_uri'), values.get('uid'))
         return values
 
 
@@ -139,8 +160,16 @@ class IdReference(Reference, RunObjectModel, BaseIdModel):
 
     @pydantic.validator('id', always=True)
     def default_ts_modified(cls, v, *, values, **kwargs):
-        return v or str(persistent_hash(
-            (values["backend_uri"], values["uid"])))
+        return v or composite_id(values["backend_uri"], values["uid"])
+
+    @property
+    def ids(self):
+        """
+        Ids the referenced entry might be stored with. Entries of old stores are stored with their legacy id.
+        :return: List of ids
+        """
+        legacy_id = legacy_composite_id(self.backend_uri, self.uid)
+        return [self.id] if self.id == legacy_id else [self.id, legacy_id]
 
     def load(self):
         from pypads.app.pypads import get_current_pads
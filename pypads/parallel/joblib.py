@@ -4,6 +4,7 @@ from functools import wraps
 from typing import List
 
 from pypads.utils.util import is_package_available
+from pypads.variables import warm_sub_processes
 
 if is_package_available("joblib"):
     import joblib
@@ -11,6 +12,114 @@ if is_package_available("joblib"):
     original_delayed = joblib.delayed
 
 
+    # Shipment of the pads cache for the tasks of the next or current joblib call
+    _shipment = None
+
+
+    def _get_shipment(pads):
+        """
+        Get the shipment of the pads cache shared by all tasks until the joblib call finished.
+        :param pads: PyPads instance
+        :return: CacheShipment
+        """
+        global _shipment
+        from pypads.parallel.util import CacheShipment
+        if _shipment is None or _shipment.cache is not pads.cache:
+            _shipment = CacheShipment(pads.cache, os.path.join(pads.folder, "cache", "joblib"))
+        return _shipment
+
+
+    def _setup_pypads(tracking_uri, config, run_id, affected_modules, cache=None, reload_modules=True,
+                      unaffected_modules=None):
+        """
+        Set up pypads in a worker process and reactivate the run of the parent.
+        :param tracking_uri: Tracking uri of the parent
+        :param config: Config of the parent
+        :param run_id: Id of the run active in the parent
+        :param affected_modules: Modules punched by the parent
+        :param cache: Cache of the parent
+        :param reload_modules: Reload the affected modules already imported by the worker
+        :param unaffected_modules: Modules the parent searched for mappings without finding any
+        :return: PyPads instance
+        """
+        import mlflow
+
+        # reactivate this run in the foreign process
+        mlflow.set_tracking_uri(tracking_uri)
+        mlflow.start_run(run_id=run_id, nested=True)
+
+        # TODO update to new format
+        from pypads.app.base import PyPads
+        _pypads = PyPads(uri=tracking_uri, config=config, pre_initialized_cache=cache)
+        if unaffected_modules:
+            _pypads.wrap_manager.module_wrapper.set_known_unaffected_module_names(unaffected_modules)
+        _pypads.activate_tracking(reload_warnings=False, affected_modules=affected_modules,
+                                  clear_imports=True, reload_modules=reload_modules)
+        _pypads.start_track(disable_run_init=True)
+
+        def clear_mlflow():
+            """
+            Don't close run. This function clears the run which was reactivated from the stack to stop a closing of it.
+            :return:
+            """
+            if len(mlflow.tracking.fluent._active_run_stack) == 1:
+                mlflow.tracking.fluent._active_run_stack.pop()
+
+        import atexit
+        atexit.register(clear_mlflow)
+        return _pypads
+
+
+    def _init_worker(tracking_uri, config, run_id, affected_modules, unaffected_modules):
+        """
+        Initializer of joblib workers setting up pypads once per worker. No task was unpickled at this point, so
+        affected modules are rarely imported yet. The ones which are only have to be removed from the imports to be
+        punched on their next import instead of being reloaded. Modules the parent already searched for mappings
+        without finding any are not searched again.
+        """
+        from pypads.app import pypads
+        if not pypads.current_pads:
+            _setup_pypads(tracking_uri, config, run_id, affected_modules, reload_modules=False,
+                          unaffected_modules=unaffected_modules)
+
+
+    def _add_initializer(parallel, pads):
+        """
+        Let the workers of process based backends set up pypads when they start instead of on their first task. The
+        arguments of the initializer stay the same for the calls of a run to let loky reuse its workers. They have to
+        be removed again by _remove_initializer after the call to not bind the workers of a reused Parallel object to
+        the run of this call.
+        :param parallel: joblib Parallel object
+        :param pads: PyPads instance
+        :return: True if the initializer was added
+        """
+        import mlflow
+        from joblib._parallel_backends import LokyBackend, MultiprocessingBackend
+        run = mlflow.active_run()
+        backend_kwargs = getattr(parallel, "_backend_kwargs", None)
+        if run is None or backend_kwargs is None or "initializer" in backend_kwargs or not isinstance(
+                getattr(parallel, "_backend", None), (LokyBackend, MultiprocessingBackend)):
+            return False
+        backend_kwargs["initializer"] = _init_worker
+        module_wrapper = pads.wrap_manager.module_wrapper
+        backend_kwargs["initargs"] = (pads.uri, pads.config, run.info.run_id,
+                                      tuple(sorted(module_wrapper.punched_module_names)),
+                                      tuple(sorted(module_wrapper.unaffected_module_names)))
+        return True
+
+
+    def _remove_initializer(parallel):
+        """
+        Remove the initializer added by _add_initializer from the backend arguments of the Parallel object.
+        :param parallel: joblib Parallel object
+        :return:
+        """
+        backend_kwargs = parallel._backend_kwargs
+        if backend_kwargs.get("initializer") is _init_worker:
+            del backend_kwargs["initializer"]
+            del backend_kwargs["initargs"]
+
+
     @wraps(original_delayed)
     def punched_delayed(fn):
         """Decorator used to capture the arguments of a function."""
@@ -19,57 +128,35 @@ if is_package_available("joblib"):
         def wrapped_function(*args, _pypads_cache=None, _pypads_config=None, _pypads_active_run_id=None,
                              _pypads_tracking_uri=None,
                              _pypads_affected_modules=None, _pypads_triggering_process=None, **kwargs):
-            from pypads.parallel.util import _pickle_tuple, _cloudpickle_tuple
+            from pypads.parallel.util import _unpickle_arguments, RunCacheChanges
             from pypads import logger
 
             # only if pads data was passed
             if _pypads_active_run_id:
                 # noinspection PyUnresolvedReferences
                 from pypads.app import pypads
-                import mlflow
 
                 is_new_process = not pypads.current_pads
 
                 # If pads has to be reinitialized
                 if is_new_process:
-                    import pypads
-
-                    # reactivate this run in the foreign process
-                    mlflow.set_tracking_uri(_pypads_tracking_uri)
-                    mlflow.start_run(run_id=_pypads_active_run_id, nested=True)
-
                     start_time = time.time()
+                    _pypads = _setup_pypads(_pypads_tracking_uri, _pypads_config, _pypads_active_run_id,
+                                            _pypads_affected_modules, cache=_pypads_cache.cache)
+                    _pypads_cache.mark_merged()
                     logger.debug("Init Pypads in:" + str(time.time() - start_time))
 
-                    # TODO update to new format
-                    from pypads.app.base import PyPads
-                    _pypads = PyPads(uri=_pypads_tracking_uri,
-                                     config=_pypads_config,
-                                     pre_initialized_cache=_pypads_cache)
-                    _pypads.activate_tracking(reload_warnings=False, affected_modules=_pypads_affected_modules,
-                                              clear_imports=True, reload_modules=True, )
-                    _pypads.start_track(disable_run_init=True)
-
-                    def clear_mlflow():
-                        """
-                        Don't close run. This function clears the run which was reactivated from the stack to stop a closing of it.
-                        :return:
-                        """
-                        if len(mlflow.tracking.fluent._active_run_stack) == 1:
-                            mlflow.tracking.fluent._active_run_stack.pop()
-
-                    import atexit
-                    atexit.register(clear_mlflow)
-
                 # If pads already exists on process
                 else:
                     _pypads = pypads.current_pads
-                    _pypads.cache.merge(_pypads_cache)
+                    # The cache is merged only once per worker. In the process of the parent it is the same cache.
+                    if not _pypads_cache.merged and _pypads_cache.cache is not _pypads.cache:
+                        _pypads.cache.merge(_pypads_cache.cache)
+                        _pypads_cache.mark_merged()
 
-                # Unpickle args
-                from pickle import loads
+                # Unpickle args. Numpy arrays are passed as they are to be memmapped by joblib.
                 start_time = time.time()
-                a, b = loads(args[0])
+                a, b = _unpickle_arguments(args[0], args[2:])
                 logger.debug("Loading args from pickle in:" + str(time.time() - start_time))
 
                 # Unpickle function
@@ -83,8 +170,14 @@ if is_package_available("joblib"):
 
                 logger.debug("Started wrapped function on process: " + str(os.getpid()))
 
+                # Only return the entries of the run cache the task added or read as mutable values. Tasks executed
+                # in the process of the parent (e.g. by the threading backend) already changed its cache.
+                if _pypads_triggering_process == os.getpid():
+                    return wrapped_fn(*args, **kwargs), RunCacheChanges(_pypads_active_run_id, {})
+                run_cache = _pypads.cache.run_cache(_pypads_active_run_id)
+                run_cache.pop_changes()
                 out = wrapped_fn(*args, **kwargs)
-                return out, _pypads.cache
+                return out, RunCacheChanges(_pypads_active_run_id, run_cache.pop_changes())
 
             else:
                 return fn(*args, **kwargs)
@@ -96,21 +189,21 @@ if is_package_available("joblib"):
             :param kwargs:
             :return:
             """
-            from pypads.parallel.util import _pickle_tuple, _cloudpickle_tuple
+            from pypads.parallel.util import _pickle_arguments, _cloudpickle_tuple
             import mlflow
             run = mlflow.active_run()
             if run:
                 from pypads.app.pypads import current_pads
                 if current_pads and current_pads.config["track_sub_processes"]:
                     # TODO Only cloudpickle args / kwargs if needed and not always.
-                    pickled_params = (_pickle_tuple(args, kwargs), _cloudpickle_tuple(fn))
-                    args = pickled_params
+                    pickled_args, arrays = _pickle_arguments(args, kwargs)
+                    args = (pickled_args, _cloudpickle_tuple(fn), *arrays)
                     from pypads.app.pypads import get_current_pads
 
                     pads = get_current_pads()
 
                     # TODO Pickle all for reinitialisation important things (Logging functions, config, init run fns)
-                    kwargs = {"_pypads_cache": pads.cache,
+                    kwargs = {"_pypads_cache": _get_shipment(pads),
                               "_pypads_config": pads.config,
                               "_pypads_active_run_id": run.info.run_id,
                               "_pypads_tracking_uri": pads.uri,
@@ -144,26 +237,39 @@ if is_package_available("joblib"):
 
     @wraps(original_call)
     def joblib_call(self, *args, **kwargs):
-        from pypads.app.misc.caches import PypadsCache
+        from pypads.parallel.util import RunCacheChanges
         from pypads import logger
         from pypads.app.pypads import current_pads
         pads = current_pads
 
         if pads:
             if pads.config["track_sub_processes"]:
+                global _shipment
                 # Temporary hold handlers and remove them
                 from pypads.pads_loguru import logger_manager
                 logger_manager.temporary_remove()
-                out = original_call(self, *args, **kwargs)
+                initialized = pads.config.get(warm_sub_processes, True) and _add_initializer(self, pads)
+                try:
+                    out = original_call(self, *args, **kwargs)
+                finally:
+                    if initialized:
+                        _remove_initializer(self)
+                    # Tasks of further joblib calls get a new shipment holding the then current cache
+                    if _shipment is not None:
+                        _shipment.remove()
+                        _shipment = None
                 if isinstance(out, List):
                     real_out = []
+                    changes = {}
                     for entry in out:
-                        if isinstance(entry, tuple) and len(entry) == 2 and isinstance(entry[1], PypadsCache):
+                        if isinstance(entry, tuple) and len(entry) == 2 and isinstance(entry[1], RunCacheChanges):
                             real_out.append(entry[0])
-                            cache = entry[1]
-                            pads.cache.merge(cache)
+                            changes.setdefault(entry[1].run_id, []).append(entry[1].entries)
                         else:
                             real_out.append(entry)
+                    # Merge the changes of all tasks at once
+                    for run_id, entries in changes.items():
+                        pads.cache.run_merge(*entries, run_id=run_id)
                     out = real_out
                 logger_manager.add_loggers_from_history()
                 return out
@@ -1,14 +1,159 @@
 import io
+import os
 import pickle
+import sys
+import threading
+import uuid
 
-
-def _pickle_tuple(*args):
-    with io.BytesIO() as file:
-        pickle.dump(tuple(args), file)
-        file.seek(0)
-        return file.read()
+# Persistent id marking numpy arrays passed next to the pickled arguments
+ARRAY_ID = "pypads_array"
 
 
 def _cloudpickle_tuple(*args):
     from joblib.externals.cloudpickle import dumps
     return dumps(tuple(args))
+
+
+class _ArgumentPickler(pickle.Pickler):
+    """
+    Pickler keeping numpy arrays out of the pickled data. They are passed to joblib as they are to let it memmap them.
+    """
+
+    def __init__(self, file, arrays):
+        super().__init__(file)
+        self._arrays = arrays
+        self._indices = {}
+        self._numpy = sys.modules.get("numpy")
+
+    def persistent_id(self, obj):
+        if self._numpy is not None and isinstance(obj, self._numpy.ndarray) and not obj.dtype.hasobject:
+            # Arrays referenced multiple times are only passed once
+            if id(obj) not in self._indices:
+                self._indices[id(obj)] = len(self._arrays)
+                self._arrays.append(obj)
+            return ARRAY_ID, self._indices[id(obj)]
+        return None
+
+
+class _ArgumentUnpickler(pickle.Unpickler):
+
+    def __init__(self, file, arrays):
+        super().__init__(file)
+        self._arrays = arrays
+
+    def persistent_load(self, pid):
+        kind, index = pid
+        if kind != ARRAY_ID:
+            raise pickle.UnpicklingError("Unsupported persistent id {}".format(pid))
+        return self._arrays[index]
+
+
+def _pickle_arguments(args, kwargs):
+    """
+    Pickle the arguments of a task. Numpy arrays are not pickled but returned to be passed to joblib separately.
+    :param args: Arguments
+    :param kwargs: Keyword arguments
+    :return: Tuple of the pickled arguments and the list of numpy arrays
+    """
+    arrays = []
+    with io.BytesIO() as file:
+        _ArgumentPickler(file, arrays).dump((args, kwargs))
+        return file.getvalue(), arrays
+
+
+def _unpickle_arguments(data, arrays):
+    """
+    Unpickle the arguments of a task.
+    :param data: Pickled arguments
+    :param arrays: Numpy arrays passed next to the pickled arguments
+    :return: Tuple of args and kwargs
+    """
+    with io.BytesIO(data) as file:
+        return _ArgumentUnpickler(file, arrays).load()
+
+
+class CacheShipment:
+    """
+    Reference to the pads cache shipped to joblib workers. Instead of pickling the cache with every task it is written
+    once to a file when the first task gets pickled. Tasks only carry the reference and each worker loads the file
+    only once.
+    """
+
+    def __init__(self, cache, folder):
+        """
+        :param cache: PypadsCache to ship
+        :param folder: Folder to store the cache in. This has to be accessible by the workers.
+        """
+        self._cache = cache
+        self._folder = folder
+        self._token = uuid.uuid4().hex
+        self._path = None
+        self._merged = False
+        self._lock = threading.Lock()
+
+    @property
+    def cache(self):
+        return self._cache
+
+    @property
+    def token(self):
+        return self._token
+
+    @property
+    def merged(self):
+        return self._merged
+
+    def mark_merged(self):
+        self._merged = True
+
+    def store(self):
+        """
+        Write the cache to its file if not done yet.
+        :return: Path of the file
+        """
+        with self._lock:
+            if self._path is None:
+                from joblib.externals.cloudpickle import dump
+                os.makedirs(self._folder, exist_ok=True)
+                path = os.path.join(self._folder, self._token + ".pickle")
+                with open(path, "wb") as f:
+                    dump(self._cache, f)
+                self._path = path
+            return self._path
+
+    def remove(self):
+        with self._lock:
+            if self._path is not None:
+                try:
+                    os.remove(self._path)
+                except OSError:
+                    pass
+                self._path = None
+
+    def __reduce__(self):
+        return _load_shipment, (self._token, self.store())
+
+
+# Shipment last loaded by this process. Workers keep it to load the file only once for all of their tasks.
+_loaded_shipment = None
+
+
+def _load_shipment(token, path):
+    global _loaded_shipment
+    if _loaded_shipment is None or _loaded_shipment.token != token:
+        with open(path, "rb") as f:
+            cache = pickle.load(f)
+        shipment = CacheShipment(cache, os.path.dirname(path))
+        shipment._token = token
+        _loaded_shipment = shipment
+    return _loaded_shipment
+
+
+class RunCacheChanges:
+    """
+    Entries of the run cache a joblib task added or replaced.
+    """
+
+    def __init__(self, run_id, entries):
+        self.run_id = run_id
+        self.entries = entries
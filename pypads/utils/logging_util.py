@@ -294,10 +294,20 @@ def store_tmp_artifact(file_name, obj, write_format: FileFormats):
 
     base_path = get_temp_folder()
     path = os.path.join(base_path, file_name)
+    return write_artifact(path, obj, write_format)
 
-    # Create dir in temporary_folder
+
+def write_artifact(path, obj, write_format: FileFormats):
+    """
+    Stores an artifact to given path on disk. The file extension is added depending on the format.
+    :param path: Path without file extension
+    :param obj: Object in memory to store to disk
+    :param write_format: Format to store the object in
+    :return: Path to the stored artifact
+    """
+    # Create dir if needed
     if not os.path.exists(os.path.dirname(path)):
-        os.makedirs(os.path.dirname(path))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
 
     # Write to disk
     if isinstance(write_format, str):
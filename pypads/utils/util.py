@@ -8,7 +8,12 @@ from functools import reduce
 from typing import Tuple
 
 import mlflow
-import pkg_resources
+
+try:
+    from importlib import metadata as importlib_metadata
+except ImportError:
+    # Python < 3.8
+    importlib_metadata = None
 
 from pypads import logger
 from pypads.app.misc.caches import Cache
@@ -88,6 +93,37 @@ def persistent_hash(to_hash, algorithm=hashlib.md5):
     return int(algorithm(to_hash.encode("utf-8")).hexdigest(), 16)
 
 
+def id_hash(*values, digest_size=16):
+    """
+    Produces a stable hash of the given values (No salt). The values are converted to strings and streamed into a single
+    BLAKE2 digest, each prefixed by its length to keep the encoding unambiguous.
+    :param values: Values to hash
+    :param digest_size: Size of the digest in bytes
+    :return: Hex digest
+    """
+    digest = hashlib.blake2b(digest_size=digest_size)
+    for value in values:
+        encoded = str(value).encode("utf-8")
+        digest.update(len(encoded).to_bytes(8, "big"))
+        digest.update(encoded)
+    return digest.hexdigest()
+
+
+def file_digest(path, algorithm=hashlib.md5, chunk_size=65536):
+    """
+    Produces a hex digest of the content of a file on disk.
+    :param path: Path to the file
+    :param algorithm: Hash algorithm to use
+    :param chunk_size: Size of the chunks read from the file
+    :return:
+    """
+    digest = algorithm()
+    with open(path, "rb") as fd:
+        for chunk in iter(lambda: fd.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
 def sizeof_fmt(num, suffix='B'):
     """
     Get the mem / disk size in a human readable way.
@@ -183,8 +219,10 @@ def find_package_version(name: str):
                 lib_version = getattr(base_package, "__version__")
                 return lib_version
         else:
-            lib_version = pkg_resources.get_distribution(name).version
-            return lib_version
+            if importlib_metadata is not None:
+                return importlib_metadata.version(name)
+            import pkg_resources
+            return pkg_resources.get_distribution(name).version
     except Exception as e:
         logger.debug("Couldn't get version of package {}".format(name))
         return None
@@ -17,11 +17,22 @@ MONGO_USER = "MONGO_USER"
 # Configuration Variables
 CONFIG = "CONFIG"
 mongo_db = "mongo_db"
+mongo_bulk_size = "mongo_bulk_size"
+mongo_bulk_delay = "mongo_bulk_delay"
 track_sub_processes = "track_sub_processes"
 recursion_identity = "recursion_identity"
 recursion_depth = "recursion_depth"
 log_on_failure = "log_on_failure"
 include_default_mappings = "include_default_mappings"
+async_logging = "async_logging"
+keep_finished_calls = "keep_finished_calls"
+hook_sampling = "hook_sampling"
+plugin_manifest = "plugin_manifest"
+setup_workers = "setup_workers"
+resource_sampling_period = "resource_sampling_period"
+warm_sub_processes = "warm_sub_processes"
+run_search_cache_ttl = "run_search_cache_ttl"
+release_call_env = "release_call_env"
 
 # TAGS
 # Tag name to save the config to in mlflow context.
@@ -117,4 +117,62 @@ class PypadsAPILogging(BaseTest):
         pads = get_current_pads()
         assert pads.cache.run_exists(id(logger))
         assert pads.cache.run_get(id(logger)) == 16
-        # !-------------------------- asserts ---------------------------
\ No newline at end of file
+        # !-------------------------- asserts ---------------------------
+
+    def test_entry_logging_cost(self):
+        """
+        This example will benchmark logging metrics, parameters and tags and the validation of their entries.
+        :return:
+        """
+        import json
+        import time
+        from pypads.app.injections.tracked_object import Metric
+
+        # --------------------------- setup of the tracking ---------------------------
+        # Activate tracking of pypads
+        from pypads.app.base import PyPads
+        tracker = PyPads(uri=TEST_FOLDER, config={**config, **{"mongo_db": False}}, setup_fns={}, autostart=True)
+        entries = 100
+
+        def cost(log):
+            log(0)
+            start = time.time()
+            for i in range(1, entries):
+                log(i)
+            return (time.time() - start) / (entries - 1)
+
+        costs = {
+            "metric": cost(lambda i: tracker.api.log_metric("metric", i, step=i)),
+            "parameter": cost(lambda i: tracker.api.log_param("parameter_{}".format(i), i)),
+            "tag": cost(lambda i: tracker.api.set_tag("tag_{}".format(i), str(i)))
+        }
+        for name, c in costs.items():
+            print("Logging a {} took {:.2f}ms".format(name, c * 1000))
+
+        metric = Metric(name="metric", step=0, data=1.0, parent=tracker.api.get_programmatic_output())
+        data, json_data = metric.dict_and_json(by_alias=True)
+        plain_data, plain_json = metric.dict(by_alias=True), metric.json(by_alias=True)
+        reference_fields = {"uid", "name", "data"}
+        validated = metric.validate(include=reference_fields)
+        cached = metric.validate(include=reference_fields)
+        metric.data = 2.0
+        changed = metric.validate(include=reference_fields)
+        metric.dict()
+        metric.additional_data["changed"] = True
+        changed_in_place = metric.dict()
+        changed_in_place["additional_data"]["returned"] = True
+
+        # --------------------------- asserts ---------------------------
+        self.assertEqual(json.loads(json_data), json.loads(plain_json))
+        self.assertEqual(data, plain_data)
+        self.assertIs(cached, validated)
+        self.assertIsNot(changed, validated)
+        self.assertEqual(changed[0]["data"], 2.0)
+        # Full validations aren't cached as fields can be changed in place
+        self.assertEqual(changed_in_place["additional_data"], {"changed": True, "returned": True})
+        self.assertEqual(metric.additional_data, {"changed": True})
+        # Validating and serializing an entry took about 10ms per entry without caching and building it in one pass
+        for c in costs.values():
+            self.assertLess(c, 0.005)
+        # !-------------------------- asserts ---------------------------
+        tracker.api.end_run()
@@ -43,3 +43,153 @@ class MLFlowBackend(BaseTest):
         :return:
         """
 
+
+    def test_async_logging(self):
+        """
+        Test pushing metrics, params and tags to mlflow in the background.
+        :return:
+        """
+        from pypads.app.base import PyPads
+        from pypads.app.backends.batching import MlflowBatchWriter
+
+        tracker = PyPads(uri=TEST_FOLDER, config={**config, **{"mongo_db": False, "async_logging": True}},
+                         autostart=True)
+        self.assertIsInstance(tracker.backend.writer, MlflowBatchWriter)
+
+        for i in range(10):
+            tracker.api.log_metric("metric", i, step=i)
+        tracker.api.log_param("param", 1)
+        tracker.api.set_tag("tag", "value")
+
+        run_id = tracker.api.active_run().info.run_id
+        tracker.api.end_run()
+
+        # --------------------------- asserts ------------------------------
+        run = tracker.backend.get_run(run_id)
+        self.assertEqual(len(tracker.backend.get_metric_history(run_id, "metric")), 10)
+        self.assertEqual(run.data.params["param"], "1")
+        self.assertEqual(run.data.tags["tag"], "value")
+        # !-------------------------- asserts ---------------------------
+
+    def test_artifact_manifest(self):
+        """
+        Test taking the size and digest of artifacts from the local file and storing a manifest at the end of the run.
+        :return:
+        """
+        import hashlib
+        from pypads.app.base import PyPads
+
+        tracker = PyPads(uri=TEST_FOLDER, config={**config, **{"mongo_db": False}}, autostart=True)
+        for i in range(3):
+            tracker.api.log_mem_artifact("folder/artifact_" + str(i), "content " + str(i))
+
+        run_id = tracker.api.active_run().info.run_id
+        manifest = tracker.backend.manifest
+        tracker.api.end_run()
+
+        # --------------------------- asserts ------------------------------
+        file_info = manifest["folder/artifact_0.txt"]
+        self.assertEqual(file_info.file_size, len("content 0"))
+        self.assertEqual(file_info.digest, hashlib.md5("content 0".encode("utf-8")).hexdigest())
+        stored = {f.path: f for f in tracker.backend.get_manifest(run_id)}
+        self.assertEqual(set(stored.keys()), set(manifest.keys()))
+        self.assertEqual(stored["folder/artifact_2.txt"].digest, manifest["folder/artifact_2.txt"].digest)
+        # !-------------------------- asserts ---------------------------
+
+    def test_lookup_cache(self):
+        """
+        Test reusing the mlflow client and answering experiment lookups from the cache of the active run.
+        :return:
+        """
+        from pypads.app.base import PyPads
+
+        tracker = PyPads(uri=TEST_FOLDER, config={**config, **{"mongo_db": False}}, autostart=True)
+        self.assertIs(tracker.backend.mlf, tracker.backend.mlf)
+
+        experiment_id = tracker.api.active_run().info.experiment_id
+        lookups = tracker.backend.lookups
+        for _ in range(3):
+            experiment = tracker.api.active_experiment()
+
+        # --------------------------- asserts ------------------------------
+        self.assertEqual(experiment.experiment_id, experiment_id)
+        self.assertLessEqual(tracker.backend.lookups["remote"] - lookups["remote"], 1)
+        self.assertGreaterEqual(tracker.backend.lookups["saved"] - lookups["saved"], 2)
+        # !-------------------------- asserts ---------------------------
+
+        # The cache is dropped with the run
+        tracker.api.end_run()
+        tracker.api.start_run()
+        lookups = tracker.backend.lookups
+        tracker.api.active_experiment()
+        self.assertEqual(tracker.backend.lookups["remote"] - lookups["remote"], 1)
+        tracker.api.end_run()
+
+    def test_legacy_ids(self):
+        """
+        Test compiling ids by BLAKE2 while still finding objects of repositories tagged with their legacy id.
+        :return:
+        """
+        from pypads.app.base import PyPads
+        from pypads.model.models import IdReference, ResultType, legacy_composite_id
+
+        tracker = PyPads(uri=TEST_FOLDER, config={**config, **{"mongo_db": False}}, setup_fns={}, autostart=True)
+        reference = IdReference(uid="entry", storage_type=ResultType.metric, backend_uri=tracker.backend.uri)
+        stored = IdReference(**reference.dict(by_alias=True))
+        legacy = IdReference(uid="entry", storage_type=ResultType.metric, backend_uri=tracker.backend.uri,
+                             _id=legacy_composite_id(tracker.backend.uri, "entry"))
+
+        # An object stored by an older version is tagged with its legacy id
+        repository = tracker.library_repository
+        legacy_tag = repository.repo_reference("legacy_object").ids[-1]
+        tracker.backend.create_run(experiment_id=repository.id, tags={"pypads_unique_uid": legacy_tag})
+
+        # --------------------------- asserts ------------------------------
+        self.assertEqual(len(reference.id), 32)
+        self.assertEqual(stored.id, reference.id)
+        self.assertEqual(reference.ids, [reference.id, legacy.id])
+        self.assertEqual(legacy.ids, [legacy.id])
+        self.assertEqual(len({reference, stored}), 1)
+        self.assertTrue(repository.has_object(uid="legacy_object"))
+        self.assertFalse(repository.has_object(uid="missing_object"))
+        # !-------------------------- asserts ---------------------------
+        tracker.api.end_run()
+
+    def test_legacy_artifact_lookup(self):
+        """
+        Test reading an artifact by its legacy id only if none is stored by its new id.
+        :return:
+        """
+        from unittest import mock
+        from mlflow.exceptions import MlflowException
+        from pypads.app.base import PyPads
+        from pypads.model.models import IdReference, ResultType
+
+        tracker = PyPads(uri=TEST_FOLDER, config={**config, **{"mongo_db": False}}, setup_fns={}, autostart=True)
+        reference = IdReference(uid="entry", storage_type=ResultType.metric, backend_uri=tracker.backend.uri,
+                                run_id=tracker.api.active_run().info.run_id)
+        new_id, legacy_id = reference.ids
+        missing = MlflowException("The following failures occurred while downloading one or more artifacts: "
+                                  "{'path': \"FileNotFoundError(2, 'No such file or directory')\"}")
+        failure = MlflowException("The following failures occurred while downloading one or more artifacts: "
+                                  "{'path': \"PermissionError(13, 'Permission denied')\"}")
+
+        def lookup(error=None, data=None):
+            def load_artifact_data(run_id, path):
+                if path == legacy_id:
+                    return "legacy"
+                if error is not None:
+                    raise error
+                return data
+
+            with mock.patch.object(tracker.backend, "load_artifact_data", side_effect=load_artifact_data):
+                return tracker.backend.get_json(reference)
+
+        # --------------------------- asserts ------------------------------
+        self.assertEqual(lookup(data="new"), "new")
+        self.assertEqual(lookup(), "legacy")
+        self.assertEqual(lookup(error=missing), "legacy")
+        self.assertEqual(lookup(error=FileNotFoundError("path")), "legacy")
+        self.assertRaises(MlflowException, lookup, error=failure)
+        # !-------------------------- asserts ---------------------------
+        tracker.api.end_run()
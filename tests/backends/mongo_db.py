@@ -0,0 +1,231 @@
+import os
+import time
+import unittest
+from unittest import mock
+
+from tests.base_test import BaseTest, TEST_FOLDER, config
+
+try:
+    import mongomock
+except ImportError:
+    mongomock = None
+
+
+@unittest.skipIf(mongomock is None, "mongomock is needed to test the mongo_db support without a database")
+class MongoDBBackend(BaseTest):
+    """
+    This class will test the mongo_db support of the mlflow backend against an in-memory mongo_db.
+    """
+
+    def setUp(self) -> None:
+        super().setUp()
+        self._env = mock.patch.dict(os.environ, {"MONGO_URL": "mongodb://localhost:27017", "MONGO_USER": "pypads",
+                                                 "MONGO_PW": "pypads", "MONGO_DB": "pypads"})
+        self._client = mock.patch("pypads.app.backends.mlflow.MongoClient", mongomock.MongoClient)
+        self._env.start()
+        self._client.start()
+
+    def tearDown(self) -> None:
+        self._client.stop()
+        self._env.stop()
+        super().tearDown()
+
+    def _log_entries(self, tracker, n):
+        run_id = tracker.api.active_run().info.run_id
+        start = time.time()
+        for i in range(n):
+            tracker.backend.log_json({"storage_type": "metric", "uid": str(i), "name": "metric", "data": i,
+                                      "experiment": {"uid": "0", "name": "Default"},
+                                      "run": {"uid": run_id}})
+        tracker.backend.flush()
+        return time.time() - start
+
+    def test_bulk_logging(self):
+        """
+        Test buffering entries for mongo_db and compare the throughput to writing every entry directly.
+        :return:
+        """
+        from pypads.app.base import PyPads
+        from pypads.app.backends.batching import MongoBulkBuffer
+
+        n = 2000
+        tracker = PyPads(uri=TEST_FOLDER, config={**config, **{"mongo_db": True}}, autostart=True)
+        direct = self._log_entries(tracker, n)
+        tracker.api.end_run()
+
+        tracker = PyPads(uri=TEST_FOLDER, config={**config, **{"mongo_db": True, "mongo_bulk_size": 500}},
+                         autostart=True)
+        self.assertIsInstance(tracker.backend._buffer, MongoBulkBuffer)
+        bulk = self._log_entries(tracker, n)
+        # Entries logged after the last flush are written at the end of the run
+        tracker.backend.log_json({"storage_type": "tag", "uid": "last", "name": "tag", "data": "value",
+                                  "experiment": {"uid": "0", "name": "Default"},
+                                  "run": {"uid": tracker.api.active_run().info.run_id}})
+        self.assertEqual(len(tracker.backend._buffer), 1)
+        tracker.api.end_run()
+
+        # --------------------------- asserts ------------------------------
+        self.assertEqual(len(tracker.backend._buffer), 0)
+        self.assertEqual(tracker.backend._db["metric"].count_documents({}), n)
+        self.assertEqual(tracker.backend._db["tag"].count_documents({}), 1)
+        print("mongo_db direct: {:.0f} entries/sec, bulk: {:.0f} entries/sec".format(n / direct, n / bulk))
+        # !-------------------------- asserts ---------------------------
+
+    def test_bulk_requeue(self):
+        """
+        Test keeping documents in the buffer which failed to be written.
+        :return:
+        """
+        from pymongo.errors import BulkWriteError
+        from pypads.app.backends.batching import MongoBulkBuffer
+
+        db = mongomock.MongoClient().db
+        collection = db["metric"]
+        bulk_write = collection.bulk_write
+        failures = []
+
+        def failing_bulk_write(requests, ordered=True):
+            if not failures:
+                # Write all but the second document which fails validation
+                failures.append(requests[1])
+                bulk_write([r for i, r in enumerate(requests) if i != 1], ordered=ordered)
+                raise BulkWriteError({"writeErrors": [{"index": 1, "code": 121, "errmsg": "Validation failed"}]})
+            return bulk_write(requests, ordered=ordered)
+
+        buffer = MongoBulkBuffer(db, max_size=2, max_delay=60)
+        with mock.patch.object(collection, "bulk_write", failing_bulk_write):
+            buffer.add("metric", "0", {"_id": "0"})
+            self.assertRaises(BulkWriteError, buffer.add, "metric", "1", {"_id": "1"})
+            failed = len(buffer)
+            buffer.flush()
+
+        # --------------------------- asserts ------------------------------
+        self.assertEqual(failed, 1)
+        self.assertEqual(len(buffer), 0)
+        self.assertEqual(sorted(d["_id"] for d in collection.find()), ["0", "1"])
+        # !-------------------------- asserts ---------------------------
+
+    def test_search_run_ids(self):
+        """
+        Test searching run ids on mongo_db and falling back to searching leaf by leaf without $unionWith.
+        :return:
+        """
+        from pymongo.errors import OperationFailure
+        from pypads.app.base import PyPads
+        from pypads.app.backends.search import compile_run_search
+        from pypads.app.results import _to_leaf_filter
+
+        from pypads.app.results import RUN_SEARCH_CACHE
+
+        tracker = PyPads(uri=TEST_FOLDER, config={**config, **{"mongo_db": True, "run_search_cache_ttl": 0.5}},
+                         setup_fns={}, autostart=True)
+        backend = tracker.backend
+
+        def log(storage_type, run_id, name, data):
+            backend.log_json({"storage_type": storage_type, "uid": "{}_{}".format(run_id, name), "name": name,
+                              "data": data, "experiment": {"uid": "0", "name": "Default"}, "run": {"uid": run_id}})
+
+        for run_id, depth, accuracy in [("a", "1", 0.95), ("b", "2", 0.95), ("c", "1", 0.5), ("d", "3", 0.1)]:
+            log("parameter", run_id, "depth", depth)
+            log("metric", run_id, "accuracy", accuracy)
+            log("tag", run_id, "tag", "value")
+        depth = {"storage_type": "parameter", "name": "depth", "data": "1"}
+        accuracy = {"storage_type": "metric", "name": "accuracy", "data": {"$gt": 0.9}}
+        plan = compile_run_search({"$or": [depth, {"$and": [accuracy, {"$not": depth}]}]}, to_filter=_to_leaf_filter)
+        negation = compile_run_search({"$not": {"$or": [depth, accuracy]}}, to_filter=_to_leaf_filter)
+
+        # mongomock doesn't implement $unionWith
+        fallback = backend.search_run_ids(plan)
+        supported = backend._union_supported
+        backend._union_supported = True
+        with mock.patch.object(mongomock.collection.Collection, "aggregate",
+                               side_effect=OperationFailure("Unrecognized pipeline stage name: '$unionWith'",
+                                                            code=40324)):
+            failed = backend.search_run_ids(negation)
+
+        # Found run ids are cached until the ttl passed and expired searches are dropped on the next write
+        cached = tracker.results.get_run_ids_by_search(depth)
+        log("parameter", "e", "depth", "1")
+        stale = tracker.results.get_run_ids_by_search(depth)
+        time.sleep(0.5)
+        tracker.results.get_run_ids_by_search(accuracy)
+        searches = len(tracker.cache.get(RUN_SEARCH_CACHE))
+        refreshed = tracker.results.get_run_ids_by_search(depth)
+
+        # --------------------------- asserts ------------------------------
+        self.assertFalse(supported)
+        self.assertEqual(fallback, {"a", "b", "c"})
+        self.assertEqual(failed, {"d"})
+        self.assertFalse(backend._union_supported)
+        self.assertEqual(cached, {"a", "c"})
+        self.assertEqual(stale, cached)
+        self.assertEqual(searches, 1)
+        self.assertEqual(refreshed, {"a", "c", "e"})
+        # !-------------------------- asserts ---------------------------
+        tracker.api.end_run()
+
+    def test_search_aggregation(self):
+        """
+        Test the aggregation pipeline of a run search. mongomock doesn't implement $unionWith and evaluates $not in
+        expressions wrongly, so the branches and the grouping are run one after another and the expression is
+        compared.
+        :return:
+        """
+        from pypads.app.base import PyPads
+        from pypads.app.backends.search import compile_run_search
+        from pypads.app.results import _to_leaf_filter
+
+        tracker = PyPads(uri=TEST_FOLDER, config={**config, **{"mongo_db": True}}, setup_fns={}, autostart=True)
+        backend = tracker.backend
+        db = backend._db
+
+        for run_id, depth, accuracy in [("a", "1", 0.95), ("b", "2", 0.95), ("c", "1", 0.5), ("d", "3", 0.1)]:
+            for storage_type, name, data in [("parameter", "depth", depth), ("metric", "accuracy", accuracy),
+                                             ("tag", "tag", "value")]:
+                backend.log_json({"storage_type": storage_type, "uid": "{}_{}".format(run_id, name), "name": name,
+                                  "data": data, "experiment": {"uid": "0", "name": "Default"},
+                                  "run": {"uid": run_id}})
+        depth = {"storage_type": "parameter", "name": "depth", "data": "1"}
+        accuracy = {"storage_type": "metric", "name": "accuracy", "data": {"$gt": 0.9}}
+        plan = compile_run_search({"$or": [depth, {"$and": [accuracy, {"$not": depth}]}]}, to_filter=_to_leaf_filter)
+
+        calls = []
+
+        def aggregate(collection, pipeline):
+            calls.append((collection.name, pipeline))
+            return iter([{"_id": "a"}])
+
+        backend._union_supported = True
+        with mock.patch.object(mongomock.collection.Collection, "aggregate", autospec=True, side_effect=aggregate):
+            found = backend.search_run_ids(plan)
+        collection, pipeline = calls[0]
+
+        def branch(search_filter, index):
+            return [{"$match": search_filter},
+                    {"$project": {"_id": 0, "run": "$run.uid", "leaf": {"$literal": index}}}]
+
+        # Run the branches on their collections and group the union of their results by run
+        (parameter, depth_filter), (metric, accuracy_filter) = plan.leaves
+        union = db["union"]
+        union.insert_many(list(db[collection].aggregate(pipeline[:2])))
+        for stage in pipeline[2:4]:
+            union.insert_many(list(db[stage["$unionWith"]["coll"]].aggregate(stage["$unionWith"]["pipeline"])))
+        # mongomock's $addToSet drops leaf 0, the leaves are collected by $push instead
+        group = {"$group": {**pipeline[4]["$group"], "leaves": {"$push": pipeline[4]["$group"]["leaves"]["$addToSet"]}}}
+        leaves = {entry["_id"]: set(entry["leaves"]) for entry in union.aggregate([group])}
+
+        # --------------------------- asserts ------------------------------
+        self.assertEqual(found, {"a"})
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(collection, parameter)
+        self.assertEqual(pipeline[:2], branch(depth_filter, 0))
+        self.assertEqual(pipeline[2:4], [{"$unionWith": {"coll": metric, "pipeline": branch(accuracy_filter, 1)}},
+                                         {"$unionWith": {"coll": "tag", "pipeline": branch({}, -1)}}])
+        self.assertEqual(pipeline[4], {"$group": {"_id": "$run", "leaves": {"$addToSet": "$leaf"}}})
+        self.assertEqual(pipeline[5], {"$match": {"_id": {"$ne": None}, "$expr": {
+            "$or": [{"$in": [0, "$leaves"]},
+                    {"$and": [{"$in": [1, "$leaves"]}, {"$not": [{"$in": [0, "$leaves"]}]}]}]}}})
+        self.assertEqual(pipeline[6:], [{"$project": {"_id": 1}}])
+        self.assertEqual(leaves, {"a": {0, 1, -1}, "b": {1, -1}, "c": {0, -1}, "d": {-1}})
+        # !-------------------------- asserts ---------------------------
+        tracker.api.end_run()
@@ -253,3 +253,108 @@ class PypadsInjectionLoggers(BaseTest):
         self.assertEqual(i, 1)
         # TODO add asserts
         # !-------------------------- asserts ---------------------------
+
+    def test_output_holder_classes(self):
+        """
+        This example will test building the outputs of a logger with one holder class per output schema.
+        :return:
+        """
+        import time
+        from pypads.app.injections.base_logger import output_holder_class
+
+        # --------------------------- setup of the tracking ---------------------------
+        class TestLogger(InjectionLogger):
+
+            @classmethod
+            def output_schema_class(cls) -> Optional[Type[OutputModel]]:
+                return DummyOutput
+
+            def __pre__(self, ctx, *args, **kwargs):
+                pass
+
+        # Activate tracking of pypads
+        from pypads.app.base import PyPads
+        tracker = PyPads(uri=TEST_FOLDER, config={**config, **{"mongo_db": False}}, setup_fns={}, autostart=True)
+        test = TestLogger()
+        call = tracker.api.get_programmatic_output().producer
+
+        start = time.time()
+        outputs = [test.build_output(None, call, var=i) for i in range(100)]
+        duration = (time.time() - start) / len(outputs)
+
+        # --------------------------- asserts ---------------------------
+        self.assertEqual({type(o) for o in outputs}, {output_holder_class(DummyOutput)})
+        self.assertIs(outputs[0].get_model_cls(), DummyOutput)
+        self.assertEqual(outputs[1].var, 1)
+        self.assertEqual(outputs[2].name, "Output")
+        self.assertIs(outputs[0]._defined_in, outputs[1]._defined_in)
+        self.assertLess(duration, 1e-3)
+        # !-------------------------- asserts ---------------------------
+
+    def test_env_cache_release(self):
+        """
+        This example will test releasing the arguments and results of finished calls kept by a multi injection logger.
+        :return:
+        """
+        import gc
+        import numpy as np
+        import psutil
+        from pypads.app.injections.base_logger import env_cache, ReleasedValue
+
+        # --------------------------- setup of the tracking ---------------------------
+
+        class TestLogger(MultiInjectionLogger):
+
+            @staticmethod
+            def finalize_output(pads, logger_call, output, *args, **kwargs):
+                pass
+
+        test = TestLogger()
+
+        events = {
+            "test_logger": test
+        }
+
+        hooks = {
+            "test_logger": {"on": ["pypads_fit"]},
+        }
+
+        # Activate tracking of pypads
+        from pypads.app.base import PyPads
+        tracker = PyPads(uri=TEST_FOLDER, config={**config, **{"mongo_db": False}}, hooks=hooks, events=events,
+                         setup_fns={}, autostart=True)
+
+        def fit(X):
+            return X[:10] * 2
+
+        fit = tracker.api.track(fit, anchors=["pypads_fit"])
+        fit(np.ones(10))
+        gc.collect()
+
+        process = psutil.Process()
+        start = process.memory_info().rss
+        peak = start
+        for _ in range(1000):
+            # A new array of 100 MB for every call
+            fit(np.ones(100 * 2 ** 20 // 8))
+            peak = max(peak, process.memory_info().rss)
+        gc.collect()
+        growth = process.memory_info().rss - start
+
+        output = tracker.cache.run_get(id(test)).get('output')
+        environment = tracker.cache.run_get(env_cache(output))
+
+        # --------------------------- asserts ---------------------------
+        print("Memory grew by {:.0f} MB and peaked at {:.0f} MB more".format(growth / 2 ** 20, (peak - start) / 2 ** 20))
+        self.assertLess(growth, 50 * 2 ** 20)
+        self.assertLess(peak - start, 150 * 2 ** 20)
+        released = environment["_args"][0]
+        self.assertIsInstance(released, ReleasedValue)
+        self.assertEqual(released.shape, (100 * 2 ** 20 // 8,))
+        self.assertEqual(released.dtype, "float64")
+        self.assertEqual(released.nbytes, 100 * 2 ** 20)
+        self.assertIsNone(released.get())
+        self.assertIsInstance(environment["_pypads_result"], ReleasedValue)
+        self.assertEqual(len(tracker.cache.run_get(id(test)).get('logger_call').call_stack), 1001)
+        # !-------------------------- asserts ---------------------------
+        tracker.api.end_run()
@@ -0,0 +1,59 @@
+from tests.base_test import BaseTest, TEST_FOLDER, config
+
+
+class CallTracking(BaseTest):
+
+    def _track_calls(self, tracker, instances, n):
+        from pypads.app.call import FunctionReference
+        from pypads.importext.wrapping.base_wrapper import Context
+        from pypads.importext.wrapping.function_wrapping import FunctionWrapper
+        from sklearn.tree import DecisionTreeClassifier
+
+        wrapper = FunctionWrapper(tracker)
+        fn_reference = FunctionReference(Context(DecisionTreeClassifier), DecisionTreeClassifier.fit)
+        call_ids = []
+        for _ in range(n):
+            for instance in instances:
+                with wrapper._make_call(instance, fn_reference) as call:
+                    call_ids.append(call.call_id)
+        return call_ids
+
+    def test_call_numbering(self):
+        """
+        Test numbering instances and calls.
+        :return:
+        """
+        from pypads.app.base import PyPads
+        from sklearn.tree import DecisionTreeClassifier
+
+        tracker = PyPads(uri=TEST_FOLDER, config={**config, **{"mongo_db": False}}, autostart=True)
+        instances = [DecisionTreeClassifier(), DecisionTreeClassifier()]
+        call_ids = self._track_calls(tracker, instances, 3)
+
+        # --------------------------- asserts ------------------------------
+        self.assertEqual([c.instance_number for c in call_ids], [0, 1] * 3)
+        self.assertEqual([c.call_number for c in call_ids], [0, 0, 1, 1, 2, 2])
+        self.assertEqual(len(tracker.call_tracker.call_stack), 0)
+        self.assertEqual(len(tracker.call_tracker.calls(call_ids[0])), 3)
+        # !-------------------------- asserts ---------------------------
+        tracker.api.end_run()
+
+    def test_drop_finished_calls(self):
+        """
+        Test keeping only the counters of finished calls.
+        :return:
+        """
+        from pypads.app.base import PyPads
+        from sklearn.tree import DecisionTreeClassifier
+
+        tracker = PyPads(uri=TEST_FOLDER, config={**config, **{"mongo_db": False, "keep_finished_calls": False}},
+                         autostart=True)
+        instances = [DecisionTreeClassifier()]
+        call_ids = self._track_calls(tracker, instances, 100)
+
+        # --------------------------- asserts ------------------------------
+        self.assertEqual(call_ids[-1].call_number, 99)
+        self.assertEqual(tracker.call_tracker.call_number(call_ids[-1]), 100)
+        self.assertEqual(len(tracker.call_tracker.calls(call_ids[-1])), 0)
+        # !-------------------------- asserts ---------------------------
+        tracker.api.end_run()
@@ -0,0 +1,148 @@
+import os
+import re
+import time
+import timeit
+
+from tests.base_test import BaseTest
+
+
+class MappingIndexing(BaseTest):
+
+    def test_mapping_index(self):
+        """
+        Test finding mappings with the compiled index against walking the nested mapping dict.
+        :return:
+        """
+        import inspect
+        import sklearn
+        import sklearn.linear_model
+        import sklearn.tree
+        from pypads.importext.mappings import MappingFile, default_mapping_file_paths
+        from pypads.importext.package_path import PackagePath
+
+        collections = [MappingFile(path) for path in default_mapping_file_paths]
+        paths = []
+        for module in [sklearn, sklearn.linear_model, sklearn.tree]:
+            for name, obj in inspect.getmembers(module):
+                paths.append(PackagePath(".".join([module.__name__, name])))
+                for fn_name in dir(obj) if inspect.isclass(obj) else []:
+                    paths.append(PackagePath(".".join([module.__name__, name, fn_name])))
+
+        def find_indexed():
+            return [{m for c in collections for m in c.find_mappings(p.segments)} for p in paths]
+
+        def find_walked():
+            return [{m for c in collections for m in c.find_mappings(p.segments, current_path=c.mappings)} for p in
+                    paths]
+
+        # --------------------------- asserts ------------------------------
+        self.assertEqual(find_indexed(), find_walked())
+        self.assertGreater(sum(len(m) for m in find_indexed()), 0)
+
+        indexed = timeit.timeit(find_indexed, number=3) / 3
+        walked = timeit.timeit(find_walked, number=3) / 3
+        print("Finding mappings for {} paths: {:.1f}ms indexed, {:.1f}ms walked".format(len(paths), indexed * 1e3,
+                                                                                        walked * 1e3))
+        self.assertLess(indexed, walked)
+        # !-------------------------- asserts ---------------------------
+
+    def test_version_resolution(self):
+        """
+        Test resolving the version of a library only once for all of its members.
+        :return:
+        """
+        from unittest import mock
+        import sklearn
+        from pypads.app.base import PyPads
+        from pypads.importext.package_path import Package, PackagePath
+        from pypads.importext.mappings import MappingFile, default_mapping_file_paths
+        from pypads.utils.util import find_package_version
+        from tests.base_test import TEST_FOLDER, config
+
+        tracker = PyPads(uri=TEST_FOLDER, config={**config, **{"mongo_db": False}}, autostart=True)
+        registry = tracker.mapping_registry
+        packages = [Package(None, PackagePath("sklearn.tree.DecisionTreeClassifier.{}".format(name))) for name in
+                    ["fit", "predict", "score"]] + [Package(None, PackagePath("numpy.array"))]
+
+        with mock.patch("pypads.importext.mappings.find_package_version", wraps=find_package_version) as find_version:
+            for package in packages:
+                registry.get_relevant_mappings(package)
+            calls = find_version.call_count
+            version, collections = registry.resolve("sklearn")
+
+            # Adding mappings invalidates the resolution
+            registry.add_mapping(MappingFile(default_mapping_file_paths[0]))
+            registry.resolve("sklearn")
+
+        # --------------------------- asserts ------------------------------
+        self.assertEqual(calls, 1)
+        self.assertEqual(find_version.call_count, 2)
+        self.assertEqual(version, sklearn.__version__)
+        self.assertEqual(registry.resolve("numpy"), (None, []))
+        # !-------------------------- asserts ---------------------------
+        tracker.api.end_run()
+
+    def test_compiled_mapping(self):
+        """
+        Test loading mapping files from their compiled form.
+        :return:
+        """
+        import tempfile
+        from pypads.importext.mappings import MappingFile, default_mapping_file_paths
+
+        cache_folder = tempfile.mkdtemp()
+        path = [p for p in default_mapping_file_paths if "sklearn" in p][0]
+        parsed = MappingFile(path)
+
+        start = time.time()
+        MappingFile(path, cache_folder=cache_folder)
+        cold = time.time() - start
+
+        start = time.time()
+        compiled = MappingFile(path, cache_folder=cache_folder)
+        warm = time.time() - start
+
+        # The index isn't stored with the compiled mapping. It is built on first access including its regex patterns.
+        re.purge()
+        start = time.time()
+        compiled.index
+        index = time.time() - start
+
+        # --------------------------- asserts ------------------------------
+        self.assertEqual(len(os.listdir(cache_folder)), 1)
+        self.assertEqual(compiled.uid, parsed.uid)
+        self.assertEqual(compiled.lib.name, parsed.lib.name)
+        self.assertEqual(compiled.lib.constraint, parsed.lib.constraint)
+        self.assertEqual(set(compiled.index.all_mappings), set(parsed.index.all_mappings))
+        print("Loading {}: {:.1f}ms parsed, {:.1f}ms compiled, {:.1f}ms building the index".format(
+            os.path.basename(path), cold * 1e3, warm * 1e3, index * 1e3))
+        self.assertLess(warm, cold)
+        self.assertLess(index, warm)
+        # !-------------------------- asserts ---------------------------
+
+    def test_mapping_registration(self):
+        """
+        Test skipping the lookup of mappings in the mapping repository if they were registered with the same backend.
+        :return:
+        """
+        from unittest import mock
+        from pypads.app.backends.repository import MappingRepository
+        from pypads.app.base import PyPads
+        from pypads.importext.mappings import MappingRegistry
+        from tests.base_test import TEST_FOLDER, config
+
+        tracker = PyPads(uri=TEST_FOLDER, config={**config, **{"mongo_db": False}}, autostart=True)
+        with mock.patch.object(MappingRepository, "has_object", autospec=True,
+                               side_effect=MappingRepository.has_object) as has_object:
+            registry = MappingRegistry(tracker)
+            registered_calls = has_object.call_count
+
+            # Without the registrations the repository has to be checked again
+            os.remove(os.path.join(tracker.folder, "cache", "mappings", "registrations.json"))
+            MappingRegistry(tracker)
+
+        # --------------------------- asserts ------------------------------
+        self.assertEqual(registered_calls, 0)
+        self.assertEqual(has_object.call_count, len(list(registry.get_entries())))
+        # !-------------------------- asserts ---------------------------
+        tracker.api.end_run()
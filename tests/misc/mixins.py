@@ -0,0 +1,75 @@
+import time
+
+from tests.base_test import BaseTest
+
+# Number of calls of the dependency check benchmark
+CHECKS = 2000
+
+
+class DependencyMixinTest(BaseTest):
+
+    def _dependent(self, dependencies):
+        from pypads.app.misc.mixins import DependencyMixin
+
+        class Dependent(DependencyMixin):
+            _dependencies = dependencies
+
+            def __init__(self):
+                super().__init__()
+
+            def __real_call__(self, *args, **kwargs):
+                return True
+
+        return Dependent()
+
+    def test_dependency_verdicts(self):
+        """
+        Test checking the dependencies of a class once and renewing the verdict if their modules change.
+        :return:
+        """
+        import sys
+        from importlib.util import find_spec, module_from_spec
+        from pypads.app.misc import mixins
+        from pypads.app.misc.mixins import MissingDependencyError, invalidate_dependency_verdicts
+
+        dependent = self._dependent({"pydantic", ("mlflow", ">=1.0.0")})
+        missing = self._dependent({("mlflow", "<0.1")})
+
+        def checks():
+            start = time.time()
+            for _ in range(CHECKS):
+                dependent._check_dependencies()
+            return (time.time() - start) / CHECKS
+
+        def resolves():
+            start = time.time()
+            for _ in range(CHECKS):
+                invalidate_dependency_verdicts()
+                dependent._check_dependencies()
+            return (time.time() - start) / CHECKS
+
+        resolved = resolves()
+        cached = checks()
+        verdict = mixins._dependency_verdicts[dependent.__class__]
+        dependent._check_dependencies()
+        kept = mixins._dependency_verdicts[dependent.__class__]
+
+        # A module replaced in sys.modules renews the verdict
+        original = sys.modules["pydantic"]
+        sys.modules["pydantic"] = module_from_spec(find_spec("pydantic"))
+        try:
+            dependent._check_dependencies()
+        finally:
+            sys.modules["pydantic"] = original
+        renewed = mixins._dependency_verdicts[dependent.__class__]
+
+        # --------------------------- asserts ------------------------------
+        print("Dependency check took {:.2f}us cached and {:.2f}us resolved".format(cached * 1e6, resolved * 1e6))
+        self.assertIs(kept, verdict)
+        self.assertIsNot(renewed, verdict)
+        self.assertTrue(dependent())
+        self.assertRaises(MissingDependencyError, missing._check_dependencies)
+        self.assertRaises(MissingDependencyError, missing)
+        self.assertLess(cached * 5, resolved)
+        self.assertLess(cached, 1e-5)
+        # !-------------------------- asserts ---------------------------
@@ -0,0 +1,282 @@
+import os
+import pickle
+
+from tests.base_test import BaseTest, TEST_FOLDER, config
+
+
+def array_sum(data, i):
+    import numpy as np
+    from pypads.app.pypads import get_current_pads
+    pads = get_current_pads()
+    pads.cache.run_add("task_{}".format(i), type(data).__name__)
+    return float(np.sum(data)) + i
+
+
+def active_run_id(i):
+    import mlflow
+    mlflow.set_tag("task_{}".format(i), os.getpid())
+    return mlflow.active_run().info.run_id
+
+
+def extend_manifest(i):
+    from pypads.app.pypads import get_current_pads
+    pads = get_current_pads()
+    pads.cache.run_get("manifest")["task_{}".format(i)] = i
+    pads.cache.run_get("fns").add("task_{}".format(i), i)
+    return i
+
+
+# Imports sklearn with tracking activated like a joblib worker and prints the duration of the import
+WORKER_IMPORT = """
+import json
+import sys
+import time
+from pypads.app import base
+base.DEFAULT_SETUP_FNS = {}
+from pypads.app.base import PyPads
+mode, unaffected, folder = sys.argv[1:]
+# Without hooks no import loggers are run and only the search for mappings is timed additionally to the import
+tracker = PyPads(uri=folder, config={"mongo_db": False}, hooks={}, autostart=True)
+module_wrapper = tracker.wrap_manager.module_wrapper
+if mode == "warm":
+    with open(unaffected) as f:
+        module_wrapper.set_known_unaffected_module_names(json.load(f))
+start = time.time()
+import sklearn.tree
+import sklearn.ensemble
+import sklearn.linear_model
+duration = time.time() - start
+if mode == "dump":
+    with open(unaffected, "w") as f:
+        json.dump(sorted(module_wrapper.unaffected_module_names), f)
+punched = sorted(tracker.wrap_manager.class_wrapper.punched_class_names)
+tracker.api.end_run()
+print(json.dumps({"punched": punched, "duration": duration}))
+"""
+
+
+class JoblibTransfer(BaseTest):
+
+    def test_argument_pickling(self):
+        """
+        Test keeping numpy arrays out of the pickled arguments of a task.
+        :return:
+        """
+        import numpy as np
+        from pypads.parallel.util import _pickle_arguments, _unpickle_arguments
+
+        data = np.arange(100000, dtype=float)
+        objects = np.array([{"a": 1}], dtype=object)
+        pickled, arrays = _pickle_arguments((data, objects, [data]), {"data": data, "value": 1})
+        args, kwargs = _unpickle_arguments(pickled, arrays)
+
+        # --------------------------- asserts ------------------------------
+        self.assertEqual(len(arrays), 1)
+        self.assertIs(arrays[0], data)
+        self.assertLess(len(pickled), data.nbytes)
+        self.assertIs(args[0], data)
+        self.assertIs(args[2][0], data)
+        self.assertIs(kwargs["data"], data)
+        self.assertEqual(args[1][0], {"a": 1})
+        self.assertEqual(kwargs["value"], 1)
+        # !-------------------------- asserts ---------------------------
+
+    def test_cache_shipment(self):
+        """
+        Test writing the shipped cache once and loading it once per process.
+        :return:
+        """
+        import tempfile
+        from pypads.app.misc.caches import PypadsCache
+        from pypads.parallel.util import CacheShipment
+
+        cache = PypadsCache()
+        cache.add("entry", {"value": 1})
+        shipment = CacheShipment(cache, tempfile.mkdtemp())
+        first = pickle.dumps(shipment)
+        second = pickle.dumps(shipment)
+        path = shipment.store()
+        loaded = pickle.loads(first)
+        reloaded = pickle.loads(second)
+
+        # --------------------------- asserts ------------------------------
+        self.assertLess(len(first), 500)
+        self.assertEqual(len(os.listdir(os.path.dirname(path))), 1)
+        self.assertIs(loaded, reloaded)
+        self.assertEqual(loaded.cache.get("entry"), {"value": 1})
+        shipment.remove()
+        self.assertFalse(os.path.exists(path))
+        # !-------------------------- asserts ---------------------------
+
+    def test_run_cache_changes(self):
+        """
+        Test collecting the changes of a run cache and merging them in one pass.
+        :return:
+        """
+        from pypads.app.base import PyPads
+
+        tracker = PyPads(uri=TEST_FOLDER, config={**config, **{"mongo_db": False}}, autostart=True)
+        run_cache = tracker.cache.run_cache()
+        run_cache.pop_changes()
+        tracker.cache.run_add("first", 1)
+        tracker.cache.run_add("values", [1])
+        changes = run_cache.pop_changes()
+        tracker.cache.run_merge({"values": [2]}, {"values": [3], "second": 2})
+
+        # --------------------------- asserts ------------------------------
+        self.assertEqual(changes, {"first": 1, "values": [1]})
+        self.assertEqual(run_cache.pop_changes(), {})
+        self.assertEqual(tracker.cache.run_get("values"), [1, 2, 3])
+        self.assertEqual(tracker.cache.run_get("second"), 2)
+        # !-------------------------- asserts ---------------------------
+        tracker.api.end_run()
+
+    def test_joblib_tracking(self):
+        """
+        Test tracking joblib tasks in subprocesses with memmapped arguments and returned run cache changes.
+        :return:
+        """
+        import numpy as np
+        from joblib import Parallel, delayed
+        from pypads.app.base import PyPads
+
+        tracker = PyPads(uri=TEST_FOLDER, config={**config, **{"mongo_db": False, "track_sub_processes": True}},
+                         autostart=True)
+        data = np.ones((1000, 1000))
+        out = Parallel(n_jobs=2, prefer="processes")(delayed(array_sum)(data, i) for i in range(4))
+
+        # --------------------------- asserts ------------------------------
+        self.assertEqual(out, [1000000.0 + i for i in range(4)])
+        self.assertEqual([tracker.cache.run_get("task_{}".format(i)) for i in range(4)], ["memmap"] * 4)
+        self.assertEqual(os.listdir(os.path.join(tracker.folder, "cache", "joblib")), [])
+        # !-------------------------- asserts ---------------------------
+        tracker.api.end_run()
+
+    def test_joblib_cache_mutations(self):
+        """
+        Test returning entries of the run cache which were shipped to a worker and changed in place by a task.
+        :return:
+        """
+        from joblib import Parallel, delayed
+        from pypads.app.base import PyPads
+        from pypads.app.misc.caches import Cache
+
+        tracker = PyPads(uri=TEST_FOLDER, config={**config, **{"mongo_db": False, "track_sub_processes": True}},
+                         autostart=True)
+        fns = Cache()
+        fns.add("parent", -1)
+        tracker.cache.run_add("manifest", {"parent": -1})
+        tracker.cache.run_add("fns", fns)
+        tracker.cache.run_add("name", "parent")
+        run_cache = tracker.cache.run_cache()
+        run_cache.pop_changes()
+        tracker.cache.run_get("name")
+        unchanged = run_cache.pop_changes()
+        out = Parallel(n_jobs=2, prefer="processes")(delayed(extend_manifest)(i) for i in range(4))
+        expected = {"parent": -1, **{"task_{}".format(i): i for i in range(4)}}
+
+        # --------------------------- asserts ------------------------------
+        self.assertEqual(out, list(range(4)))
+        self.assertEqual(unchanged, {})
+        self.assertEqual(tracker.cache.run_get("manifest"), expected)
+        self.assertEqual(dict(tracker.cache.run_get("fns").items()), expected)
+        self.assertEqual(tracker.cache.run_get("name"), "parent")
+        # !-------------------------- asserts ---------------------------
+        tracker.api.end_run()
+
+    def test_warm_workers(self):
+        """
+        Test letting loky workers set up pypads by an initializer without replacing a user defined one.
+        :return:
+        """
+        from joblib import Parallel
+        from pypads.app.base import PyPads
+        from pypads.parallel.joblib import _add_initializer, _init_worker
+
+        tracker = PyPads(uri=TEST_FOLDER, config={**config, **{"mongo_db": False, "track_sub_processes": True}},
+                         autostart=True)
+        parallel = Parallel(n_jobs=2, prefer="processes")
+        _add_initializer(parallel, tracker)
+        custom = Parallel(n_jobs=2, prefer="processes", initializer=print)
+        _add_initializer(custom, tracker)
+        threads = Parallel(n_jobs=2, prefer="threads")
+        _add_initializer(threads, tracker)
+
+        # --------------------------- asserts ------------------------------
+        self.assertIs(parallel._backend_kwargs["initializer"], _init_worker)
+        uri, worker_config, run_id, affected, unaffected = parallel._backend_kwargs["initargs"]
+        self.assertEqual(run_id, tracker.api.active_run().info.run_id)
+        self.assertEqual(set(affected), tracker.wrap_manager.module_wrapper.punched_module_names)
+        self.assertEqual(set(unaffected), tracker.wrap_manager.module_wrapper.unaffected_module_names)
+        self.assertIs(custom._backend_kwargs["initializer"], print)
+        self.assertNotIn("initializer", threads._backend_kwargs)
+        # !-------------------------- asserts ---------------------------
+        tracker.api.end_run()
+
+    def test_warm_workers_reused(self):
+        """
+        Test logging the tasks of a Parallel object reused in a later run into the run active at its call.
+        :return:
+        """
+        import mlflow
+        from joblib import Parallel, delayed
+        from joblib.externals.loky import reusable_executor
+        from pypads.app.base import PyPads
+        from pypads.parallel.joblib import _init_worker
+
+        tracker = PyPads(uri=TEST_FOLDER, config={**config, **{"mongo_db": False, "track_sub_processes": True}},
+                         autostart=True)
+        parallel = Parallel(n_jobs=2)
+        run_ids = []
+        for _ in range(2):
+            run_id = tracker.api.active_run().info.run_id
+            out = parallel(delayed(active_run_id)(i) for i in range(4))
+            executor_kwargs = reusable_executor._executor_kwargs
+
+            # --------------------------- asserts ------------------------------
+            self.assertEqual(out, [run_id] * 4)
+            self.assertEqual(set(mlflow.get_run(run_id).data.tags).intersection(
+                {"task_{}".format(i) for i in range(4)}), {"task_{}".format(i) for i in range(4)})
+            self.assertIs(executor_kwargs["initializer"], _init_worker)
+            self.assertEqual(executor_kwargs["initargs"][2], run_id)
+            self.assertNotIn("initializer", parallel._backend_kwargs)
+            # !-------------------------- asserts ---------------------------
+            tracker.api.end_run()
+            run_ids.append(run_id)
+            if len(run_ids) < 2:
+                tracker.api.start_run()
+        self.assertNotEqual(run_ids[0], run_ids[1])
+
+    def test_known_unaffected_modules(self):
+        """
+        Test skipping the search for mappings in modules the parent already searched when a worker imports them.
+        :return:
+        """
+        import json
+        import subprocess
+        import sys
+        import tempfile
+
+        folder = tempfile.mkdtemp()
+        unaffected = os.path.join(folder, "unaffected.json")
+        root = os.path.join(os.path.dirname(__file__), "..", "..")
+
+        def punched_import(mode):
+            out = subprocess.check_output([sys.executable, "-c", WORKER_IMPORT, mode, unaffected, folder],
+                                          cwd=root, stderr=subprocess.DEVNULL)
+            return json.loads(out.decode().strip().splitlines()[-1])
+
+        punched_import("dump")
+        cold = [punched_import("cold") for _ in range(2)]
+        warm = [punched_import("warm") for _ in range(2)]
+
+        # --------------------------- asserts ------------------------------
+        cold_duration = min(i["duration"] for i in cold)
+        warm_duration = min(i["duration"] for i in warm)
+        print("Punched import took {:.2f}s without and {:.2f}s with the modules known by the parent".format(
+            cold_duration, warm_duration))
+        # Submodules the parent only imported lazily while searching sklearn itself are punched on their own import
+        self.assertIn("BaseEstimator", warm[0]["punched"])
+        self.assertTrue(set(warm[0]["punched"]).issubset(cold[0]["punched"]))
+        self.assertLess(warm_duration, cold_duration)
+        # !-------------------------- asserts ---------------------------
@@ -0,0 +1,134 @@
+from tests.base_test import BaseTest, TEST_FOLDER, config
+
+
+class PipelineEdgeLogging(BaseTest):
+
+    def test_edge_log(self):
+        """
+        Test adding nodes and edges to the edge log and rebuilding the network from its chunks.
+        :return:
+        """
+        from pypads.injections.loggers.pipeline_detection import PipelineEdgeLog, ENTRY_NODE, CALL_ORDER_EDGE, \
+            OF_EDGE, DATA_ID_EDGE
+
+        log = PipelineEdgeLog(chunk_size=4)
+        entry = log.node(ENTRY_NODE)
+        fit = log.node("fit")
+        predict = log.node("predict")
+        estimator = log.node("estimator")
+        log.add_edge(entry, fit, CALL_ORDER_EDGE, step=0)
+        log.add_of_edge(fit, estimator)
+        log.add_of_edge(fit, estimator)
+        first = log.pop_chunk()
+
+        self.assertEqual(log.node("fit"), fit)
+        log.add_edge(fit, predict, CALL_ORDER_EDGE, step=1)
+        log.add_of_edge(predict, estimator)
+        log.add_edge(fit, predict, DATA_ID_EDGE)
+        second = log.pop_chunk()
+
+        # --------------------------- asserts ------------------------------
+        self.assertEqual(len(first["nodes"]), 4)
+        self.assertEqual(len(second["nodes"]), 0)
+        self.assertEqual(log.number_of_edges, 5)
+        self.assertFalse(log.has_pending())
+
+        network = PipelineEdgeLog.to_network([second, first])
+        self.assertEqual(network.number_of_nodes(), 4)
+        self.assertEqual(network.number_of_edges(), 5)
+        self.assertEqual(network.nodes[entry]["label"], "entry")
+        self.assertEqual(network.nodes[fit]["label"], "fit")
+        self.assertEqual({d["label"] for _, _, d in network.edges(fit, data=True)},
+                         {"1:" + CALL_ORDER_EDGE, OF_EDGE, DATA_ID_EDGE})
+        # !-------------------------- asserts ---------------------------
+
+    def test_call_nodes(self):
+        """
+        Test that the edge log only remembers the nodes and edges which don't grow with the number of calls.
+        :return:
+        """
+        from pypads.injections.loggers.pipeline_detection import PipelineEdgeLog, ENTRY_NODE, CALL_ORDER_EDGE, \
+            OF_EDGE
+
+        log = PipelineEdgeLog()
+        last = log.node(ENTRY_NODE)
+        for i in range(100):
+            function = log.node("fit")
+            call = log.call_node("call")
+            log.add_edge(call, function, OF_EDGE)
+            log.add_edge(last, call, CALL_ORDER_EDGE, step=i)
+            last = call
+        network = PipelineEdgeLog.to_network([log.pop_chunk()])
+
+        # --------------------------- asserts ------------------------------
+        self.assertEqual(len(log._node_ids), 2)
+        self.assertEqual(len(log._of_edges), 0)
+        self.assertEqual(log.number_of_nodes, 102)
+        self.assertEqual(network.number_of_nodes(), 102)
+        self.assertEqual(network.number_of_edges(), 200)
+        # !-------------------------- asserts ---------------------------
+
+    def test_flush_edge_log(self):
+        """
+        Test flushing the edge log of a pipeline into artifacts while running.
+        :return:
+        """
+        from pypads.app.base import PyPads
+        from pypads.injections.loggers.pipeline_detection import PipelineTO, CALL_ORDER_EDGE
+
+        tracker = PyPads(uri=TEST_FOLDER, config={**config, **{"mongo_db": False}}, autostart=True)
+        pipeline = PipelineTO(parent=tracker.api.get_programmatic_output(), pipeline_type="normal")
+        log = pipeline.log
+        last = log.node(-1)
+        for i in range(10):
+            current = log.node("call_{}".format(i))
+            log.add_edge(last, current, CALL_ORDER_EDGE, step=i)
+            last = current
+            if i % 4 == 3:
+                pipeline.flush()
+        network = pipeline.nx_network
+
+        # --------------------------- asserts ------------------------------
+        # Reading the network doesn't flush the pending edges
+        self.assertEqual(len(pipeline.edge_log), 2)
+        self.assertTrue(log.has_pending())
+        self.assertEqual(network.number_of_nodes(), 11)
+        self.assertEqual(network.number_of_edges(), 10)
+
+        pipeline.flush()
+        self.assertEqual(len(pipeline.edge_log), 3)
+        self.assertFalse(log.has_pending())
+        self.assertEqual(PipelineTO.load_network(pipeline.run.uid, pipeline.edge_log).number_of_edges(), 10)
+        # !-------------------------- asserts ---------------------------
+        tracker.api.end_run()
+
+    def test_data_id_edges(self):
+        """
+        Test adding data edges for values which were returned by an earlier tracked call.
+        :return:
+        """
+        from pypads.app.base import PyPads
+        from pypads.injections.loggers.pipeline_detection import PipelineTO, PipelineTrackerILF, DATA_ID_EDGE
+
+        tracker = PyPads(uri=TEST_FOLDER, config={**config, **{"mongo_db": False}}, autostart=True)
+        pipeline = PipelineTO(parent=tracker.api.get_programmatic_output(), pipeline_type="normal")
+        log = pipeline.log
+        fit = log.node("fit")
+        predict = log.node("predict")
+        score = log.node("score")
+
+        result = [1, 2, 3]
+        other = [1, 2, 3]
+        pipeline.add_data_id(id(result), fit)
+        # Only the id of the data is checked, equal data of another object doesn't produce an edge
+        pipeline.add_data_hash(hash(tuple(other)), fit)
+        PipelineTrackerILF._check_data_edge(result, predict, pipeline)
+        PipelineTrackerILF._check_data_edge(other, score, pipeline)
+        network = pipeline.nx_network
+
+        # --------------------------- asserts ------------------------------
+        self.assertEqual(log.number_of_edges, 1)
+        self.assertEqual([(s, t, d["plain_label"]) for s, t, d in network.edges(data=True)],
+                         [(fit, predict, DATA_ID_EDGE)])
+        # !-------------------------- asserts ---------------------------
+        tracker.api.end_run()
@@ -0,0 +1,88 @@
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from tests.base_test import BaseTest
+
+# Time budget in seconds for importing pypads in a fresh interpreter
+IMPORT_BUDGET = 10
+
+
+class PluginDiscovery(BaseTest):
+
+    def _install_dummy_plugin(self, folder, name, entry_point=True, entry_point_name="dummy"):
+        with open(os.path.join(folder, name + ".py"), "w") as f:
+            f.write("activated = []\n\n\ndef activate(*args, **kwargs):\n    activated.append(True)\n")
+        dist_info = os.path.join(folder, name + "-0.1.0.dist-info")
+        os.makedirs(dist_info)
+        with open(os.path.join(dist_info, "METADATA"), "w") as f:
+            f.write("Metadata-Version: 2.1\nName: {}\nVersion: 0.1.0\n".format(name.replace("_", "-")))
+        if entry_point:
+            with open(os.path.join(dist_info, "entry_points.txt"), "w") as f:
+                f.write("[pypads.plugins]\n{} = {}\n".format(entry_point_name, name))
+
+    def test_discover_plugins(self):
+        """
+        Test discovering plugins through entry points and distribution names without importing them.
+        :return:
+        """
+        from pypads.app.plugins import discover_plugins
+
+        folder = tempfile.mkdtemp()
+        self._install_dummy_plugin(folder, "dummy_entry_point_plugin")
+        self._install_dummy_plugin(folder, "pypads_dummy_plugin", entry_point=False)
+        manifest = os.path.join(folder, "cache", "plugins.json")
+        sys.path.append(folder)
+        try:
+            plugins = discover_plugins(path=[folder], manifest=manifest)
+            imported = "dummy_entry_point_plugin" in sys.modules or "pypads_dummy_plugin" in sys.modules
+            plugins["dummy"].activate()
+            cached = discover_plugins(path=[folder], manifest=manifest)
+
+            # --------------------------- asserts ------------------------------
+            self.assertEqual(set(plugins.keys()), {"dummy", "pypads_dummy_plugin"})
+            self.assertFalse(imported)
+            self.assertEqual(sys.modules["dummy_entry_point_plugin"].activated, [True])
+            self.assertTrue(os.path.exists(manifest))
+            self.assertEqual({n: p.reference for n, p in cached.items()},
+                             {n: p.reference for n, p in plugins.items()})
+            self.assertFalse(cached["pypads_dummy_plugin"].loaded)
+            # !-------------------------- asserts ---------------------------
+        finally:
+            sys.path.remove(folder)
+
+    def test_discover_plugin_once(self):
+        """
+        Test discovering a plugin distribution registering an entry point with another name only once.
+        :return:
+        """
+        from pypads.app.plugins import discover_plugins
+
+        folder = tempfile.mkdtemp()
+        self._install_dummy_plugin(folder, "pypads_fake", entry_point_name="fake")
+        plugins = discover_plugins(path=[folder])
+
+        # --------------------------- asserts ------------------------------
+        self.assertEqual({n: p.reference for n, p in plugins.items()}, {"fake": "pypads_fake"})
+        self.assertEqual(plugins["fake"].distribution, "pypads_fake")
+        # The plugin can be disabled by its module or distribution name too
+        self.assertEqual(plugins["fake"].names, {"fake", "pypads_fake"})
+        self.assertTrue(plugins["fake"].names.intersection(["pypads_fake"]))
+        # !-------------------------- asserts ---------------------------
+
+    def test_import_time(self):
+        """
+        Test importing pypads in a fresh interpreter stays within the budget.
+        :return:
+        """
+        start = time.time()
+        subprocess.check_call([sys.executable, "-c", "import pypads.app.base"],
+                              cwd=os.path.join(os.path.dirname(__file__), "..", ".."))
+        duration = time.time() - start
+
+        # --------------------------- asserts ------------------------------
+        print("Importing pypads took {:.2f}s".format(duration))
+        self.assertLess(duration, IMPORT_BUDGET)
+        # !-------------------------- asserts ---------------------------
@@ -0,0 +1,63 @@
+from tests.base_test import BaseTest, TEST_FOLDER, config
+
+
+class PyPadsResultsTest(BaseTest):
+
+    def test_get_data_frame(self):
+        """
+        Test building a data frame of the parameters and metrics of multiple runs.
+        :return:
+        """
+        from pypads.app.base import PyPads
+        from pypads.app.results import ResultEntry
+        from pypads.model.models import ResultType
+
+        tracker = PyPads(uri=TEST_FOLDER, config=config, autostart=True)
+        run_ids = []
+        for i in range(3):
+            if i > 0:
+                tracker.api.start_run()
+            run_ids.append(tracker.api.active_run().info.run_id)
+            tracker.api.log_param("depth", str(i))
+            for step in range(2):
+                tracker.api.log_metric("accuracy", i + step / 10, step=step)
+            tracker.api.end_run()
+
+        df = tracker.results.get_data_frame(list(reversed(run_ids)))
+        summary = tracker.results.get_summary(df)
+
+        # --------------------------- asserts ------------------------------
+        self.assertEqual(list(df.index), list(reversed(run_ids)))
+        self.assertTrue({"parameter_depth", "metric_accuracy"}.issubset(set(df.columns)))
+        self.assertEqual(df.loc[run_ids[1], "parameter_depth"], ResultEntry(ResultType.parameter, "depth", "1"))
+        self.assertEqual(len(df.loc[run_ids[2], "metric_accuracy"]), 2)
+        self.assertEqual(float(summary.loc[run_ids[2], "metric_accuracy"]), 2.1)
+        self.assertEqual(list(summary["parameter_depth"]), ["2", "1", "0"])
+        # !-------------------------- asserts ---------------------------
+
+    def test_compile_run_search(self):
+        """
+        Test compiling a boolean run search into a single plan and evaluating it.
+        :return:
+        """
+        from pypads.app.backends.search import compile_run_search, LEAF, OR, AND, NOT
+        from pypads.app.results import OperatorType
+
+        depth = {"storage_type": "parameter", "name": "depth", "data": "1"}
+        accuracy = {"storage_type": "metric", "name": "accuracy", "data": {"$gt": 0.9}}
+        search = {OperatorType.OR: [depth, {OperatorType.AND: [accuracy, {OperatorType.NOT: depth}]}]}
+        plan = compile_run_search(search, experiment_name="experiment")
+        swapped = compile_run_search({"$or": [{"$and": [{"$not": depth}, accuracy]}, depth]},
+                                     experiment_name="experiment")
+        run_ids = plan.evaluate({0: {"a", "b"}, 1: {"b", "c"}}, all_runs={"a", "b", "c", "d"})
+
+        # --------------------------- asserts ------------------------------
+        self.assertEqual(plan.leaves, [("parameter", {"name": "depth", "data": "1", "experiment.name": "experiment"}),
+                                       ("metric", {"name": "accuracy", "data": {"$gt": 0.9},
+                                                   "experiment.name": "experiment"})])
+        self.assertEqual(plan.expression, (OR, [(LEAF, 0), (AND, [(LEAF, 1), (NOT, (LEAF, 0))])]))
+        self.assertTrue(plan.needs_all_runs)
+        self.assertEqual(plan.key, swapped.key)
+        self.assertEqual(run_ids, {"a", "b", "c"})
+        self.assertRaises(ValueError, compile_run_search, {"$xor": [depth]})
+        # !-------------------------- asserts ---------------------------
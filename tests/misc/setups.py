@@ -0,0 +1,298 @@
+import os
+import tempfile
+
+from tests.base_test import BaseTest, TEST_FOLDER, config
+
+
+class DummySetup:
+
+    def __init__(self, name, concurrent=True, needed_cached=None, provided_cached=None):
+        self.name = name
+        self.concurrent = concurrent
+        self.needed_cached = needed_cached or []
+        self.provided_cached = provided_cached or []
+
+    def __repr__(self):
+        return self.name
+
+
+class RunSetupExecution(BaseTest):
+
+    def test_setup_chains(self):
+        """
+        Test splitting the setups into sequential setups and chains of concurrent setups.
+        :return:
+        """
+        from pypads.app.injections.run_loggers import setup_chains
+
+        stdout = DummySetup("stdout", concurrent=False, provided_cached=["Log"])
+        mac = DummySetup("mac", provided_cached=["SystemStats"])
+        git = DummySetup("git")
+        cpu = DummySetup("cpu", needed_cached="SystemStats")
+        ram = DummySetup("ram", needed_cached=["SystemStats"])
+        log = DummySetup("log", needed_cached=["Log"])
+        sequential, chains = setup_chains([stdout, mac, git, cpu, ram, log])
+
+        # --------------------------- asserts ------------------------------
+        self.assertEqual(sequential, [stdout, log])
+        self.assertEqual(chains, [[mac, cpu, ram], [git]])
+        # !-------------------------- asserts ---------------------------
+
+    def test_host_cache(self):
+        """
+        Test computing host static information only once per host and environment.
+        :return:
+        """
+        from pypads.app.misc.caches import HostCache
+
+        folder = tempfile.mkdtemp()
+        computed = []
+
+        def compute():
+            computed.append(True)
+            return {"value": 42}
+
+        cache = HostCache(folder)
+        value = cache.get("entry", compute)
+        cached = cache.get("entry", compute)
+        stored = HostCache(folder).get("entry", compute)
+
+        # --------------------------- asserts ------------------------------
+        self.assertEqual(value, {"value": 42})
+        self.assertEqual(cached, value)
+        self.assertEqual(stored, value)
+        self.assertEqual(len(computed), 1)
+        self.assertTrue(os.path.exists(os.path.join(cache.folder, "entry.json")))
+        cache.clear()
+        self.assertFalse(os.path.exists(cache.folder))
+        # !-------------------------- asserts ---------------------------
+
+    def test_concurrent_setups(self):
+        """
+        Test running the hardware setups on the thread pool when starting a run.
+        :return:
+        """
+        from pypads.app.base import PyPads
+        from pypads.injections.setup.hardware import SystemStatsTO, IMacAddressRSF, ISystemRSF, ICpuRSF, IRamRSF
+
+        tracker = PyPads(uri=TEST_FOLDER, config={**config, **{"mongo_db": False, "setup_workers": 4}},
+                         setup_fns={IMacAddressRSF(), ISystemRSF(), ICpuRSF(), IRamRSF()}, autostart=True)
+
+        # --------------------------- asserts ------------------------------
+        self.assertTrue(tracker.cache.run_exists(SystemStatsTO.__name__))
+        self.assertTrue(os.path.exists(tracker.host_cache.folder))
+        self.assertTrue({"mac_address.json", "system.json", "cpu.json", "memory.json"}.issubset(
+            set(os.listdir(tracker.host_cache.folder))))
+        # !-------------------------- asserts ---------------------------
+        tracker.api.end_run()
+
+    def test_concurrent_setups_run_context(self):
+        """
+        Test that the concurrent setups don't switch the globally active run on the threads of the pool.
+        :return:
+        """
+        import threading
+        from unittest import mock
+        import mlflow
+        from pypads.app.base import PyPads
+        from pypads.injections.setup.hardware import IMacAddressRSF, ISystemRSF, ICpuRSF, IRamRSF, IDiskRSF, \
+            IPidRSF, ISocketInfoRSF
+
+        tracker = PyPads(uri=TEST_FOLDER, config={**config, **{"mongo_db": False, "setup_workers": 4}},
+                         setup_fns={IMacAddressRSF(), ISystemRSF(), ICpuRSF(), IRamRSF(), IDiskRSF(), IPidRSF(),
+                                    ISocketInfoRSF()}, autostart=False)
+        tracker.host_cache.clear()
+        threads = []
+        start_run = mlflow.start_run
+
+        def record_start_run(*args, **kwargs):
+            threads.append(threading.current_thread().name)
+            return start_run(*args, **kwargs)
+
+        with mock.patch.object(mlflow, "start_run", record_start_run):
+            tracker.api.start_run()
+            run = tracker.api.active_run()
+        tracker.api.end_run()
+
+        # --------------------------- asserts ------------------------------
+        self.assertTrue(len(threads) > 1)
+        self.assertEqual([name for name in threads if name.startswith("pypads_setup")], [])
+        self.assertIsNone(tracker.api.active_run())
+        self.assertEqual(tracker.backend.get_run(run.info.run_id).info.status, "FINISHED")
+        # The socket information isn't static for the host
+        self.assertNotIn("socket.json", os.listdir(tracker.host_cache.folder))
+        # !-------------------------- asserts ---------------------------
+
+    def test_concurrent_setups_libraries(self):
+        """
+        Test storing the library of a tracked object created by a concurrent setup before the setups are run.
+        :return:
+        """
+        import sys
+        import threading
+        from unittest import mock
+        import mlflow
+        from pypads.app.base import PyPads
+        from pypads.app.injections.run_loggers import RunSetup
+        from pypads.app.injections.tracked_object import TrackedObject
+        from pypads.injections.setup.hardware import IMacAddressRSF
+        from pypads.model.logger_output import TrackedObjectModel
+
+        class DummyTO(TrackedObject):
+            class DummyTOModel(TrackedObjectModel):
+                type: str = "Dummy"
+                description: str = "Object of a library which wasn't stored yet."
+
+            @classmethod
+            def get_model_cls(cls):
+                return cls.DummyTOModel
+
+        # Objects are part of the library their module belongs to. numpy is a library which isn't stored yet
+        DummyTO.__module__ = "numpy.tracked_objects"
+        created = []
+
+        class IDummyRSF(RunSetup):
+            name = "Dummy Run Setup Logger"
+            type: str = "DummyRunLogger"
+            _concurrent = True
+
+            def _call(self, *args, _pypads_env, _logger_call, _logger_output, **kwargs):
+                tracked_object = DummyTO(parent=_logger_output)
+                tracked_object.store()
+                created.append(tracked_object)
+
+        tracker = PyPads(uri=TEST_FOLDER, config={**config, **{"mongo_db": False, "setup_workers": 2}},
+                         setup_fns={IDummyRSF(), IMacAddressRSF()}, autostart=False)
+        threads = []
+        start_run = mlflow.start_run
+
+        def record_start_run(*args, **kwargs):
+            threads.append(threading.current_thread().name)
+            return start_run(*args, **kwargs)
+
+        with mock.patch.object(sys.modules[__name__], "DummyTO", DummyTO, create=True), \
+                mock.patch.object(mlflow, "start_run", record_start_run):
+            tracker.api.start_run()
+        tracker.api.end_run()
+
+        # --------------------------- asserts ------------------------------
+        self.assertEqual(len(created), 1)
+        self.assertEqual(created[0].defined_in.uid, created[0]._defined_in.uid)
+        self.assertTrue(tracker.library_repository.has_object(uid=created[0]._defined_in.uid))
+        self.assertEqual([name for name in threads if name.startswith("pypads_setup")], [])
+        # !-------------------------- asserts ---------------------------
+
+    def test_time_series_buffer(self):
+        """
+        Test buffering samples of a time series and summarizing them.
+        :return:
+        """
+        from pypads.injections.setup.hardware import TimeSeriesBuffer
+
+        buffer = TimeSeriesBuffer(["a", "b"], segment_size=4, reservoir_size=1000)
+        segments = []
+        for i in range(10):
+            buffer.add([i, 100 - i], timestamp=i)
+            if buffer.is_full():
+                segments.append(buffer.pop_segment())
+        segments.append(buffer.pop_segment())
+        series = TimeSeriesBuffer.concat(segments)
+        summary = buffer.summary()
+
+        # --------------------------- asserts ------------------------------
+        self.assertEqual([len(s["timestamp"]) for s in segments], [4, 4, 2])
+        self.assertFalse(buffer.has_pending())
+        self.assertEqual(series["timestamp"], list(range(10)))
+        self.assertEqual(series["a"], list(range(10)))
+        self.assertEqual(summary["a"]["min"], 0)
+        self.assertEqual(summary["a"]["max"], 9)
+        self.assertEqual(summary["b"]["mean"], 95.5)
+        self.assertEqual(summary["a"]["p50"], 4)
+        self.assertEqual(summary["a"]["p90"], 8)
+        self.assertRaises(ValueError, buffer.add, [1])
+        # !-------------------------- asserts ---------------------------
+
+    def test_cpu_usage_time_series(self):
+        """
+        Test storing the cpu usage in segments and a final summary.
+        :return:
+        """
+        from pypads.app.base import PyPads
+        from pypads.injections.setup.hardware import CpuUsageTO
+
+        tracker = PyPads(uri=TEST_FOLDER, config={**config, **{"mongo_db": False}}, autostart=True)
+        cpu_usage = CpuUsageTO(parent=tracker.api.get_programmatic_output(), period=0.1, segment_size=5)
+        cpu_usage.store()
+        for _ in range(12):
+            cpu_usage.add_cpu_usage()
+        segments = list(cpu_usage.segments)
+        cpu_usage.finalize()
+        series = CpuUsageTO.load_series(cpu_usage.run.uid, cpu_usage.segments)
+
+        # --------------------------- asserts ------------------------------
+        self.assertEqual(len(segments), 2)
+        self.assertEqual(len(cpu_usage.segments), 3)
+        self.assertEqual(len(series["timestamp"]), 12)
+        self.assertEqual(set(series.keys()), {"timestamp"} | set(cpu_usage.columns))
+        self.assertEqual(set(cpu_usage.summary.keys()), set(cpu_usage.columns))
+        self.assertEqual(set(cpu_usage.summary["total"].keys()), {"min", "mean", "max", "p50", "p90", "p99"})
+        # !-------------------------- asserts ---------------------------
+        tracker.api.end_run()
+
+    def test_resource_sampler(self):
+        """
+        Test sampling the resources of the process tree and attributing them to tracked calls.
+        :return:
+        """
+        import time
+        from types import ModuleType
+        import mlflow
+        from pypads.app.base import PyPads
+        from pypads.injections.loggers.hardware import ResourceILF
+        from pypads.injections.setup.hardware import IResourceRSF, get_resource_sampler
+
+        tracker = PyPads(uri=TEST_FOLDER, config={**config, **{"mongo_db": False, "resource_sampling_period": 0.05}},
+                         hooks={"hardware": {"on": ["pypads_fit"]}}, events={"hardware": ResourceILF()},
+                         setup_fns={IResourceRSF()}, autostart=True)
+        sampler = get_resource_sampler(tracker)
+        samples = []
+        sampler.add_consumer(samples.append)
+
+        def fit():
+            memory = bytearray(100 * 1024 * 1024)
+            start = time.time()
+            while time.time() - start < 0.3:
+                pass
+            return len(memory)
+
+        module = ModuleType("dummy_module")
+        module.fit = fit
+        tracked_fit = tracker.api.track(fit, ctx=module, anchors=["pypads_fit"])
+
+        # The tracked call only uses the samples of the sampling thread
+        import threading
+        read, readers = sampler.read, set()
+
+        def counted_read():
+            readers.add(threading.get_ident())
+            return read()
+
+        sampler.read = counted_read
+        time.sleep(0.1)
+        tracked_fit()
+        sampler.read = read
+        # A bound method is a new object on every access
+        sampler.remove_consumer(samples.append)
+        metrics = mlflow.get_run(mlflow.active_run().info.run_id).data.metrics
+
+        # --------------------------- asserts ------------------------------
+        self.assertIs(get_resource_sampler(tracker), sampler)
+        self.assertGreater(len(samples), 0)
+        self.assertTrue(any(s.call is not None for s in samples))
+        self.assertNotIn(samples.append, [c[0] for c in sampler._consumers])
+        self.assertNotIn(threading.get_ident(), readers)
+        self.assertGreaterEqual(metrics["dummy_module.fit.peak_rss"], 100 * 1024 * 1024)
+        self.assertGreater(metrics["dummy_module.fit.cpu_seconds"], 0.2)
+        # !-------------------------- asserts ---------------------------
+        tracker.api.end_run()
+        self.assertFalse(sampler._thread)
@@ -0,0 +1,239 @@
+import timeit
+from types import ModuleType
+
+from tests.base_test import BaseTest, TEST_FOLDER, config
+
+
+class FunctionWrapping(BaseTest):
+
+    def test_make_call_description(self):
+        """
+        Test describing the instance of a tracked call only if debug messages are logged. The description of an
+        instance is built only once.
+        :return:
+        """
+        from unittest import mock
+        from pypads import logger
+        from pypads.app.base import PyPads
+        from pypads.app.call import FunctionReference
+        from pypads.importext.wrapping import function_wrapping
+        from pypads.importext.wrapping.base_wrapper import Context
+        from pypads.importext.wrapping.function_wrapping import FunctionWrapper
+        from sklearn.tree import DecisionTreeClassifier
+
+        tracker = PyPads(uri=TEST_FOLDER, config={**config, **{"mongo_db": False}}, autostart=True)
+        model = DecisionTreeClassifier()
+        wrapper = FunctionWrapper(tracker)
+        fn_reference = FunctionReference(Context(DecisionTreeClassifier), DecisionTreeClassifier.fit)
+        function_wrapping._instance_descriptions.clear()
+        representations = []
+
+        def representation(instance):
+            representations.append(instance)
+            return "DecisionTreeClassifier()"
+
+        def make_calls(n=10):
+            for _ in range(n):
+                with wrapper._make_call(model, fn_reference):
+                    pass
+
+        with mock.patch.object(function_wrapping, "describe_instance",
+                               wraps=function_wrapping.describe_instance) as describe, \
+                mock.patch.object(DecisionTreeClassifier, "__repr__", representation):
+            make_calls()
+            without_debug = describe.call_count
+            handler = logger.add(lambda message: None, level="DEBUG")
+            try:
+                make_calls()
+            finally:
+                logger.remove(handler)
+            with_debug = describe.call_count
+
+        # --------------------------- asserts ------------------------------
+        self.assertEqual(without_debug, 0)
+        self.assertEqual(with_debug, 10)
+        self.assertEqual(representations, [model])
+        # !-------------------------- asserts ---------------------------
+        tracker.api.end_run()
+
+    def test_hook_chain_overhead(self):
+        """
+        Benchmark stacking the hooks of a tracked predict call with a compiled hook chain against compiling the chain
+        on every call.
+        :return:
+        """
+        from pypads.app.base import PyPads
+        from pypads.app.call import FunctionReference
+        from pypads.importext.wrapping.base_wrapper import Context
+        from pypads.importext.wrapping.function_wrapping import FunctionWrapper
+        from sklearn.tree import DecisionTreeClassifier
+        from tests.injections.injection_loggers import events, hooks
+
+        tracker = PyPads(uri=TEST_FOLDER, config={**config, **{"mongo_db": False}}, hooks=hooks, events=events,
+                         autostart=True)
+        model = DecisionTreeClassifier().fit([[0], [1]], [0, 1])
+
+        def predict():
+            return model.predict([[0]])
+
+        module = ModuleType("dummy_module")
+        module.predict = predict
+        tracker.api.track(predict, ctx=module, anchors=["pypads_log"])
+        context = Context(module)
+        fn_reference = FunctionReference(context, predict)
+        wrapper = FunctionWrapper(tracker)
+
+        n = 500
+        with wrapper._make_call(None, fn_reference) as call:
+            def bind():
+                return wrapper._get_hook_chain(fn_reference, context, predict).bind(predict, None, call)
+
+            def bind_recompiled():
+                Context.hook_version += 1
+                return bind()
+
+            compiled = timeit.timeit(bind, number=n) / n
+            recompiled = timeit.timeit(bind_recompiled, number=n) / n
+
+        # --------------------------- asserts ------------------------------
+        self.assertGreater(len(wrapper._get_hook_chain(fn_reference, context, predict).hooks), 0)
+        print("Hook dispatch: {:.1f}us per call compiled, {:.1f}us per call recompiled".format(
+            compiled * 1e6, recompiled * 1e6))
+        self.assertLess(compiled, recompiled)
+        # !-------------------------- asserts ---------------------------
+        tracker.api.end_run()
+
+    def test_hook_sampling(self):
+        """
+        Test skipping the loggers of a hook on calls which are not sampled by its policy.
+        :return:
+        """
+        from pypads.app.base import PyPads
+        from pypads.app.call import FunctionReference
+        from unittest import mock
+        from pypads.bindings.sampling import SamplingPolicy
+        from pypads.importext.wrapping import function_wrapping
+        from pypads.importext.wrapping.base_wrapper import Context
+        from pypads.importext.wrapping.function_wrapping import FunctionWrapper
+        from tests.injections.injection_loggers import events, hooks
+
+        policy = SamplingPolicy(every=3, first=7)
+        sampled = [policy.sample("run") for _ in range(10)]
+        limited = SamplingPolicy(rate=1, burst=2)
+        limited_sampled = [limited.sample("run") for _ in range(5)]
+        self.assertTrue(policy.sample("other_run"))
+
+        tracker = PyPads(uri=TEST_FOLDER, config={**config, **{"mongo_db": False,
+                                                               "hook_sampling": {"logger": {"every": 2}}}},
+                         hooks=hooks, events=events, autostart=True)
+
+        def predict():
+            return 0
+
+        module = ModuleType("dummy_module")
+        module.predict = predict
+        tracker.api.track(predict, ctx=module, anchors=["pypads_log"])
+        context = Context(module)
+        fn_reference = FunctionReference(context, predict)
+        wrapper = FunctionWrapper(tracker)
+
+        bound = []
+        # The policies are looked up only once per run
+        with mock.patch.object(function_wrapping, "get_sampling_policy",
+                               wraps=function_wrapping.get_sampling_policy) as get_sampling_policy:
+            for _ in range(4):
+                with wrapper._make_call(None, fn_reference) as call:
+                    bound.append(wrapper._get_hook_chain(fn_reference, context, predict).bind(predict, None, call))
+            lookups = get_sampling_policy.call_count
+            wrapper._get_hook_chain(fn_reference, context, predict)._policies("other_run")
+
+        # --------------------------- asserts ------------------------------
+        self.assertEqual(sampled, [True, False, False, True, False, False, True, False, False, False])
+        self.assertEqual(limited_sampled, [True, True, False, False, False])
+        self.assertEqual([b is predict for b in bound], [False, True, False, True])
+        self.assertEqual(lookups, 1)
+        self.assertEqual(get_sampling_policy.call_count, 2)
+        # !-------------------------- asserts ---------------------------
+        tracker.api.end_run()
+
+    def test_hook_sampling_state(self):
+        """
+        Test keeping the state of the sampling policies if the hook chain of a function is recompiled.
+        :return:
+        """
+        from pypads.app.base import PyPads
+        from pypads.app.call import FunctionReference
+        from pypads.bindings.sampling import SAMPLING_POLICIES
+        from pypads.importext.wrapping.base_wrapper import Context
+        from pypads.importext.wrapping.function_wrapping import FunctionWrapper
+        from tests.injections.injection_loggers import events, hooks
+
+        tracker = PyPads(uri=TEST_FOLDER, config={**config, **{"mongo_db": False,
+                                                               "hook_sampling": {"logger": {"first": 1}}}},
+                         hooks=hooks, events=events, autostart=True)
+
+        def predict():
+            return 0
+
+        module = ModuleType("dummy_module")
+        module.predict = predict
+        tracker.api.track(predict, ctx=module, anchors=["pypads_log"])
+        context = Context(module)
+        fn_reference = FunctionReference(context, predict)
+        wrapper = FunctionWrapper(tracker)
+
+        bound = []
+        for i in range(4):
+            with wrapper._make_call(None, fn_reference) as call:
+                bound.append(wrapper._get_hook_chain(fn_reference, context, predict).bind(predict, None, call))
+
+            # Tracking another function invalidates the compiled hook chains
+            def unrelated():
+                return i
+
+            unrelated.__name__ = "unrelated_{}".format(i)
+            setattr(module, unrelated.__name__, unrelated)
+            tracker.api.track(unrelated, ctx=module, anchors=["pypads_log"])
+        policies = tracker.cache.run_get(SAMPLING_POLICIES)
+
+        # --------------------------- asserts ------------------------------
+        self.assertEqual([b is predict for b in bound], [False, True, True, True])
+        self.assertEqual(len(policies), 1)
+        # !-------------------------- asserts ---------------------------
+        tracker.api.end_run()
+
+    def test_hook_chain_config(self):
+        """
+        Test recompiling the hook chain of a function if the config changed.
+        :return:
+        """
+        from pypads.app.base import PyPads
+        from pypads.app.call import FunctionReference
+        from pypads.importext.wrapping.base_wrapper import Context
+        from pypads.importext.wrapping.function_wrapping import FunctionWrapper
+        from tests.injections.injection_loggers import events, hooks
+
+        tracker = PyPads(uri=TEST_FOLDER, config={**config, **{"mongo_db": False}}, hooks=hooks, events=events,
+                         autostart=True)
+
+        def predict():
+            return 0
+
+        module = ModuleType("dummy_module")
+        module.predict = predict
+        tracker.api.track(predict, ctx=module, anchors=["pypads_log"])
+        context = Context(module)
+        fn_reference = FunctionReference(context, predict)
+        wrapper = FunctionWrapper(tracker)
+
+        unsampled = wrapper._get_hook_chain(fn_reference, context, predict)
+        tracker.config = {**tracker.config, **{"hook_sampling": {"logger": {"every": 2}}}}
+        sampled = wrapper._get_hook_chain(fn_reference, context, predict)
+
+        # --------------------------- asserts ------------------------------
+        self.assertIsNot(unsampled, sampled)
+        self.assertEqual([policy for _, _, policy in unsampled.hooks], [None] * len(unsampled.hooks))
+        self.assertIn({"every": 2}, [policy for _, _, policy in sampled.hooks])
+        self.assertIs(wrapper._get_hook_chain(fn_reference, context, predict), sampled)
+        # !-------------------------- asserts ---------------------------
+        tracker.api.end_run()